@@ -21,6 +21,7 @@
 from django.contrib.auth import logout, authenticate, login
 from django.core.exceptions import PermissionDenied
 
+from postorius.auth.utils import get_list_roles
 from postorius.models import (Domain, List, Member, MailmanUser,
                               MailmanApiError, Mailman404Error)
 
@@ -56,14 +57,11 @@ def list_owner_required(fn):
             raise PermissionDenied
         if user.is_superuser:
             return fn(*args, **kwargs)
-        if getattr(user, 'is_list_owner', None):
-            return fn(*args, **kwargs)
-        mlist = List.objects.get_or_404(fqdn_listname=list_id)
-        if user.email not in mlist.owners:
+        if 'owner' not in get_list_roles(args[0], list_id):
+            # Lists which don't exist are not found, not forbidden.
+            List.objects.get_or_404(fqdn_listname=list_id)
             raise PermissionDenied
-        else:
-            user.is_list_owner = True
-            return fn(*args, **kwargs)
+        return fn(*args, **kwargs)
     return wrapper
 
 
@@ -79,22 +77,11 @@ def list_moderator_required(fn):
             raise PermissionDenied
         if user.is_superuser:
             return fn(*args, **kwargs)
-        if getattr(user, 'is_list_owner', None):
-            return fn(*args, **kwargs)
-        if getattr(user, 'is_list_moderator', None):
-            return fn(*args, **kwargs)
-        mlist = List.objects.get_or_404(fqdn_listname=list_id)
-        if user.email not in mlist.moderators and \
-                user.email not in mlist.owners:
+        roles = get_list_roles(args[0], list_id)
+        if 'owner' not in roles and 'moderator' not in roles:
+            List.objects.get_or_404(fqdn_listname=list_id)
             raise PermissionDenied
-        else:
-            if user.email in mlist.moderators and \
-                    user.email not in mlist.owners:
-                user.is_list_moderator = True
-            else:
-                user.is_list_moderator = True
-                user.is_list_owner = True
-            return fn(*args, **kwargs)
+        return fn(*args, **kwargs)
     return wrapper
 
 
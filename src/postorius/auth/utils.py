@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 1998-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Resolution of the roles a user holds on mailing lists."""
+
+
+from postorius.models import List
+
+
+def get_list_roles(request, list_id):
+    """Return the set of roles the logged in user holds on a list.
+
+    The roles are looked up once per request and stored on it (in
+    `request.list_roles`), so decorators and views share the result.
+    `request.user.is_list_owner` and `request.user.is_list_moderator`
+    are set accordingly.
+    """
+    user = request.user
+    if not user.is_authenticated():
+        return set()
+    list_roles = getattr(request, 'list_roles', None)
+    if list_roles is None:
+        list_roles = request.list_roles = {}
+    if list_id not in list_roles:
+        list_roles[list_id] = List.objects.get_roles(list_id, user.email)
+    roles = list_roles[list_id]
+    user.is_list_owner = 'owner' in roles
+    user.is_list_moderator = 'moderator' in roles
+    return roles
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Mass subscription and removal of list members.
+
+Pasted addresses are deduplicated and validated before any API call is
+made, the (un)subscriptions then run concurrently (see
+`utils.run_concurrently`). The outcome is a list of
+``(address, status, detail)`` tuples in the order of the input, where
+`status` is one of `STATUSES`.
+"""
+
+import collections
+from email.utils import parseaddr
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from mailmanclient import MailmanConnectionError
+
+from postorius import utils
+
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+
+
+STATUSES = ('subscribed', 'unsubscribed', 'member', 'not_member', 'invalid',
+            'duplicate', 'failed')
+
+CHUNK_SIZE = 100
+
+PAGE_SIZE = 500
+
+
+def parse_addresses(text):
+    """Return the addresses in `text`, one per line, as a list of
+    ``[address, status]`` entries.
+
+    Lines may also hold a display name (``Les <les@example.org>``).
+    Invalid and repeated addresses get their status, addresses which
+    still need to be processed have a status of None.
+    """
+    entries = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        address = parseaddr(line)[1]
+        try:
+            validate_email(address)
+        except ValidationError:
+            entries.append([line, 'invalid'])
+            continue
+        if address.lower() in seen:
+            entries.append([address, 'duplicate'])
+        else:
+            seen.add(address.lower())
+            entries.append([address, None])
+    return entries
+
+
+def _failed(error):
+    return 'failed'
+
+
+def _run(entries, func, done, classify=_failed, progress=None):
+    """Call `func` for the pending addresses of `entries`, in chunks of
+    `CHUNK_SIZE`. Addresses succeed with the status `done`, `classify`
+    returns the status of an address from its error.
+    """
+    pending = [address for address, status in entries if status is None]
+    errors = {}
+    for start in range(0, len(pending), CHUNK_SIZE):
+        errors.update(utils.run_concurrently(
+            func, pending[start:start + CHUNK_SIZE],
+            errors=(HTTPError, MailmanConnectionError, ValueError)))
+        if progress is not None:
+            progress(len(errors), len(pending))
+    results = []
+    for address, status in entries:
+        detail = ''
+        if status is None:
+            error = errors[address]
+            if error is None:
+                status = done
+            else:
+                status = classify(error)
+                detail = '{0}'.format(error)
+        results.append((address, status, detail))
+    return results
+
+
+def mass_subscribe(mlist, text, progress=None):
+    """Subscribe the addresses pasted in `text` to `mlist`.
+
+    `progress` is called with the number of processed and of all valid
+    addresses after every `CHUNK_SIZE` addresses.
+    """
+    def subscribe(address):
+        mlist.subscribe(address=address, pre_verified=True,
+                        pre_confirmed=True)
+
+    def classify(error):
+        return 'member' if getattr(error, 'code', None) == 409 else 'failed'
+    return _run(parse_addresses(text), subscribe, 'subscribed', classify,
+                progress)
+
+
+def mass_unsubscribe(mlist, text, progress=None):
+    """Unsubscribe the addresses pasted in `text` from `mlist`.
+
+    `progress` is called like for `mass_subscribe`.
+    """
+    def unsubscribe(address):
+        mlist.unsubscribe(address.lower())
+
+    def classify(error):
+        # mailmanclient raises a ValueError for unknown members.
+        return 'not_member' if isinstance(error, ValueError) else 'failed'
+    return _run(parse_addresses(text), unsubscribe, 'unsubscribed', classify,
+                progress)
+
+
+def member_count(mlist):
+    """Return the number of members of `mlist` without fetching them."""
+    return mlist.get_member_page(1, 1).total_size
+
+
+def iter_member_pages(mlist, count=PAGE_SIZE):
+    """Yield the pages of the member roster of `mlist`, fetching one page
+    of `count` members at a time.
+    """
+    page = mlist.get_member_page(count, 1)
+    while len(page):
+        yield page
+        if not page.has_next:
+            break
+        page = page.next
+
+
+def unsubscribe_all(mlist, progress=None):
+    """Unsubscribe all members of `mlist`.
+
+    Members are deleted through their own resource, `CHUNK_SIZE` at a
+    time. As the deletions shift the roster, it is read again from its
+    start after every chunk, until only members which couldn't be deleted
+    are left; so only one chunk of members is held at a time. Those
+    members stay at the start of the roster and are read past with an
+    offset. `progress` is called with the number of processed and of all
+    members after every chunk. Returns the results of the members.
+    """
+    total = member_count(mlist)
+    results = []
+    failed = set()
+    while True:
+        # Skip the members which failed, they lead the roster.
+        nr, skip = divmod(len(failed), CHUNK_SIZE)
+        page = mlist.get_member_page(CHUNK_SIZE, nr + 1)
+        chunk = [member for member in list(page)[skip:]
+                 if member.email not in failed]
+        if not chunk:
+            break
+        for member, error in utils.run_concurrently(
+                lambda member: member.unsubscribe(), chunk):
+            if error is None:
+                results.append((member.email, 'unsubscribed', ''))
+            else:
+                failed.add(member.email)
+                results.append((member.email, 'failed',
+                                '{0}'.format(error)))
+        if progress is not None:
+            progress(len(results), max(total, len(results)))
+    return results
+
+
+def summarize(results):
+    """Return the number of results of each status."""
+    counts = collections.Counter(status for address, status, detail
+                                 in results)
+    order = [status for status in STATUSES if status in counts]
+    order.extend(sorted(status for status in counts if status not in order))
+    return collections.OrderedDict((status, counts[status])
+                                   for status in order)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 1998-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Cross-request cache for Mailman REST API responses.
+
+Caching is opt-in and configured per resource with the number of seconds
+a response may be reused:
+
+    >>> POSTORIUS_CACHE_TIMEOUTS = {
+    ...     'lists': 300,
+    ...     'domains': 600,
+    ...     'owners': 60,
+    ...     'moderators': 60,
+    ...     'settings': 60,
+    ... }
+    >>> POSTORIUS_CACHE_ALIAS = 'default'
+
+Resources which are not listed are never cached. Views that change
+resources through the API call `invalidate` for the affected resources.
+
+The list index (the names, the `advertised` flag and the description of
+every list) can be cached as well, so the list index page can be served
+without fetching the lists and their settings. Views which change the
+settings of a list update its entry:
+
+    >>> POSTORIUS_LIST_INDEX_TIMEOUT = 900
+
+All cached data is only shared between the processes serving Postorius
+if the cache is, so with more than one process the cache should be a
+shared one (e.g. memcached), not the per-process default.
+
+If both rosters are cached, the roles of users are cached as well: the
+lists an address owns or moderates (for the dashboard) and the roles of
+an address on a single list (for the permission checks). They expire
+together with the cached rosters.
+
+The member index of large lists (see `postorius.members`) is opt-in as
+well. It is stored in pages, so that no cache entry grows with the size
+of a list, and expires after the given number of seconds:
+
+    >>> POSTORIUS_MEMBER_INDEX_TIMEOUT = 3600
+
+The member index is also changed by the `run_jobs` command, which runs
+in a process of its own, so it must only be enabled with a shared cache.
+
+"""
+
+import hashlib
+import logging
+import re
+import time
+
+from django.conf import settings
+try:
+    from django.core.cache import caches
+except ImportError:
+    # Django < 1.7
+    from django.core.cache import get_cache
+else:
+    def get_cache(alias):
+        return caches[alias]
+
+
+logger = logging.getLogger(__name__)
+
+
+# REST paths (relative to the API base url) of the cacheable resources.
+RESOURCES = (
+    ('lists', re.compile(r'^lists(/[^/?]+)?(\?.*)?$')),
+    ('domains', re.compile(r'^domains(/[^/?]+)?(\?.*)?$')),
+    ('owners', re.compile(r'^lists/[^/]+/roster/owner$')),
+    ('moderators', re.compile(r'^lists/[^/]+/roster/moderator$')),
+    ('settings', re.compile(r'^lists/[^/]+/config$')),
+)
+
+KEY_PREFIX = 'postorius:rest'
+LIST_INDEX_KEY = 'postorius:list_index'
+USER_ROLES_KEY = 'postorius:user_roles'
+ROLES_KEY = 'postorius:roles'
+MEMBER_INDEX_KEY = 'postorius:member_index'
+
+
+def _get_cache():
+    return get_cache(getattr(settings, 'POSTORIUS_CACHE_ALIAS', 'default'))
+
+
+def get_timeout(resource):
+    """Return the configured timeout for `resource` or None."""
+    return getattr(settings, 'POSTORIUS_CACHE_TIMEOUTS', {}).get(resource)
+
+
+def get_resource(path):
+    """Return the name of the cacheable resource a REST path belongs to,
+    or None if responses for the path are not cached.
+    """
+    for resource, pattern in RESOURCES:
+        if pattern.match(path):
+            if get_timeout(resource):
+                return resource
+            return None
+    return None
+
+
+def _generation(resource):
+    cache = _get_cache()
+    key = '{0}:gen:{1}'.format(KEY_PREFIX, resource)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the current time, so that a generation number which
+        # got evicted from the cache never revives older entries.
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _key(resource, path):
+    digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+    return '{0}:{1}:{2}:{3}'.format(
+        KEY_PREFIX, resource, _generation(resource), digest)
+
+
+def get_cached(resource, path):
+    """Return the cached response for `path` or None."""
+    return _get_cache().get(_key(resource, path))
+
+
+def store(resource, path, response):
+    _get_cache().set(_key(resource, path), response, get_timeout(resource))
+
+
+def invalidate(*resources):
+    """Expire all cached responses of the given resources.
+
+    Every resource has a generation number which is part of the cache
+    keys, so bumping it makes all older entries unreachable.
+    """
+    if not getattr(settings, 'POSTORIUS_CACHE_TIMEOUTS', None):
+        return
+    cache = _get_cache()
+    for resource in resources:
+        key = '{0}:gen:{1}'.format(KEY_PREFIX, resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            _generation(resource)
+        logger.debug('Invalidated cached %s', resource)
+
+
+def _get_list_index_timeout():
+    return getattr(settings, 'POSTORIUS_LIST_INDEX_TIMEOUT', None)
+
+
+def list_index_enabled():
+    return _get_list_index_timeout() is not None
+
+
+def get_list_index():
+    """Return the cached list index: its entries in a dict keyed by list
+    id (`lists`) and whether it holds all lists (`complete`).
+    """
+    index = None
+    if list_index_enabled():
+        index = _get_cache().get(LIST_INDEX_KEY)
+    return index or dict(lists={}, complete=False)
+
+
+def store_list_index(index):
+    timeout = _get_list_index_timeout()
+    if timeout is not None:
+        _get_cache().set(LIST_INDEX_KEY, index, timeout)
+
+
+def _get_roles_timeout():
+    timeouts = [get_timeout(resource) for resource in ('owners', 'moderators')]
+    if all(timeouts):
+        return min(timeouts)
+    return None
+
+
+def _user_roles_key(address):
+    digest = hashlib.md5(address.lower().encode('utf-8')).hexdigest()
+    return '{0}:{1}:{2}:{3}'.format(USER_ROLES_KEY, _generation('owners'),
+                                    _generation('moderators'), digest)
+
+
+def get_user_roles(address):
+    """Return the cached ids of the lists `address` owns and moderates,
+    a dict of sets keyed by role, or None.
+    """
+    if _get_roles_timeout() is None:
+        return None
+    return _get_cache().get(_user_roles_key(address))
+
+
+def store_user_roles(address, roles):
+    timeout = _get_roles_timeout()
+    if timeout is not None:
+        _get_cache().set(_user_roles_key(address), roles, timeout)
+
+
+def _roles_key(address, list_id):
+    digest = hashlib.md5('{0} {1}'.format(address.lower(), list_id)
+                         .encode('utf-8')).hexdigest()
+    return '{0}:{1}:{2}:{3}'.format(ROLES_KEY, _generation('owners'),
+                                    _generation('moderators'), digest)
+
+
+def get_roles(address, list_id):
+    """Return the cached roles of `address` on a list, or None."""
+    if _get_roles_timeout() is None:
+        return None
+    return _get_cache().get(_roles_key(address, list_id))
+
+
+def store_roles(address, list_id, roles):
+    timeout = _get_roles_timeout()
+    if timeout is not None:
+        _get_cache().set(_roles_key(address, list_id), roles, timeout)
+
+
+def _get_member_index_timeout():
+    return getattr(settings, 'POSTORIUS_MEMBER_INDEX_TIMEOUT', None)
+
+
+def member_index_enabled():
+    return _get_member_index_timeout() is not None
+
+
+def _member_index_key(list_id, *parts):
+    digest = hashlib.md5(list_id.encode('utf-8')).hexdigest()
+    return ':'.join([MEMBER_INDEX_KEY, digest] +
+                    ['{0}'.format(part) for part in parts])
+
+
+def get_member_index(list_id):
+    """Return the state of the member index of a list and its pages, a
+    dict keyed by page number, or ``(None, {})`` if it isn't cached.
+    """
+    if not member_index_enabled():
+        return None, {}
+    cache = _get_cache()
+    state = cache.get(_member_index_key(list_id))
+    if state is None:
+        return None, {}
+    keys = dict((_member_index_key(list_id, state['version'], nr), nr)
+                for nr in range(1, state['pages'] + 1))
+    pages = dict((keys[key], page)
+                 for key, page in cache.get_many(list(keys)).items())
+    return state, pages
+
+
+def store_member_index(list_id, state, pages):
+    """Store the state of the member index of a list and the given pages.
+    """
+    timeout = _get_member_index_timeout()
+    if timeout is None:
+        return
+    _get_cache().set_many(
+        dict((_member_index_key(list_id, state['version'], nr), page)
+             for nr, page in pages.items()), timeout)
+    _get_cache().set(_member_index_key(list_id), state, timeout)
+
+
+def invalidate_member_index(list_id):
+    if member_index_enabled():
+        _get_cache().delete(_member_index_key(list_id))
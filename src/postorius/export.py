@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Streaming export of list rosters.
+
+The roster is read lazily, one page of `bulk.PAGE_SIZE` members at a
+time, and every page is serialized into one chunk, so an export only
+holds a single page in memory and starts sending right away:
+
+    >>> response = StreamingHttpResponse(
+    ...     stream_members(mlist, ['email', 'role'], 'csv'),
+    ...     content_type=CONTENT_TYPES['csv'])
+
+The values are taken from the member entries of the roster pages, no
+further API calls are made. The email address and the role are member
+attributes of the client; the delivery mode is part of the entries as
+well, but the client doesn't expose it, so it is read from the entry
+data.
+
+Display names and subscription dates are deliberately not offered:
+Mailman 3.0 doesn't return them in the roster entries, they belong to
+the addresses and users of the members, and reading those would take
+one more call per member.
+
+`stream_site` exports the rosters of many lists, as a zip or tar archive
+of one CSV file per list or as one combined file with a ``list_id``
+column. The rosters are fetched by a bounded pool of
+``POSTORIUS_BULK_WORKERS`` threads, and only the rosters of one round of
+workers are held in memory at a time.
+"""
+
+import csv
+import json
+import logging
+import tarfile
+import time
+import zipfile
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+from mailmanclient import MailmanConnectionError
+
+from postorius import bulk
+
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+
+
+logger = logging.getLogger(__name__)
+
+
+COLUMNS = (
+    ('email', _('Email address')),
+    ('role', _('Role')),
+    ('delivery_mode', _('Delivery mode')),
+)
+
+FORMATS = (
+    ('csv', 'CSV'),
+    ('ndjson', 'NDJSON'),
+)
+
+SITE_FORMATS = (
+    ('zip', _('ZIP archive of CSV files')),
+    ('tar', _('TAR archive of CSV files')),
+    ('csv', _('Combined CSV')),
+    ('ndjson', _('Combined NDJSON')),
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'zip': 'application/zip',
+    'tar': 'application/x-tar',
+}
+
+
+class _Buffer(object):
+    """A file-like object returning what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class _Stream(object):
+    """A write-only file-like object collecting the output of an archive
+    until it is sent.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, value):
+        self._chunks.append(value)
+        self._position += len(value)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        """Return and forget what was written since the last call."""
+        value = b''.join(self._chunks)
+        self._chunks = []
+        return value
+
+
+def _entry_value(member, column):
+    if column == 'delivery_mode':
+        # The entry of the roster page, kept by the client.
+        data = getattr(member, '_info', None)
+        if isinstance(data, dict):
+            return data.get(column)
+        return None
+    return getattr(member, column)
+
+
+def member_values(member, columns):
+    """Return the values of `columns` (see `COLUMNS`) for `member`."""
+    return [_entry_value(member, column) or '' for column in columns]
+
+
+def serialize(rows, columns, format):
+    """Return `rows` of `columns` values as one chunk of `format`."""
+    if format == 'ndjson':
+        return ''.join(json.dumps(dict(zip(columns, row))) + '\n'
+                       for row in rows)
+    writer = csv.writer(_Buffer())
+    return ''.join(writer.writerow([u'{0}'.format(value).encode('utf-8')
+                                    for value in row])
+                   for row in rows)
+
+
+def stream_members(mlist, columns, format='csv'):
+    """Yield the roster of `mlist` in `format`, one chunk per page. CSV
+    exports start with a header row.
+    """
+    if format == 'csv':
+        yield serialize([columns], columns, format)
+    for page in bulk.iter_member_pages(mlist):
+        yield serialize([member_values(member, columns) for member in page],
+                        columns, format)
+
+
+def _roster(mlist, columns):
+    return [member_values(member, columns)
+            for page in bulk.iter_member_pages(mlist) for member in page]
+
+
+def iter_rosters(lists, columns, workers=None):
+    """Yield ``(mlist, rows, error)`` for each of `lists`, in order.
+
+    The rosters are fetched by `workers` threads, one round of `workers`
+    lists at a time. `rows` is None if the roster couldn't be fetched.
+    """
+    if workers is None:
+        workers = getattr(settings, 'POSTORIUS_BULK_WORKERS', 4)
+    workers = max(workers, 1)
+
+    def fetch(mlist):
+        try:
+            return mlist, _roster(mlist, columns), None
+        except (HTTPError, MailmanConnectionError) as e:
+            logger.error('Could not export the roster of %s: %s',
+                         mlist.list_id, e)
+            return mlist, None, e
+
+    pool = ThreadPool(workers)
+    try:
+        for start in range(0, len(lists), workers):
+            for result in pool.map(fetch, lists[start:start + workers]):
+                yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _add_file(archive, name, data):
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    if isinstance(archive, zipfile.ZipFile):
+        archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data)
+    else:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = time.time()
+        archive.addfile(info, BytesIO(data))
+
+
+def stream_site(lists, columns, format='zip', workers=None):
+    """Yield the rosters of `lists` in `format` (see `SITE_FORMATS`).
+
+    Archives hold a ``<list_id>.csv`` file per list, and an
+    ``errors.csv`` file with the lists whose roster couldn't be fetched.
+    Combined files skip those lists, they are logged.
+    """
+    rosters = iter_rosters(lists, columns, workers)
+    if format in ('csv', 'ndjson'):
+        columns = ['list_id'] + list(columns)
+        if format == 'csv':
+            yield serialize([columns], columns, format)
+        for mlist, rows, error in rosters:
+            if rows:
+                yield serialize([[mlist.list_id] + row for row in rows],
+                                columns, format)
+        return
+    stream = _Stream()
+    if format == 'zip':
+        archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED,
+                                  allowZip64=True)
+    else:
+        archive = tarfile.open(fileobj=stream, mode='w|')
+    errors = []
+    for mlist, rows, error in rosters:
+        if rows is None:
+            errors.append([mlist.list_id, error])
+            continue
+        _add_file(archive, '{0}.csv'.format(mlist.list_id),
+                  serialize([columns] + rows, columns, 'csv'))
+        yield stream.pop()
+    if errors:
+        _add_file(archive, 'errors.csv',
+                  serialize([['list_id', 'error']] + errors,
+                            ['list_id', 'error'], 'csv'))
+    archive.close()
+    yield stream.pop()
@@ -19,6 +19,7 @@
 from django import forms
 from django.core.validators import validate_email, URLValidator
 from django.utils.translation import ugettext_lazy as _
+from postorius import export, members
 from postorius.fieldset_forms import FieldsetForm
 
 
@@ -693,6 +694,68 @@ class ListMassRemoval(FieldsetForm):
         layout = [["Mass Removal", "emails"]]
 
 
+class MemberSearch(forms.Form):
+
+    """Form fields to search, sort and page the members of a list.
+    """
+    q = forms.CharField(
+        label=_('Search'),
+        required=False)
+    sort = forms.ChoiceField(
+        label=_('Sort by'),
+        choices=members.SORTS,
+        required=False)
+    count = forms.TypedChoiceField(
+        label=_('Members per page'),
+        coerce=int,
+        required=False)
+
+    def __init__(self, *args, **kwargs):
+        super(MemberSearch, self).__init__(*args, **kwargs)
+        sizes = members.get_page_sizes()
+        self.fields['count'].choices = [(size, size) for size in sizes]
+        self.fields['count'].empty_value = sizes[0]
+        self.fields['count'].initial = sizes[0]
+
+
+class ListMemberExport(forms.Form):
+
+    """Form fields to choose the columns and format of a roster export.
+    """
+    columns = forms.MultipleChoiceField(
+        label=_('Columns'),
+        choices=export.COLUMNS,
+        widget=forms.CheckboxSelectMultiple,
+        initial=['email'],
+        required=False)
+    format = forms.ChoiceField(
+        label=_('Format'),
+        choices=export.FORMATS,
+        initial='csv',
+        required=False)
+
+    def clean_columns(self):
+        return self.cleaned_data['columns'] or ['email']
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'csv'
+
+
+class SiteExport(ListMemberExport):
+
+    """Form fields to choose the columns and format of a site-wide roster
+    export.
+    """
+    format = forms.ChoiceField(
+        label=_('Format'),
+        choices=export.SITE_FORMATS,
+        initial='zip',
+        required=False)
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'zip'
+
+
 class UserPreferences(FieldsetForm):
 
     """
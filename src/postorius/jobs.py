@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Background jobs for long-running list operations.
+
+Views queue a `Job` with `enqueue` and return at once. The jobs are run
+by the ``run_jobs`` management command, which polls the database, so no
+message broker is needed:
+
+    $ django-admin.py run_jobs
+
+For development and tests, jobs can also be run right away in the
+request which queues them (default: False):
+
+    >>> POSTORIUS_RUN_JOBS_INLINE = True
+
+A job which is still running after ``POSTORIUS_JOB_TIMEOUT`` seconds
+(default: 21600, six hours) is assumed to have lost its worker and is
+queued again, so another worker picks it up. ``None`` turns this off:
+
+    >>> POSTORIUS_JOB_TIMEOUT = 21600
+
+A job kind is a function registered with `register`. It is called with
+the job and the keyword arguments given to `enqueue`, can report its
+progress with `Job.set_progress` and returns the result of the job:
+a dict with a `summary` of counts and optionally a `header` and `rows`
+which can be downloaded as CSV.
+"""
+
+import json
+import logging
+import traceback
+from datetime import datetime
+
+from django.conf import settings
+
+from postorius import bulk, cache, members, search
+from postorius.models import Job, List
+
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def register(kind):
+    """Decorator registering a function as the handler of a job kind."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, owner=None, list_id='', **arguments):
+    """Queue a job of `kind` and return it."""
+    if kind not in _handlers:
+        raise ValueError('Unknown job kind: {0}'.format(kind))
+    job = Job.objects.create_job(kind, owner, list_id, arguments)
+    if getattr(settings, 'POSTORIUS_RUN_JOBS_INLINE', False):
+        job = run(Job.objects.claim(job.id))
+    return job
+
+
+def run(job):
+    """Run a claimed job and store its result or error."""
+    try:
+        result = _handlers[job.kind](job, **job.get_arguments())
+    except Exception:
+        logger.exception('Job %s failed', job.id)
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    else:
+        job.status = 'done'
+        job.result = json.dumps(result or {})
+    job.finished_on = datetime.now()
+    job.save()
+    return job
+
+
+def run_pending(limit=None):
+    """Run queued jobs until none is left, or `limit` jobs ran. Returns
+    the number of jobs which ran.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = Job.objects.claim_next()
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def _get_list(job):
+    return List.objects.get(fqdn_listname=job.list_id)
+
+
+def _addresses(results, *statuses):
+    return [address for address, status, detail in results
+            if status in statuses]
+
+
+@register('mass_subscribe')
+def mass_subscribe(job, emails):
+    results = bulk.mass_subscribe(_get_list(job), emails,
+                                  progress=job.set_progress)
+    cache.invalidate('lists')
+    members.invalidate(job.list_id)
+    search.add_members(job.list_id,
+                       _addresses(results, 'subscribed', 'member'))
+    return {'summary': bulk.summarize(results),
+            'header': ['address', 'status', 'detail'],
+            'rows': results}
+
+
+@register('mass_unsubscribe')
+def mass_unsubscribe(job, emails):
+    results = bulk.mass_unsubscribe(_get_list(job), emails,
+                                    progress=job.set_progress)
+    cache.invalidate('lists')
+    members.invalidate(job.list_id)
+    search.remove_members(job.list_id,
+                          _addresses(results, 'unsubscribed', 'not_member'))
+    return {'summary': bulk.summarize(results),
+            'header': ['address', 'status', 'detail'],
+            'rows': results}
+
+
+@register('unsubscribe_all')
+def unsubscribe_all(job):
+    results = bulk.unsubscribe_all(_get_list(job), progress=job.set_progress)
+    cache.invalidate('lists')
+    members.invalidate(job.list_id)
+    search.remove_members(job.list_id, _addresses(results, 'unsubscribed'))
+    # Only the failures are worth downloading for a whole roster.
+    return {'summary': bulk.summarize(results),
+            'header': ['address', 'status', 'detail'],
+            'rows': [result for result in results
+                     if result[1] != 'unsubscribed']}
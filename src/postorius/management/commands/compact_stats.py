@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 1998-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date, timedelta
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from postorius.models import TaskCalender
+
+
+class Command(BaseCommand):
+    help = """Rolls old dashboard stats up into weekly and monthly stats.
+
+Daily stats older than POSTORIUS_STATS_DAILY_DAYS days (default: 90) are
+rolled up per week, weekly stats older than POSTORIUS_STATS_WEEKLY_DAYS
+days (default: 365) per month. Run it periodically, e.g. from cron."""
+
+    option_list = BaseCommand.option_list + (
+        make_option('--daily-days', type='int', dest='daily_days',
+                    help='Keep daily stats for this many days.'),
+        make_option('--weekly-days', type='int', dest='weekly_days',
+                    help='Keep weekly stats for this many days.'),
+    )
+
+    def handle(self, *args, **options):
+        daily_days = options.get('daily_days') or getattr(
+            settings, 'POSTORIUS_STATS_DAILY_DAYS', 90)
+        weekly_days = options.get('weekly_days') or getattr(
+            settings, 'POSTORIUS_STATS_WEEKLY_DAYS', 365)
+        today = date.today()
+        weeks = TaskCalender.objects.compact(
+            'week', today - timedelta(days=daily_days))
+        months = TaskCalender.objects.compact(
+            'month', today - timedelta(days=weekly_days))
+        self.stdout.write('Rolled up stats into {0} weekly and {1} monthly '
+                          'logs.'.format(weeks, months))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 1998-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from postorius.models import List, MailmanApiError
+
+
+class Command(BaseCommand):
+    help = """Rebuilds the cached list index (advertised flag and description
+of every list).
+
+Run it periodically (e.g. from cron) to pick up list settings which were
+changed outside of Postorius before POSTORIUS_LIST_INDEX_TIMEOUT expires."""
+
+    def handle(self, *args, **options):
+        try:
+            List.objects.refresh_index()
+        except MailmanApiError as e:
+            raise CommandError('Mailman REST API not available: {0}'.format(e))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from postorius import jobs
+
+
+class Command(BaseCommand):
+    help = """Runs queued background jobs.
+
+Without --once the command keeps polling the database for new jobs,
+every POSTORIUS_JOB_POLL_INTERVAL seconds (default: 5). Several workers
+can run at the same time."""
+
+    option_list = BaseCommand.option_list + (
+        make_option('--once', action='store_true', dest='once',
+                    default=False,
+                    help='Run the queued jobs and exit.'),
+        make_option('--interval', type='float', dest='interval',
+                    help='Seconds to wait between polls.'),
+    )
+
+    def handle(self, *args, **options):
+        interval = options.get('interval') or getattr(
+            settings, 'POSTORIUS_JOB_POLL_INTERVAL', 5)
+        while True:
+            count = jobs.run_pending()
+            if count:
+                self.stdout.write('Ran {0} job(s).'.format(count))
+            if options.get('once'):
+                break
+            time.sleep(interval)
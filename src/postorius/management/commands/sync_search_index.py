@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 1998-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from mailmanclient import MailmanConnectionError
+from postorius import search
+from postorius.models import Domain, List, MailmanApiError
+
+
+class Command(BaseCommand):
+    help = """Rebuilds the local search index of lists, domains and list
+members used by the global search of the dashboard.
+
+Run it once to fill the index, and then periodically (e.g. from cron) to
+pick up changes which were made outside of Postorius."""
+
+    option_list = BaseCommand.option_list + (
+        make_option('--no-members', action='store_false', dest='members',
+                    default=True,
+                    help='Only index lists and domains.'),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            counts = search.sync(List.objects.all(), Domain.objects.all(),
+                                 members=options.get('members', True))
+        except (MailmanApiError, MailmanConnectionError) as e:
+            raise CommandError('Mailman REST API not available: {0}'.format(e))
+        self.stdout.write('Indexed {0} domains, {1} lists and {2} members.'
+                          .format(counts['domain'], counts['list'],
+                                  counts['person']))
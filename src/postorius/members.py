@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Paged browsing of list members, with search and sorting.
+
+Pages in the roster's own order are fetched straight from the API.
+Searching (in addresses) and sorting need all members. They are read
+for each request, unless the member index is enabled (see
+`cache.get_member_index`): then lists with more than
+``POSTORIUS_MEMBER_INDEX_THRESHOLD`` members are served from an index
+in the cache:
+
+    >>> POSTORIUS_MEMBER_PAGE_SIZES = (25, 50, 100, 200)
+    >>> POSTORIUS_MEMBER_INDEX_THRESHOLD = 1000
+    >>> POSTORIUS_MEMBER_INDEX_REFRESH_PAGES = 2
+
+The index is built once, with concurrent requests for the pages of the
+roster. After that, each request served from the index refreshes the
+next ``POSTORIUS_MEMBER_INDEX_REFRESH_PAGES`` pages of the roster,
+going round the roster, so changes made outside of Postorius show up
+within one round. The views and jobs of Postorius which change a roster
+update the index with `discard` or drop it with `invalidate`; the index
+is only consistent between processes if the cache is shared.
+
+The member resources of Mailman 3.0 carry no display names: those
+belong to the addresses and users of the members, which would take one
+more call per member. So members can't be searched or sorted by name.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+
+from postorius import bulk, cache, utils
+from postorius.models import MailmanApiError
+
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ['email', 'role']
+
+SORTS = (
+    ('', _('Roster order')),
+    ('email', _('Email address')),
+    ('-email', _('Email address, descending')),
+)
+
+
+def get_page_sizes():
+    return getattr(settings, 'POSTORIUS_MEMBER_PAGE_SIZES',
+                   (25, 50, 100, 200))
+
+
+class MemberPage(object):
+    """One page of members, with the total number of matching members."""
+
+    def __init__(self, entries, nr, count, total_size):
+        self.entries = list(entries)
+        self.nr = nr
+        self.count = count
+        self.total_size = total_size
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def has_next(self):
+        return self.nr * self.count < self.total_size
+
+    @property
+    def has_previous(self):
+        return self.nr > 1
+
+    @property
+    def num_pages(self):
+        return max(1, -(-self.total_size // self.count))
+
+
+def _entry(member):
+    return dict((field, getattr(member, field)) for field in FIELDS)
+
+
+def _fetch_pages(mlist, numbers):
+    """Fetch the roster pages `numbers` concurrently. Returns the pages,
+    a dict of entries keyed by page number, and the size of the roster.
+    """
+    pages = {}
+    sizes = []
+
+    def fetch(nr):
+        page = mlist.get_member_page(bulk.PAGE_SIZE, nr)
+        pages[nr] = [_entry(member) for member in page]
+        sizes.append(page.total_size)
+    for nr, error in utils.run_concurrently(fetch, numbers):
+        if error is not None:
+            raise MailmanApiError(error)
+    return pages, max(sizes) if sizes else 0
+
+
+def _page_count(total_size):
+    return -(-total_size // bulk.PAGE_SIZE)
+
+
+def _merge(pages):
+    entries = []
+    seen = set()
+    for nr in sorted(pages):
+        for entry in pages[nr]:
+            if entry['email'].lower() not in seen:
+                seen.add(entry['email'].lower())
+                entries.append(entry)
+    return entries
+
+
+def _refresh(mlist, state, pages):
+    refresh = getattr(settings, 'POSTORIUS_MEMBER_INDEX_REFRESH_PAGES', 2)
+    numbers = [(state['cursor'] - 1 + i) % state['pages'] + 1
+               for i in range(min(refresh, state['pages']))]
+    try:
+        fetched, total_size = _fetch_pages(mlist, numbers)
+        count = _page_count(total_size)
+        if count > state['pages']:
+            added, total_size = _fetch_pages(
+                mlist, range(state['pages'] + 1, count + 1))
+            fetched.update(added)
+    except MailmanApiError as e:
+        logger.warning('Could not refresh the member index of %s: %s',
+                       mlist.list_id, e)
+        return pages
+    pages.update(fetched)
+    for nr in list(pages):
+        if nr > count:
+            del pages[nr]
+    state.update(pages=count, total=total_size,
+                 cursor=numbers[-1] % max(count, 1) + 1)
+    cache.store_member_index(mlist.list_id, state, fetched)
+    return pages
+
+
+def get_entries(mlist):
+    """Return all members of `mlist` as dicts of `FIELDS`, from the member
+    index for large lists.
+    """
+    state, pages = cache.get_member_index(mlist.list_id)
+    if state is not None and state['pages'] and \
+            len(pages) == state['pages']:
+        return _merge(_refresh(mlist, state, pages))
+    first = mlist.get_member_page(bulk.PAGE_SIZE, 1)
+    pages, total_size = _fetch_pages(
+        mlist, range(2, _page_count(first.total_size) + 1))
+    pages[1] = [_entry(member) for member in first]
+    total_size = max(total_size, first.total_size)
+    if total_size > getattr(settings, 'POSTORIUS_MEMBER_INDEX_THRESHOLD',
+                            1000):
+        state = dict(version=int(time.time() * 1000), total=total_size,
+                     pages=len(pages), cursor=1)
+        cache.store_member_index(mlist.list_id, state, pages)
+    return _merge(pages)
+
+
+def browse(mlist, page=1, count=None, query='', sort=''):
+    """Return page `page` of `count` members of `mlist` whose address
+    contains `query`, sorted by `sort` (see `SORTS`).
+    """
+    if count is None:
+        count = get_page_sizes()[0]
+    if not query and not sort:
+        member_page = mlist.get_member_page(count, page)
+        return MemberPage(member_page, page, count, member_page.total_size)
+    entries = get_entries(mlist)
+    if query:
+        query = query.lower()
+        entries = [entry for entry in entries
+                   if query in entry['email'].lower()]
+    if sort:
+        field = sort.lstrip('-')
+        entries.sort(key=lambda entry: entry[field].lower(),
+                     reverse=sort.startswith('-'))
+    start = (page - 1) * count
+    return MemberPage(entries[start:start + count], page, count,
+                      len(entries))
+
+
+def discard(list_id, email):
+    """Remove an unsubscribed address from the member index of a list."""
+    state, pages = cache.get_member_index(list_id)
+    if state is None:
+        return
+    changed = {}
+    for nr, entries in pages.items():
+        kept = [entry for entry in entries
+                if entry['email'].lower() != email.lower()]
+        if len(kept) != len(entries):
+            changed[nr] = kept
+    if changed:
+        state['total'] -= 1
+        cache.store_member_index(list_id, state, changed)
+
+
+def invalidate(list_id):
+    """Drop the member index of a list, it is rebuilt when needed."""
+    cache.invalidate_member_index(list_id)
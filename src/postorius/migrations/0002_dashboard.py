@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminTasks',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('task_id', models.CharField(max_length=50, null=True)),
+                ('task_type', models.CharField(max_length=20)),
+                ('made_on', models.DateTimeField()),
+                ('user_email', models.EmailField(max_length=254)),
+                ('list_id', models.CharField(max_length=50)),
+                ('priority', models.IntegerField(default=-2)),
+                ('msg_subject', models.CharField(default=-1, max_length=100)),
+                ('msg_data', models.CharField(default=-1, max_length=10000)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EventTracker',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('user_email', models.EmailField(max_length=254)),
+                ('event_op', models.EmailField(max_length=254)),
+                ('event', models.CharField(max_length=15)),
+                ('list_id', models.CharField(max_length=50)),
+                ('made_on', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskCalender',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('on_date', models.DateField()),
+                ('list_id', models.CharField(max_length=50)),
+                ('log_type', models.CharField(max_length=20)),
+                ('log_number', models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskSyncMark',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('list_id', models.CharField(max_length=50)),
+                ('task_type', models.CharField(max_length=20)),
+                ('synced_on', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='tasksyncmark',
+            unique_together=set([('list_id', 'task_type')]),
+        ),
+    ]
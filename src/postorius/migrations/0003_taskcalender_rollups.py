@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def merge_duplicate_logs(apps, schema_editor):
+    """Add up logs which were created twice for the same day."""
+    TaskCalender = apps.get_model('postorius', 'TaskCalender')
+    seen = {}
+    for log in TaskCalender.objects.order_by('id'):
+        key = (log.on_date, log.list_id, log.log_type)
+        if key in seen:
+            first = seen[key]
+            first.log_number += log.log_number
+            first.save()
+            log.delete()
+        else:
+            seen[key] = log
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0002_dashboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcalender',
+            name='period',
+            field=models.CharField(default='day', max_length=5),
+        ),
+        migrations.RunPython(merge_duplicate_logs,
+                             migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='taskcalender',
+            unique_together=set([('on_date', 'list_id', 'log_type')]),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def delete_duplicate_tasks(apps, schema_editor):
+    """Keep only the oldest of tasks which were created twice."""
+    AdminTasks = apps.get_model('postorius', 'AdminTasks')
+    seen = set()
+    duplicates = []
+    for task in AdminTasks.objects.order_by('id').values_list(
+            'id', 'task_type', 'list_id', 'task_id'):
+        if task[1:] in seen:
+            duplicates.append(task[0])
+        seen.add(task[1:])
+    for start in range(0, len(duplicates), 500):
+        AdminTasks.objects.filter(
+            id__in=duplicates[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0003_taskcalender_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='addressconfirmationprofile',
+            name='activation_key',
+            field=models.CharField(unique=True, max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='addressconfirmationprofile',
+            name='email',
+            field=models.EmailField(max_length=254, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='admintasks',
+            name='task_id',
+            field=models.CharField(max_length=50, null=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='eventtracker',
+            name='made_on',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.RunPython(delete_duplicate_tasks,
+                             migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='admintasks',
+            unique_together=set([('task_type', 'list_id', 'task_id')]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0004_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='eventtracker',
+            index_together=set([('list_id', 'made_on')]),
+        ),
+    ]
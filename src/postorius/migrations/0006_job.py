@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('postorius', '0005_eventtracker_list_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('kind', models.CharField(max_length=50)),
+                ('list_id', models.CharField(max_length=100, blank=True)),
+                ('arguments', models.TextField(default='{}')),
+                ('status', models.CharField(default='queued', max_length=10, choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')])),
+                ('progress', models.IntegerField(default=0)),
+                ('total', models.IntegerField(null=True, blank=True)),
+                ('result', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_on', models.DateTimeField()),
+                ('started_on', models.DateTimeField(null=True, blank=True)),
+                ('finished_on', models.DateTimeField(null=True, blank=True)),
+                ('owner', models.ForeignKey(blank=True, to=settings.AUTH_USER_MODEL, null=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='job',
+            index_together=set([('status', 'created_on')]),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('kind', models.CharField(max_length=10, choices=[('list', 'List'), ('domain', 'Domain'), ('person', 'Person')])),
+                ('key', models.CharField(max_length=254)),
+                ('list_id', models.CharField(max_length=100, blank=True)),
+                ('label', models.CharField(max_length=254, blank=True)),
+                ('term', models.CharField(max_length=254)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('token', models.CharField(max_length=100)),
+                ('entry', models.ForeignKey(related_name='tokens', to='postorius.SearchEntry')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchentry',
+            unique_together=set([('kind', 'list_id', 'key')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='searchentry',
+            index_together=set([('kind', 'term')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='searchtoken',
+            index_together=set([('token', 'entry')]),
+        ),
+    ]
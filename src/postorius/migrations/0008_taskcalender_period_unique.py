@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='taskcalender',
+            unique_together=set([('on_date', 'list_id', 'log_type', 'period')]),
+        ),
+    ]
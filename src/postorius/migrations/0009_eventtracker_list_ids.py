@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def normalize_list_ids(apps, schema_editor):
+    """Store the events logged with a fqdn listname under the list id."""
+    EventTracker = apps.get_model('postorius', 'EventTracker')
+    events = EventTracker.objects.filter(list_id__contains='@')
+    for list_id in set(events.values_list('list_id', flat=True)):
+        events.filter(list_id=list_id).update(
+            list_id=list_id.replace('@', '.'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0008_taskcalender_period_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_list_ids,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0009_eventtracker_list_ids'),
+    ]
+
+    operations = [
+        migrations.RenameModel('TaskSyncMark', 'TaskSyncTime'),
+    ]
@@ -19,24 +19,35 @@ from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
 
+import collections
+import json
 import random
 import hashlib
 import logging
+import re
+import threading
+
+from functools import reduce
+from operator import or_
 
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ImproperlyConfigured
 from django.core.mail import send_mail
+from django.core.signals import request_started, request_finished
 from django.db.models.signals import post_save
 from django.core.urlresolvers import reverse
 from django.dispatch import receiver
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Max, Q
 from django.http import Http404
 from django.template import Context
 from django.template.loader import get_template
+from django.utils.dateparse import parse_datetime
 from mailmanclient import MailmanConnectionError
-from postorius.utils import get_client
+from postorius import cache
+from postorius.utils import call_api, get_client
 try:
     from urllib2 import HTTPError
 except ImportError:
@@ -61,6 +72,29 @@ def create_mailman_user(sender, **kwargs):
             except HTTPError:
                 pass
 
+
+class _RequestCache(threading.local):
+    """Per-thread identity map of the REST resources fetched while
+    handling the current request. `objects` is None outside of requests.
+    """
+
+    def __init__(self):
+        self.objects = None
+
+
+_request_cache = _RequestCache()
+
+
+@receiver(request_started)
+def start_request_cache(sender, **kwargs):
+    _request_cache.objects = {}
+
+
+@receiver(request_finished)
+def clear_request_cache(sender, **kwargs):
+    _request_cache.objects = None
+
+
 class MailmanApiError(Exception):
     """Raised if the API is not available.
     """
@@ -75,15 +109,43 @@ class Mailman404Error(Exception):
 class MailmanRestManager(object):
     """Manager class to give a model class CRUD access to the API.
     Returns objects (or lists of objects) retrived from the API.
+
+    While a request is being handled, every resource is fetched at most
+    once: results of `all` and `get` are kept until the request ends (or
+    until `create` adds a new resource of the same kind).
     """
 
     def __init__(self, resource_name, resource_name_plural, cls_name=None):
         self.resource_name = resource_name
         self.resource_name_plural = resource_name_plural
 
+    def _memoize(self, key, fetch):
+        """Return the result of `fetch()`, reusing the result of an
+        earlier call with the same `key` in the current request.
+        """
+        cache = _request_cache.objects
+        if cache is None:
+            return fetch()
+        key = (self.resource_name,) + key
+        if key not in cache:
+            cache[key] = fetch()
+        return cache[key]
+
+    def _forget(self):
+        """Drop all resources of this kind cached for the current request.
+        """
+        cache = _request_cache.objects
+        if cache:
+            for key in list(cache.keys()):
+                if key[0] == self.resource_name:
+                    del cache[key]
+
+    def _get_all(self):
+        return getattr(get_client(), self.resource_name_plural)
+
     def all(self):
         try:
-            return getattr(get_client(), self.resource_name_plural)
+            return self._memoize(('all',), self._get_all)
         except AttributeError:
             raise MailmanApiError
         except MailmanConnectionError as e:
@@ -92,7 +154,8 @@ class MailmanRestManager(object):
     def get(self, **kwargs):
         try:
             method = getattr(get_client(), 'get_' + self.resource_name)
-            return method(**kwargs)
+            return self._memoize(('get', tuple(sorted(kwargs.items()))),
+                                 lambda: method(**kwargs))
         except AttributeError as e:
             raise MailmanApiError(e)
         except HTTPError as e:
@@ -116,7 +179,9 @@ class MailmanRestManager(object):
     def create(self, **kwargs):
         try:
             method = getattr(get_client(), 'create_' + self.resource_name)
-            return method(**kwargs)
+            resource = method(**kwargs)
+            self._forget()
+            return resource
         except AttributeError as e:
             raise MailmanApiError(e)
         except HTTPError as e:
@@ -139,22 +204,216 @@ class MailmanListManager(MailmanRestManager):
     def __init__(self):
         super(MailmanListManager, self).__init__('list', 'lists')
 
+    def _get_index_entry(self, mlist):
+        list_settings = mlist.settings
+        return dict(list_id=mlist.list_id,
+                    fqdn_listname=mlist.fqdn_listname,
+                    display_name=mlist.display_name or '',
+                    mail_host=mlist.mail_host,
+                    advertised=list_settings.get('advertised', False),
+                    description=list_settings.get('description', ''))
+
+    def _get_stored_index(self):
+        """Return the list index of the current request, which starts out
+        as the cached index if that is enabled (see `postorius.cache`).
+        """
+        return self._memoize(('index',), cache.get_list_index)
+
+    def get_index(self, objects, complete=True):
+        """Return the index entries of the given lists (their names, the
+        `advertised` flag and the `description`), in a dict keyed by list
+        id.
+
+        Only the settings of lists which are new to the index need to be
+        fetched. If `objects` are all existing lists (`complete`), entries
+        of deleted lists are dropped from the index.
+        """
+        stored = self._get_stored_index()
+        index = stored['lists']
+        current = {}
+        for obj in objects:
+            entry = index.get(obj.list_id)
+            if entry is None:
+                entry = self._get_index_entry(obj)
+            current[obj.list_id] = entry
+        if complete:
+            if current != index or not stored['complete']:
+                stored.update(lists=dict(current), complete=True)
+                cache.store_list_index(stored)
+        elif any(list_id not in index for list_id in current):
+            index.update(current)
+            cache.store_list_index(stored)
+        return current
+
+    def get_index_entries(self):
+        """Return the index entries of all lists.
+
+        If the index holds all lists, no API call is made, otherwise the
+        lists are fetched to complete it.
+        """
+        stored = self._get_stored_index()
+        if stored['complete']:
+            return list(stored['lists'].values())
+        return list(self.get_index(self.all()).values())
+
+    def refresh_index(self, mlist=None):
+        """Update the index entry of `mlist` or rebuild the whole index.
+        """
+        stored = self._get_stored_index()
+        if mlist is None:
+            stored.update(lists=dict((obj.list_id, self._get_index_entry(obj))
+                                     for obj in self.all()),
+                          complete=True)
+        else:
+            stored['lists'][mlist.list_id] = self._get_index_entry(mlist)
+        cache.store_list_index(stored)
+
+    def forget_index(self, list_id):
+        """Remove a deleted list from the index."""
+        stored = self._get_stored_index()
+        if stored['lists'].pop(list_id, None) is not None:
+            cache.store_list_index(stored)
+
     def all(self, only_public=False):
         try:
-            objects = getattr(get_client(), self.resource_name_plural)
+            objects = self._memoize(('all',), self._get_all)
         except AttributeError:
             raise MailmanApiError
         except MailmanConnectionError as e:
             raise MailmanApiError(e)
         if only_public:
+            index = self.get_index(objects)
             public = []
             for obj in objects:
-                if obj.settings.get('advertised', False):
+                if index[obj.list_id]['advertised']:
                     public.append(obj)
             return public
         else:
             return objects
 
+    def get_page(self, count=50, page=1):
+        """Return one page of all lists, in the order of the REST API
+        (by list id).
+        """
+        try:
+            return self._memoize(
+                ('page', count, page),
+                lambda: get_client().get_list_page(count, page))
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+
+    def _find_members(self, **criteria):
+        """Return the memberships matching `criteria` (see the
+        ``members/find`` resource of the API), fetched once per request.
+        """
+        def fetch():
+            response, content = call_api('members/find', data=criteria)
+            return content.get('entries', [])
+        try:
+            return self._memoize(('find',) + tuple(sorted(criteria.items())),
+                                 fetch)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+
+    def get_user_roles(self, address, objects=None):
+        """Return the ids of the lists `address` owns and moderates, as a
+        dict of sets keyed by role, only among the lists `objects` if
+        given.
+
+        The memberships are found with one query per role, whatever the
+        number and size of the lists, and cached together with the
+        rosters (see `postorius.cache`).
+        """
+        roles = cache.get_user_roles(address)
+        if roles is None:
+            roles = {}
+            for role in ('owner', 'moderator'):
+                roles[role] = set(
+                    entry['list_id'] for entry
+                    in self._find_members(subscriber=address, role=role))
+            cache.store_user_roles(address, roles)
+        if objects is not None:
+            list_ids = set(obj.list_id for obj in objects)
+            roles = dict((role, ids & list_ids)
+                         for role, ids in roles.items())
+        return roles
+
+    def _has_role(self, list_id, role, address):
+        try:
+            call_api('lists/{0}/{1}/{2}'.format(list_id, role, address))
+        except HTTPError as e:
+            if e.code == 404:
+                return False
+            raise
+        return True
+
+    def get_roles(self, list_id, address):
+        """Return the set of roles (owner, moderator) `address` holds on a
+        list.
+
+        Each role is looked up with the member resource of the address in
+        that role, so this doesn't depend on the size of the rosters. The
+        result is cached together with the rosters (see
+        `postorius.cache`).
+        """
+        list_id = list_id.replace('@', '.')
+
+        def fetch():
+            roles = cache.get_roles(address, list_id)
+            if roles is None:
+                roles = set(role for role in ('owner', 'moderator')
+                            if self._has_role(list_id, role, address))
+                cache.store_roles(address, list_id, roles)
+            return roles
+        try:
+            return self._memoize(('roles', list_id, address), fetch)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+
+    def get_subscribed_address(self, list_id, addresses):
+        """Return the address with which a user is a member of a list, or
+        None.
+
+        `addresses` are the addresses of the user. The ``members/find``
+        resource of Mailman 3.0 only matches subscribers by address, so
+        they are looked up one after the other, until a subscription is
+        found, so the preferred address should come first. Each lookup is
+        one query of the API, however large the roster is. The result is
+        kept for the request.
+        """
+        addresses = tuple(addresses)
+
+        def fetch():
+            for address in addresses:
+                for entry in self._find_members(
+                        subscriber=address, list_id=list_id, role='member'):
+                    return entry['email']
+            return None
+        return self._memoize(('subscribed', list_id) + addresses, fetch)
+
+    def _get_pending_request(self, path):
+        try:
+            response, content = call_api(path)
+        except HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        return content
+
+    def get_held_message(self, list_id, request_id):
+        """Return a single held message of a list, or None if it is no
+        longer held. Unlike `held` this doesn't fetch the whole queue.
+        """
+        return self._get_pending_request('lists/{0}/held/{1}'.format(
+            list_id, request_id))
+
+    def get_request(self, list_id, token):
+        """Return a single subscription request of a list, or None."""
+        return self._get_pending_request('lists/{0}/requests/{1}'.format(
+            list_id.replace('@', '.'), token))
+
     def by_mail_host(self, mail_host, only_public=False):
         objects = self.all(only_public)
         host_objects = []
@@ -239,8 +498,8 @@ class AddressConfirmationProfile(models.Model):
     Profile model for temporarily storing an activation key to register
     an email address.
     """
-    email = models.EmailField()
-    activation_key = models.CharField(max_length=40)
+    email = models.EmailField(db_index=True)
+    activation_key = models.CharField(max_length=40, unique=True)
     created = models.DateTimeField()
     user = models.ForeignKey(User)
 
@@ -321,36 +580,195 @@ class AdminTasksManager(models.Manager):
     Manager Class for Admin Tasks.
     """
 
-    def create_task(self, task_id, task_type, stamp, user_email, list_id):
-        if task_type == 'moderation':
-            lists = List().objects.all()
-            msg = [each_msg for each_list in lists for each_msg in each_list.held if each_msg['request_id'] == task_id][0]
+    def create_task(self, task_id, task_type, stamp, user_email, list_id,
+                    msg_subject=None, msg_data=None):
+        """Create a task. The subject and body of a held message are
+        looked up in the held queue of its list unless they are given.
+        """
+        if task_type == 'moderation' and msg_subject is None:
+            the_list = List.objects.get(fqdn_listname=list_id)
+            msg = [each_msg for each_msg in the_list.held
+                   if '{0}'.format(each_msg['request_id']) ==
+                   '{0}'.format(task_id)][0]
             msg_subject = msg['subject']
             msg_data = msg['msg']
-            task = self.create(task_id=task_id,
-                               task_type=task_type,
-                               made_on=stamp,
-                               user_email=user_email,
-                               list_id=list_id,
-                               msg_subject=msg_subject,
-                               msg_data=msg_data)
-        else:
-            task = self.create(task_id=task_id,
-                               task_type=task_type,
-                               made_on=stamp,
-                               user_email=user_email,
-                               list_id=list_id)
-        return task
+        fields = dict(task_id=task_id,
+                      task_type=task_type,
+                      made_on=stamp,
+                      user_email=user_email,
+                      list_id=list_id)
+        if msg_subject is not None:
+            fields['msg_subject'] = msg_subject
+        if msg_data is not None:
+            fields['msg_data'] = msg_data
+        return self.create(**fields)
+
+    def create_manual_task(self, user_email, msg_subject, msg_data):
+        """Create a manual task. Manual tasks are numbered downwards from
+        -1, so their ids never clash with the ids of requests.
+        """
+        while True:
+            task_ids = self.filter(task_type='manual').values_list(
+                'task_id', flat=True)
+            task_id = min([int(each) for each in task_ids] + [0]) - 1
+            try:
+                with transaction.atomic():
+                    return self.create_task(
+                        task_id='{0}'.format(task_id), task_type='manual',
+                        stamp=datetime.now(), list_id='',
+                        user_email=user_email, msg_subject=msg_subject,
+                        msg_data=msg_data)
+            except IntegrityError:
+                # The id was taken concurrently, try the next one.
+                continue
 
     def get_count(self, task_type):
-        return len(self.filter(task_type=task_type))
+        return self.filter(task_type=task_type).count()
+
+    def get_sender(self, task_type, list_id, task_id):
+        """Return the sender of the request behind a task, or None if
+        there is no such task.
+        """
+        return self.filter(
+            task_type=task_type, list_id=list_id.replace('@', '.'),
+            task_id='{0}'.format(task_id)).values_list(
+                'user_email', flat=True).first()
+
+    def get_senders(self, task_type, list_id, task_ids):
+        """Return the senders of the requests behind many tasks of a list,
+        in a dict keyed by task id.
+        """
+        task_ids = ['{0}'.format(task_id) for task_id in task_ids]
+        tasks = self.filter(task_type=task_type,
+                            list_id=list_id.replace('@', '.'))
+        senders = {}
+        for start in range(0, len(task_ids), 500):
+            senders.update(tasks.filter(
+                task_id__in=task_ids[start:start + 500]).values_list(
+                    'task_id', 'user_email'))
+        return senders
+
+    def delete_tasks(self, task_type, list_id, task_ids):
+        """Delete the tasks of requests which were handled."""
+        task_ids = ['{0}'.format(task_id) for task_id in task_ids]
+        tasks = self.filter(task_type=task_type,
+                            list_id=list_id.replace('@', '.'))
+        for start in range(0, len(task_ids), 500):
+            tasks.filter(task_id__in=task_ids[start:start + 500]).delete()
+
+    def _get_pending(self, mlist, task_type):
+        """Return the pending requests of `task_type` of a list, keyed by
+        (list_id, task_id).
+        """
+        pending = {}
+        if task_type == 'moderation':
+            for msg in mlist.held:
+                key = (mlist.list_id, '{0}'.format(msg['request_id']))
+                pending[key] = dict(made_on=parse_datetime(msg['hold_date']),
+                                    user_email=msg['sender'],
+                                    msg_subject=msg['subject'],
+                                    msg_data=msg['msg'])
+        else:
+            for req in mlist.requests:
+                key = (mlist.list_id, '{0}'.format(req['token']))
+                pending[key] = dict(
+                    made_on=parse_datetime(req['request_date']),
+                    user_email=req['email'])
+        return pending
+
+    def sync(self, lists, task_type):
+        """Synchronise the tasks of `task_type` with the pending requests
+        of `lists` and return the tasks which were created.
+
+        Tasks are identified by (list_id, task_id): requests without a
+        task are added and tasks of requests which are gone are deleted,
+        in bulk and in one transaction. The synchronisation is throttled:
+        lists which were synchronised less than
+        ``POSTORIUS_TASK_SYNC_INTERVAL`` seconds ago (default: 60) are
+        skipped, so requests made outside of Postorius may show up that
+        much later:
+
+            >>> POSTORIUS_TASK_SYNC_INTERVAL = 60
+
+        """
+        interval = getattr(settings, 'POSTORIUS_TASK_SYNC_INTERVAL', 60)
+        now = datetime.now()
+        last_synced = dict(TaskSyncTime.objects.filter(
+            task_type=task_type).values_list('list_id', 'synced_on'))
+        pending = {}
+        synced = set()
+        for mlist in lists:
+            synced_on = last_synced.get(mlist.list_id)
+            if synced_on is not None and \
+                    synced_on > now - timedelta(seconds=interval):
+                continue
+            pending.update(self._get_pending(mlist, task_type))
+            synced.add(mlist.list_id)
+        if not synced:
+            return []
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    return self._sync(pending, synced, task_type, now)
+            except IntegrityError:
+                # Another request synchronised some of the lists
+                # concurrently, try again with the tasks it created.
+                logger.info('Concurrent sync of %s tasks', task_type)
+        logger.warning('Could not sync the %s tasks of %s lists',
+                       task_type, len(synced))
+        return []
+
+    def _sync(self, pending, synced, task_type, now):
+        synced = sorted(synced)
+        existing = set()
+        sync_ids = {}
+        for start in range(0, len(synced), 500):
+            list_ids = synced[start:start + 500]
+            existing.update(self.filter(
+                task_type=task_type, list_id__in=list_ids).values_list(
+                    'list_id', 'task_id'))
+            sync_ids.update(TaskSyncTime.objects.filter(
+                task_type=task_type, list_id__in=list_ids).values_list(
+                    'list_id', 'pk'))
+        new = set(pending) - existing
+        stale = {}
+        for list_id, task_id in existing - set(pending):
+            stale.setdefault(list_id, []).append(task_id)
+        last_id = self.aggregate(last_id=Max('id'))['last_id'] or 0
+        self.bulk_create([
+            AdminTasks(task_type=task_type, list_id=list_id,
+                       task_id=task_id, **pending[(list_id, task_id)])
+            for list_id, task_id in sorted(
+                new, key=lambda key: pending[key]['made_on'])])
+        if stale:
+            self.filter(reduce(or_, [
+                Q(list_id=list_id, task_id__in=task_ids)
+                for list_id, task_ids in stale.items()]),
+                task_type=task_type).delete()
+        # Record when the lists were synchronised.
+        pks = list(sync_ids.values())
+        for start in range(0, len(pks), 500):
+            TaskSyncTime.objects.filter(
+                pk__in=pks[start:start + 500]).update(synced_on=now)
+        TaskSyncTime.objects.bulk_create([
+            TaskSyncTime(list_id=list_id, task_type=task_type, synced_on=now)
+            for list_id in synced if list_id not in sync_ids])
+        return [task for task in self.filter(
+                    id__gt=last_id, task_type=task_type).order_by('id')
+                if (task.list_id, task.task_id) in new]
+
+    def expire_sync(self, list_id):
+        """Make the next `sync` look at the pending requests of a list,
+        e.g. after a subscription request was made through Postorius.
+        """
+        TaskSyncTime.objects.filter(list_id=list_id).delete()
 
 
 class AdminTasks(models.Model):
     """
     Tasks Model for Storing list of pending Admin Tasks.
     """
-    task_id = models.CharField(max_length=50, null=True)
+    task_id = models.CharField(max_length=50, null=True, db_index=True)
     task_type = models.CharField(max_length=20)
     made_on = models.DateTimeField()
     user_email = models.EmailField()
@@ -361,6 +779,9 @@ class AdminTasks(models.Model):
 
     objects = AdminTasksManager()
 
+    class Meta:
+        unique_together = ('task_type', 'list_id', 'task_id')
+
     def __unicode__(self):
         user_email = self.user_email.split('@')[0].capitalize()
         list_id = self.list_id.split('.')[0].capitalize()
@@ -373,24 +794,122 @@ class AdminTasks(models.Model):
 
     @property
     def get_date(self):
-        return AdminTasks.objects.get(task_id=self.task_id).made_on
+        return self.made_on
+
+
+class TaskSyncTime(models.Model):
+    """
+    Time of the last task synchronisation of a list, which throttles the
+    synchronisation (see `AdminTasksManager.sync`).
+    """
+    list_id = models.CharField(max_length=50)
+    task_type = models.CharField(max_length=20)
+    synced_on = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('list_id', 'task_type')
+
+    def __unicode__(self):
+        return u'{0} tasks of {1} synced on {2}'.format(
+            self.task_type, self.list_id, self.synced_on)
 
 
 class EventTrackerManager(models.Manager):
     """
     Manager Class for Event Tracker.
+
+    The event log is capped: only the newest events are kept, either for
+    the whole site or, with ``POSTORIUS_EVENT_LOG_PER_LIST``, for every
+    list. Events can also expire after a number of days:
+
+        >>> POSTORIUS_EVENT_LOG_SIZE = 30
+        >>> POSTORIUS_EVENT_LOG_PER_LIST = False
+        >>> POSTORIUS_EVENT_LOG_MAX_AGE = None
     """
 
     def create_event(self, user_email, event_op, event, list_id, made_on):
+        """Create an event. Events are stored under the list id, also if
+        `list_id` is the fqdn listname.
+        """
         event = self.create(user_email=user_email,
                             event_op=event_op,
                             event=event,
-                            list_id=list_id,
+                            list_id=list_id.replace('@', '.'),
                             made_on=made_on,)
         return event
 
     def get_count(self):
-        return len(self.all())
+        return self.count()
+
+    def get_log_size(self):
+        return getattr(settings, 'POSTORIUS_EVENT_LOG_SIZE', 30)
+
+    def log_event(self, user_email, event_op, event, list_id, made_on=None):
+        """Add an event to the log and trim the log to its retention."""
+        event = self.create_event(user_email=user_email,
+                                  event_op=event_op,
+                                  event=event,
+                                  list_id=list_id,
+                                  made_on=made_on or datetime.now())
+        self.trim(event.list_id)
+        return event
+
+    def log_events(self, events):
+        """Add many unsaved events to the log at once and trim it."""
+        size = self.get_log_size()
+        if size:
+            events = events[-size:]
+        for event in events:
+            event.list_id = event.list_id.replace('@', '.')
+        self.bulk_create(events)
+        if getattr(settings, 'POSTORIUS_EVENT_LOG_PER_LIST', False):
+            for list_id in set(event.list_id for event in events):
+                self.trim(list_id)
+        else:
+            self.trim()
+
+    def trim(self, list_id=None):
+        """Delete the events beyond the retention of the log in a single
+        statement.
+
+        The log isn't counted: the oldest event to keep marks the cutoff,
+        so a log which grew too large by concurrent writes shrinks back
+        to its size. In per list mode only the log of
+        `list_id` is trimmed.
+        """
+        events = self.all()
+        if getattr(settings, 'POSTORIUS_EVENT_LOG_PER_LIST', False):
+            if list_id is None:
+                return
+            events = events.filter(list_id=list_id)
+        expired = []
+        size = self.get_log_size()
+        if size:
+            cutoff = events.order_by('-made_on', '-id').values_list(
+                'made_on', 'id')[size - 1:size]
+            if cutoff:
+                made_on, pk = cutoff[0]
+                expired.append(Q(made_on__lt=made_on) |
+                               Q(made_on=made_on, id__lt=pk))
+        max_age = getattr(settings, 'POSTORIUS_EVENT_LOG_MAX_AGE', None)
+        if max_age:
+            expired.append(
+                Q(made_on__lt=datetime.now() - timedelta(days=max_age)))
+        if expired:
+            events.filter(reduce(or_, expired)).delete()
+
+    def recent(self, list_ids=None, since=None, until=None):
+        """Return the events of the given lists and time window, newest
+        first.
+        """
+        events = self.order_by('-made_on', '-id')
+        if list_ids is not None:
+            events = events.filter(list_id__in=list_ids)
+        if since is not None:
+            events = events.filter(made_on__gte=since)
+        if until is not None:
+            events = events.filter(made_on__lt=until)
+        return events
 
 
 class EventTracker(models.Model):
@@ -401,9 +920,12 @@ class EventTracker(models.Model):
     event_op = models.EmailField()
     event = models.CharField(max_length=15)
     list_id = models.CharField(max_length=50)
-    made_on = models.DateTimeField()
+    made_on = models.DateTimeField(db_index=True)
     objects = EventTrackerManager()
 
+    class Meta:
+        index_together = [('list_id', 'made_on')]
+
     def __unicode__(self):
         user_name = self.user_email.split('@')[0].capitalize()
         event_op = self.event_op.split('@')[0].capitalize()
@@ -417,6 +939,16 @@ class EventTracker(models.Model):
             return u'{0} {1} {2} Subscription request in {3}'.format(event_op, event, user_name, list_name)
 
 
+def _get_period_start(day, period):
+    if period == 'week':
+        # Weeks are split where a month starts, so that every week can be
+        # rolled up into a single month.
+        return max(day - timedelta(days=day.weekday()), day.replace(day=1))
+    elif period == 'month':
+        return day.replace(day=1)
+    return day
+
+
 class TaskCalenderManager(models.Manager):
     """
     Manager Class for Task Calender.
@@ -429,17 +961,312 @@ class TaskCalenderManager(models.Manager):
                           log_number=log_number)
         return log
 
+    def increment(self, on_date, list_id, log_type, count=1, period='day'):
+        """Add `count` to the log of a day (or of the week or month it
+        was rolled up into), creating the log if necessary.
+        """
+        logs = self.filter(on_date=on_date, list_id=list_id,
+                           log_type=log_type, period=period)
+        if logs.update(log_number=F('log_number') + count):
+            return
+        try:
+            with transaction.atomic():
+                self.create(on_date=on_date, list_id=list_id,
+                            log_type=log_type, log_number=count,
+                            period=period)
+        except IntegrityError:
+            # The log was created concurrently.
+            logs.update(log_number=F('log_number') + count)
+
+    def compact(self, period, before):
+        """Roll the logs of the next smaller period dated before `before`
+        up into logs of `period` ('week' or 'month').
+
+        Only whole weeks or months are rolled up, so the log of a week
+        (month) is dated on its first day. Weeks which span two months
+        are split in two at the start of the second month.
+        """
+        source = dict(week='day', month='week')[period]
+        before = _get_period_start(before, period)
+        logs = self.filter(period=source, on_date__lt=before)
+        totals = collections.Counter()
+        for log in logs.values('on_date', 'list_id', 'log_type',
+                               'log_number'):
+            totals[(_get_period_start(log['on_date'], period),
+                    log['list_id'], log['log_type'])] += log['log_number']
+        with transaction.atomic():
+            logs.delete()
+            for (on_date, list_id, log_type), count in totals.items():
+                self.increment(on_date, list_id, log_type, count, period)
+        return len(totals)
+
 
 class TaskCalender(models.Model):
     """
     Model For Collecting Monthly Task Data.
+
+    Logs count the tasks of a list per day. Older logs are rolled up into
+    logs per week and per month (see `TaskCalenderManager.compact`).
     """
     on_date = models.DateField()
     list_id = models.CharField(max_length=50)
     log_type = models.CharField(max_length=20)
     log_number = models.IntegerField()
+    period = models.CharField(max_length=5, default='day')
 
     objects = TaskCalenderManager()
 
+    class Meta:
+        unique_together = ('on_date', 'list_id', 'log_type', 'period')
+
     def __unicode__(self):
         return u'{0} Log dated {1}'.format(self.log_type, self.on_date)
+
+
+class JobManager(models.Manager):
+    """
+    Manager Class for background jobs.
+    """
+
+    def create_job(self, kind, owner=None, list_id='', arguments=None):
+        return self.create(kind=kind,
+                           owner=owner,
+                           list_id=list_id,
+                           arguments=json.dumps(arguments or {}),
+                           created_on=datetime.now())
+
+    def claim(self, job_id):
+        """Mark a queued job as running and return it, or None if it isn't
+        queued (anymore).
+
+        The status is changed with a conditional update, so concurrent
+        workers never claim the same job.
+        """
+        if self.filter(id=job_id, status='queued').update(
+                status='running', started_on=datetime.now()):
+            return self.get(id=job_id)
+        return None
+
+    def requeue_stale(self):
+        """Queue the jobs again which have been running for longer than
+        ``POSTORIUS_JOB_TIMEOUT`` seconds, e.g. because their worker died.
+        Returns the number of jobs queued again.
+        """
+        timeout = getattr(settings, 'POSTORIUS_JOB_TIMEOUT', 21600)
+        if timeout is None:
+            return 0
+        return self.filter(
+            status='running',
+            started_on__lt=datetime.now() - timedelta(seconds=timeout)
+        ).update(status='queued', started_on=None, progress=0)
+
+    def claim_next(self):
+        """Claim the oldest queued job, or return None if no job is queued.
+        Stale jobs are queued again first (see `requeue_stale`).
+        """
+        stale = self.requeue_stale()
+        if stale:
+            logger.warning('Queued %s stale job(s) again', stale)
+        while True:
+            pending = self.filter(status='queued').order_by(
+                'created_on', 'id').values_list('id', flat=True)[:1]
+            if not pending:
+                return None
+            job = self.claim(pending[0])
+            if job is not None:
+                return job
+
+
+class Job(models.Model):
+    """
+    A long-running operation, queued by a view and run by a worker (see
+    `postorius.jobs`).
+    """
+    STATUSES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50)
+    owner = models.ForeignKey(User, null=True, blank=True)
+    list_id = models.CharField(max_length=100, blank=True)
+    arguments = models.TextField(default='{}')
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default='queued')
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_on = models.DateTimeField()
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        index_together = [('status', 'created_on')]
+
+    def __unicode__(self):
+        return u'{0} job {1} ({2})'.format(self.kind, self.id, self.status)
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    def get_arguments(self):
+        return json.loads(self.arguments)
+
+    def get_result(self):
+        """Return the result of a finished job, a dict with a `summary` of
+        counts and optionally `header` and `rows` for a download.
+        """
+        if not self.result:
+            return {}
+        return json.loads(self.result,
+                          object_pairs_hook=collections.OrderedDict)
+
+    def set_progress(self, progress, total=None):
+        """Record the progress of a running job."""
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        Job.objects.filter(id=self.id).update(progress=self.progress,
+                                              total=self.total)
+
+
+SEARCH_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def tokenize(*texts):
+    """Return the lowercased words of `texts`, as indexed for search."""
+    tokens = set()
+    for text in texts:
+        tokens.update(token[:100] for token in
+                      SEARCH_TOKEN_RE.findall((text or '').lower()))
+    return tokens
+
+
+class SearchEntryManager(models.Manager):
+    """Maintains and queries the local search index (see
+    `postorius.search`).
+    """
+    CHUNK_SIZE = 500
+
+    def index(self, kind, items, list_id=''):
+        """Add or replace the entries of `kind` for `items`, a list of
+        ``(key, label)`` tuples.
+        """
+        items = list(items)
+        for start in range(0, len(items), self.CHUNK_SIZE):
+            chunk = dict(items[start:start + self.CHUNK_SIZE])
+            with transaction.atomic():
+                self.filter(kind=kind, list_id=list_id,
+                            key__in=list(chunk)).delete()
+                self.bulk_create([
+                    SearchEntry(kind=kind, key=key, list_id=list_id,
+                                label=label or '', term=key.lower())
+                    for key, label in chunk.items()])
+                ids = self.filter(kind=kind, list_id=list_id,
+                                  key__in=list(chunk)).values_list(
+                                      'key', 'id')
+                SearchToken.objects.bulk_create([
+                    SearchToken(entry_id=entry_id, token=token)
+                    for key, entry_id in ids
+                    for token in tokenize(key, chunk[key])])
+
+    def remove(self, kind, keys=None, list_id=None):
+        """Remove the entries of `kind` for `keys`, or all of them, in the
+        list `list_id` if it is given.
+        """
+        entries = self.filter(kind=kind)
+        if list_id is not None:
+            entries = entries.filter(list_id=list_id)
+        if keys is None:
+            entries.delete()
+            return
+        keys = list(keys)
+        for start in range(0, len(keys), self.CHUNK_SIZE):
+            entries.filter(
+                key__in=keys[start:start + self.CHUNK_SIZE]).delete()
+
+    def search(self, query, kind, list_ids=None, page=1, count=20):
+        """Return page `page` of `count` entries of `kind` matching
+        `query`, and the number of all matching entries.
+
+        Every word of the query has to be the start of a word of an
+        entry. Entries whose key equals the query come first, then those
+        whose key starts with it. `list_ids` limits the entries to these
+        lists.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+        entries = self.filter(kind=kind)
+        if list_ids is not None:
+            # Lists are entries of their own, keyed by their id.
+            field = 'key__in' if kind == 'list' else 'list_id__in'
+            entries = entries.filter(**{field: list(list_ids)})
+        for token in tokens:
+            entries = entries.filter(tokens__token__gte=token,
+                                     tokens__token__lt=token + '\uffff')
+        entries = entries.distinct().order_by('term', 'list_id')
+        term = query.strip().lower()
+        tiers = (entries.filter(term=term),
+                 entries.filter(term__startswith=term).exclude(term=term),
+                 entries.exclude(term__startswith=term))
+        start = (page - 1) * count
+        results = []
+        total = 0
+        for tier in tiers:
+            size = tier.count()
+            if len(results) < count and start < total + size:
+                offset = max(start - total, 0)
+                results.extend(tier[offset:offset + count - len(results)])
+            total += size
+        return results, total
+
+
+class SearchEntry(models.Model):
+    """
+    A list, domain or list member in the local search index.
+    """
+    KINDS = (
+        ('list', 'List'),
+        ('domain', 'Domain'),
+        ('person', 'Person'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # The list id, mail host or email address.
+    key = models.CharField(max_length=254)
+    # The list of a person, empty for lists and domains.
+    list_id = models.CharField(max_length=100, blank=True)
+    # The display name of a list or the base url of a domain.
+    label = models.CharField(max_length=254, blank=True)
+    # The lowercased key, for ranking.
+    term = models.CharField(max_length=254)
+
+    objects = SearchEntryManager()
+
+    class Meta:
+        unique_together = ('kind', 'list_id', 'key')
+        index_together = [('kind', 'term')]
+
+    def __unicode__(self):
+        return u'{0} {1}'.format(self.kind, self.key)
+
+
+class SearchToken(models.Model):
+    """
+    A word of a search index entry.
+    """
+    entry = models.ForeignKey(SearchEntry, related_name='tokens')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        index_together = [('token', 'entry')]
+
+    def __unicode__(self):
+        return self.token
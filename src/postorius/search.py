@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Local search index of lists, domains and list members.
+
+The global search of the dashboard queries the `SearchEntry` table
+instead of going through all lists and their rosters. Entries are split
+into words, which are looked up by prefix in an indexed column, so a
+search doesn't depend on the number of members.
+
+The index is filled by the ``sync_search_index`` management command:
+
+    $ django-admin.py sync_search_index
+
+and kept current by the views and jobs which create or remove lists,
+domains and subscriptions. Changes made outside of Postorius show up
+with the next sync. Search results are paged:
+
+    >>> POSTORIUS_SEARCH_PAGE_SIZE = 20
+"""
+
+from django.conf import settings
+
+from postorius import bulk
+from postorius.models import SearchEntry
+
+
+def get_page_size():
+    return getattr(settings, 'POSTORIUS_SEARCH_PAGE_SIZE', 20)
+
+
+def index_list(mlist):
+    SearchEntry.objects.index('list', [(mlist.list_id, mlist.display_name)])
+
+
+def remove_list(list_id):
+    SearchEntry.objects.remove('list', [list_id])
+    SearchEntry.objects.remove('person', list_id=list_id)
+
+
+def index_domain(mail_host, base_url):
+    SearchEntry.objects.index('domain', [(mail_host, base_url)])
+
+
+def remove_domain(mail_host):
+    """Remove a domain, together with its lists and their members."""
+    SearchEntry.objects.remove('domain', [mail_host])
+    lists = SearchEntry.objects.filter(
+        kind='list', key__endswith='.{0}'.format(mail_host))
+    for list_id in list(lists.values_list('key', flat=True)):
+        remove_list(list_id)
+
+
+def add_members(list_id, emails):
+    SearchEntry.objects.index('person',
+                              [(email.lower(), '') for email in emails],
+                              list_id)
+
+
+def remove_members(list_id, emails):
+    SearchEntry.objects.remove('person',
+                               [email.lower() for email in emails], list_id)
+
+
+def sync_members(mlist):
+    """Replace the members of `mlist` in the index with its roster, read
+    one page at a time. Returns the number of members.
+    """
+    SearchEntry.objects.remove('person', list_id=mlist.list_id)
+    count = 0
+    for page in bulk.iter_member_pages(mlist):
+        add_members(mlist.list_id, [member.email for member in page])
+        count += len(page)
+    return count
+
+
+def sync(lists, domains, members=True):
+    """Rebuild the index from `lists` and `domains`, and the rosters of the
+    lists unless `members` is False. Returns the number of entries of
+    each kind.
+    """
+    list_ids = [mlist.list_id for mlist in lists]
+    mail_hosts = [domain.mail_host for domain in domains]
+    for mail_host in set(SearchEntry.objects.filter(kind='domain')
+                         .values_list('key', flat=True)) - set(mail_hosts):
+        SearchEntry.objects.remove('domain', [mail_host])
+    for list_id in set(SearchEntry.objects.filter(kind='list')
+                       .values_list('key', flat=True)) - set(list_ids):
+        remove_list(list_id)
+    SearchEntry.objects.index('domain', [(domain.mail_host, domain.base_url)
+                                         for domain in domains])
+    SearchEntry.objects.index('list', [(mlist.list_id, mlist.display_name)
+                                       for mlist in lists])
+    counts = dict(domain=len(mail_hosts), list=len(list_ids), person=0)
+    if members:
+        for mlist in lists:
+            counts['person'] += sync_members(mlist)
+    return counts
+
+
+def search(query, kind, list_ids=None, page=1):
+    """Return a page of the entries of `kind` matching `query` and the
+    number of all matches (see `SearchEntryManager.search`).
+    """
+    return SearchEntry.objects.search(query, kind, list_ids, page,
+                                      get_page_size())
@@ -19,6 +19,7 @@ import os
 import vcr
 
 from django.conf import settings
+from django.utils.six.moves.urllib.parse import parse_qs
 
 
 TEST_ROOT = os.path.abspath(os.path.dirname(__file__))
@@ -31,6 +32,19 @@ VCR_RECORD_MODE = os.environ.get(
     'POSTORIUS_VCR_RECORD_MODE',
     getattr(settings, 'VCR_RECORD_MODE', 'once'))
 
+
+def _match_find_criteria(r1, r2):
+    """Tell queries of the members/find resource apart by their criteria,
+    as they all share one path.
+    """
+    if not r1.path.endswith('/members/find'):
+        return True
+    return parse_qs(r1.body or '') == parse_qs(r2.body or '')
+
+
 MM_VCR = vcr.VCR(
     cassette_library_dir=os.path.join(FIXTURES_DIR, 'vcr_cassettes'),
-    record_mode=VCR_RECORD_MODE)
+    record_mode=VCR_RECORD_MODE,
+    match_on=('method', 'scheme', 'host', 'port', 'path', 'query',
+              'find_criteria'))
+MM_VCR.register_matcher('find_criteria', _match_find_criteria)
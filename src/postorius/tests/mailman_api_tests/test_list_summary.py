@@ -113,5 +113,8 @@ class ListSummaryPageTest(SimpleTestCase):
         response = self.client.get(reverse('list_summary',
                                            args=('foo@example.com', )))
         self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['userSubscribed'])
+        self.assertEqual(response.context['subscribed_address'],
+                         'test@example.com')
         self.assertTrue('Change Subscription' in response.content)
         self.assertTrue('Unsubscribe' in response.content)
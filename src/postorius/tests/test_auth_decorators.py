@@ -17,6 +17,7 @@
 
 from django.contrib.auth.models import AnonymousUser, User
 from django.core.exceptions import PermissionDenied
+from django.http import Http404
 from django.test.client import RequestFactory
 from django.utils import unittest
 from mock import patch
@@ -26,6 +27,7 @@ from postorius.auth.decorators import (list_owner_required,
                                        basic_auth_login)
 from postorius.models import (Domain, List, Member, MailmanUser,
                               MailmanApiError, Mailman404Error)
+from postorius.tests.utils import mock_roles
 from mailmanclient import Client
 
 
@@ -78,32 +80,65 @@ class ListOwnerRequiredTest(unittest.TestCase):
     @patch.object(Client, 'get_list')
     def test_non_list_owner(self, mock_get_list):
         """Should raise PermissionDenied if user is not a list owner."""
-        # prepare mock list object
-        self.mock_list.owners = ['geddy@rush.it']
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get('/lists/foolist.example.org/'
                                            'settings/')
         request.user = User.objects.create_user('les c', 'les@primus.org',
                                                 'pwd')
-        self.assertRaises(PermissionDenied, dummy_function, request,
-                          list_id='foolist.example.org')
+        with mock_roles(set([('foolist.example.org', 'owner',
+                              'geddy@rush.it')])):
+            self.assertRaises(PermissionDenied, dummy_function, request,
+                              list_id='foolist.example.org')
+
+    @patch.object(Client, 'get_list')
+    def test_unknown_list(self, mock_get_list):
+        """Should raise Http404 if the list doesn't exist."""
+        mock_get_list.side_effect = Mailman404Error
+        request = self.request_factory.get('/lists/foolist.example.org/'
+                                           'settings/')
+        request.user = User.objects.create_user('les c3', 'les@primus.org',
+                                                'pwd')
+        with mock_roles(set()):
+            self.assertRaises(Http404, dummy_function, request,
+                              list_id='foolist.example.org')
+            self.assertRaises(Http404, dummy_function_mod_req, request,
+                              list_id='foolist.example.org')
 
     @patch.object(Client, 'get_list')
     def test_list_owner(self, mock_get_list):
         """Should return fn return value if user is the list owner."""
-        # prepare mock list object
-        self.mock_list.owners = ['les@primus.org']
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get('/lists/foolist.example.org/'
                                            'settings/')
         request.user = User.objects.create_user('les cl', 'les@primus.org',
                                                 'pwd')
-        return_value = dummy_function(request,
-                                      list_id='foolist.example.org')
+        with mock_roles(set([('foolist.example.org', 'owner',
+                              'les@primus.org')])):
+            return_value = dummy_function(request,
+                                          list_id='foolist.example.org')
         self.assertEqual(return_value, True)
 
+    @patch.object(Client, 'get_list')
+    def test_roles_stored_on_request(self, mock_get_list):
+        """Should look up the roles only once per request."""
+        request = self.request_factory.get('/lists/foolist.example.org/'
+                                           'settings/')
+        request.user = User.objects.create_user('les c2', 'les@primus.org',
+                                                'pwd')
+        with mock_roles(set([('foolist.example.org', 'owner',
+                              'les@primus.org')])) as mock_has_role:
+            dummy_function(request, list_id='foolist.example.org')
+            dummy_function_mod_req(request, list_id='foolist.example.org')
+        # One lookup per role, neither the list nor its rosters are fetched.
+        self.assertEqual(mock_has_role.call_count, 2)
+        self.assertFalse(mock_get_list.called)
+        self.assertEqual(request.list_roles,
+                         {'foolist.example.org': set(['owner'])})
+        self.assertTrue(request.user.is_list_owner)
+        self.assertFalse(request.user.is_list_moderator)
+
 
 class ListModeratorRequiredTest(unittest.TestCase):
     """Tests the list_owner_required auth decorator."""
@@ -145,45 +180,43 @@ class ListModeratorRequiredTest(unittest.TestCase):
     @patch.object(Client, 'get_list')
     def test_non_list_moderator(self, mock_get_list):
         """Should raise PermissionDenied if user is not a list owner."""
-        # prepare mock list object
-        self.mock_list.moderators = ['geddy@rush.it']
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get('/lists/foolist.example.org/'
                                            'settings/')
         request.user = User.objects.create_user('les cl2', 'les@primus.org',
                                                 'pwd')
-        self.assertRaises(PermissionDenied, dummy_function_mod_req, request,
-                          list_id='foolist.example.org')
+        with mock_roles(set([('foolist.example.org', 'moderator',
+                              'geddy@rush.it')])):
+            self.assertRaises(PermissionDenied, dummy_function_mod_req,
+                              request, list_id='foolist.example.org')
 
     @patch.object(Client, 'get_list')
     def test_list_owner(self, mock_get_list):
         """Should return fn return value if user is the list owner."""
-        # prepare mock list object
-        self.mock_list.owners = ['les@primus.org']
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get('/lists/foolist.example.org/'
                                            'settings/')
         request.user = User.objects.create_user('les cl3', 'les@primus.org',
                                                 'pwd')
-        return_value = dummy_function_mod_req(request,
-                                              list_id=
-                                              'foolist.example.org')
+        with mock_roles(set([('foolist.example.org', 'owner',
+                              'les@primus.org')])):
+            return_value = dummy_function_mod_req(
+                request, list_id='foolist.example.org')
         self.assertEqual(return_value, True)
 
     @patch.object(Client, 'get_list')
     def test_list_moderator(self, mock_get_list):
         """Should return fn return value if user is the list moderator."""
-        # prepare mock list object
-        self.mock_list.moderators = ['les@primus.org']
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get('/lists/foolist.example.org/'
                                            'settings/')
         request.user = User.objects.create_user('les cl4', 'les@primus.org',
                                                 'pwd')
-        return_value = dummy_function_mod_req(request,
-                                              list_id=
-                                              'foolist.example.org')
+        with mock_roles(set([('foolist.example.org', 'moderator',
+                              'les@primus.org')])):
+            return_value = dummy_function_mod_req(
+                request, list_id='foolist.example.org')
         self.assertEqual(return_value, True)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import threading
+import time
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import Client, SimpleTestCase, TestCase
+from mailmanclient import Client as MailmanClient
+from mock import patch, PropertyMock
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+
+from postorius.models import AdminTasks, EventTracker
+from postorius.tests.utils import create_mock_list
+from postorius.utils import run_concurrently
+
+
+class RunConcurrentlyTest(SimpleTestCase):
+    """Tests for the bounded worker pool."""
+
+    def test_results_in_order(self):
+        def func(item):
+            if item % 3 == 0:
+                raise HTTPError('url', 404, 'Not found', None, None)
+        results = run_concurrently(func, range(10), workers=4)
+        self.assertEqual([item for item, error in results], list(range(10)))
+        self.assertEqual([item for item, error in results if error],
+                         [0, 3, 6, 9])
+
+    def test_pool_is_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def func(item):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+        with self.settings(POSTORIUS_BULK_WORKERS=3):
+            run_concurrently(func, range(12))
+        self.assertLessEqual(running[1], 3)
+
+    def test_other_errors_are_raised(self):
+        def func(item):
+            raise ValueError(item)
+        self.assertRaises(ValueError, run_concurrently, func, [1, 2])
+
+
+class BulkModerationTest(TestCase):
+    """Tests for moderating many held messages and requests at once."""
+
+    def setUp(self):
+        User.objects.create_superuser('su', 'su@example.org', 'pwd')
+        self.client = Client()
+        self.client.login(username='su', password='pwd')
+        self.mlist = create_mock_list(dict(list_id='foo.example.org',
+                                           fqdn_listname='foo@example.org'))
+        self.held = PropertyMock(return_value=[
+            dict(request_id=i, sender='user{0}@example.org'.format(i))
+            for i in range(1, 6)])
+        type(self.mlist).held = self.held
+
+        def moderate(request_id, action):
+            if request_id == '4':
+                raise HTTPError('url', 404, 'Not found', None, None)
+        self.mlist.moderate_message.side_effect = moderate
+        for task_id in ('1', '2', '3', '4', '5'):
+            AdminTasks.objects.create_task(
+                task_id=task_id, task_type='moderation', stamp=datetime.now(),
+                user_email='task{0}@example.org'.format(task_id),
+                list_id='foo.example.org', msg_subject='Spam', msg_data='')
+        patcher = patch.object(MailmanClient, 'get_list',
+                               return_value=self.mlist)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, ids, action='discard', **extra):
+        return self.client.post(
+            reverse('bulk_moderate_held_messages', args=['foo@example.org']),
+            dict(ids=ids, action=action), **extra)
+
+    def test_bulk_discard(self):
+        response = self._post(['1', '2', '4'])
+        self.assertRedirects(response, reverse('list_held_messages',
+                                               args=['foo.example.org']))
+        self.assertEqual(
+            sorted(call[0] for call in
+                   self.mlist.moderate_message.call_args_list),
+            [('1', 'discard'), ('2', 'discard'), ('4', 'discard')])
+        # Only the tasks of handled messages are removed and logged.
+        self.assertEqual(
+            sorted(AdminTasks.objects.values_list('task_id', flat=True)),
+            ['3', '4', '5'])
+        self.assertEqual(
+            sorted(EventTracker.objects.values_list('user_email', flat=True)),
+            ['task1@example.org', 'task2@example.org'])
+        # The senders were known from the tasks.
+        self.assertFalse(self.held.called)
+
+    def test_results_as_json(self):
+        response = self._post(['2', '4'], action='accept',
+                              HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertEqual([(each['id'], each['ok']) for each in results],
+                         [('2', True), ('4', False)])
+
+    def test_sender_from_queue(self):
+        AdminTasks.objects.filter(task_id='5').delete()
+        self._post(['5'], action='reject')
+        self.assertEqual(self.held.call_count, 1)
+        self.assertEqual(
+            list(EventTracker.objects.values_list('user_email', 'event')),
+            [('user5@example.org', 'moderation-reject')])
+
+    def test_invalid_action(self):
+        self._post(['1'], action='delete')
+        self.assertFalse(self.mlist.moderate_message.called)
+
+    def test_bulk_subscription_requests(self):
+        type(self.mlist).requests = PropertyMock(return_value=[
+            dict(token='abc', email='les@example.org')])
+        self.client.post(
+            reverse('bulk_moderate_subscription_requests',
+                    args=['foo.example.org']),
+            dict(ids=['abc'], action='accept'))
+        self.mlist.moderate_request.assert_called_once_with('abc', 'accept')
+        self.assertEqual(
+            list(EventTracker.objects.values_list('user_email', 'event')),
+            [('les@example.org', 'subscription-accept')])
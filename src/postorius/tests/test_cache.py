@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from mock import patch, MagicMock
+
+from postorius import cache
+from postorius.utils import CachedConnection, PooledConnection
+
+
+BASE_URL = 'http://localhost:9001/3.0/'
+
+
+def _response(content='{"entries": []}'):
+    response = MagicMock()
+    response.status = 200
+    response.__iter__.return_value = iter([])
+    return response, content
+
+
+class ResourceMatchingTest(SimpleTestCase):
+    """Tests for mapping REST paths to cacheable resources."""
+
+    @override_settings(POSTORIUS_CACHE_TIMEOUTS={
+        'lists': 60, 'domains': 60, 'owners': 60, 'settings': 60})
+    def test_configured_resources(self):
+        self.assertEqual(cache.get_resource('lists'), 'lists')
+        self.assertEqual(cache.get_resource('lists/foo.example.org'),
+                         'lists')
+        self.assertEqual(cache.get_resource('domains/example.org'),
+                         'domains')
+        self.assertEqual(
+            cache.get_resource('lists/foo.example.org/roster/owner'),
+            'owners')
+        self.assertEqual(cache.get_resource('lists/foo@example.org/config'),
+                         'settings')
+
+    @override_settings(POSTORIUS_CACHE_TIMEOUTS={'lists': 60})
+    def test_other_resources_not_cached(self):
+        self.assertIsNone(cache.get_resource('domains'))
+        self.assertIsNone(cache.get_resource('lists/foo.example.org/held'))
+        self.assertIsNone(
+            cache.get_resource('lists/foo.example.org/roster/member'))
+
+    def test_nothing_cached_by_default(self):
+        self.assertIsNone(cache.get_resource('lists'))
+
+
+@override_settings(POSTORIUS_CACHE_TIMEOUTS={'lists': 60})
+@patch('postorius.utils.Http')
+class CachedCallTest(SimpleTestCase):
+    """Tests for serving API calls from the cache."""
+
+    def setUp(self):
+        cache._get_cache().clear()
+        self.connection = CachedConnection(PooledConnection(
+            MagicMock(baseurl=BASE_URL, basic_auth=None)))
+
+    def test_get_served_from_cache(self, mock_http):
+        mock_http.return_value.request.return_value = _response()
+        self.connection.call('lists')
+        response, content = self.connection.call(BASE_URL + 'lists')
+        self.assertEqual(content, {'entries': []})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(mock_http.return_value.request.call_count, 1)
+
+    def test_invalidate(self, mock_http):
+        mock_http.return_value.request.return_value = _response()
+        self.connection.call('lists')
+        cache.invalidate('lists')
+        self.connection.call('lists')
+        self.assertEqual(mock_http.return_value.request.call_count, 2)
+
+    def test_writes_not_cached(self, mock_http):
+        mock_http.return_value.request.return_value = _response()
+        self.connection.call('lists', {'fqdn_listname': 'foo@example.org'})
+        self.connection.call('lists', {'fqdn_listname': 'foo@example.org'})
+        self.connection.call('lists/foo.example.org', method='DELETE')
+        self.connection.call('lists/foo.example.org', method='DELETE')
+        self.assertEqual(mock_http.return_value.request.call_count, 4)
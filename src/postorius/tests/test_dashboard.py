@@ -249,10 +249,10 @@ class TestTaskManagement(TestCase):
         self.client.login(username='testowner', password='pwd')
         self.assertEqual(AdminTasks.objects.get(task_id=self.task.task_id).priority, -2) 
         # Test Prioritization
-        self.client.post(reverse('set_task_priority', args=(self.task.task_id, 1)))
+        self.client.post(reverse('set_task_priority', args=(self.task.pk, 1)))
         self.assertEqual(AdminTasks.objects.get(task_id=self.task.task_id).priority, 1) 
         # Test Unprioritization
-        self.client.post(reverse('set_task_priority', args=(self.task.task_id, 1)))
+        self.client.post(reverse('set_task_priority', args=(self.task.pk, 1)))
         self.assertEqual(AdminTasks.objects.get(task_id=self.task.task_id).priority, -2) 
         self.client.logout()
 
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from postorius.models import TaskCalender
+from postorius.views.user import generate_graph_object
+
+
+class GraphObjectTest(TestCase):
+    """Tests for the stats of the dashboard."""
+
+    def setUp(self):
+        self.today = date.today()
+        for days_ago, list_id, log_type, log_number in (
+                (0, 'foo.example.org', 'subscription', 2),
+                (0, 'bar.example.org', 'subscription', 3),
+                (1, 'foo.example.org', 'moderation', 4),
+                (1, 'foo.example.org', 'moderation', 1),
+                (40, 'foo.example.org', 'moderation', 7)):
+            TaskCalender.objects.increment(
+                self.today - timedelta(days=days_ago), list_id, log_type,
+                log_number)
+
+    def _key(self, days_ago):
+        return (self.today - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            sub_obj, mod_obj = generate_graph_object(
+                ['foo.example.org', 'bar.example.org'])
+        self.assertEqual(len(sub_obj), 31)
+        self.assertEqual(list(sub_obj.keys())[-1], self._key(0))
+
+    def test_log_numbers_summed(self):
+        sub_obj, mod_obj = generate_graph_object(
+            ['foo.example.org', 'bar.example.org'])
+        self.assertEqual(sub_obj[self._key(0)], 5)
+        self.assertEqual(mod_obj[self._key(1)], 5)
+        self.assertEqual(sum(mod_obj.values()), 5)
+
+    def test_lists_selected(self):
+        sub_obj, mod_obj = generate_graph_object(['bar.example.org'])
+        self.assertEqual(sub_obj[self._key(0)], 3)
+        self.assertEqual(sum(mod_obj.values()), 0)
+
+    def test_many_lists_selected(self):
+        lists = ['list{0}.example.org'.format(i) for i in range(1000)]
+        with self.assertNumQueries(1):
+            sub_obj, mod_obj = generate_graph_object(
+                lists + ['bar.example.org'])
+        self.assertEqual(sub_obj[self._key(0)], 3)
+
+    def test_window_and_weeks(self):
+        sub_obj, mod_obj = generate_graph_object(
+            ['foo.example.org'], days=60, bucket='week')
+        self.assertTrue(len(mod_obj) in (9, 10))
+        self.assertEqual(sum(mod_obj.values()), 12)
+        for key in mod_obj:
+            self.assertEqual(
+                date(*map(int, key.split('-'))).weekday(), 0)
+
+
+class StatsRollupTest(TestCase):
+    """Tests for incrementing and rolling up the stats."""
+
+    def test_increment(self):
+        today = date.today()
+        TaskCalender.objects.increment(today, 'foo.example.org', 'moderation')
+        TaskCalender.objects.increment(today, 'foo.example.org', 'moderation',
+                                       3)
+        log = TaskCalender.objects.get()
+        self.assertEqual(log.log_number, 4)
+        self.assertEqual(log.period, 'day')
+
+    def test_compact(self):
+        # Monday, 5 January 2015 until Sunday, 18 January 2015.
+        for day in range(5, 19):
+            TaskCalender.objects.increment(
+                date(2015, 1, day), 'foo.example.org', 'subscription', 2)
+        # Only the first, complete week is rolled up.
+        self.assertEqual(
+            TaskCalender.objects.compact('week', date(2015, 1, 14)), 1)
+        week = TaskCalender.objects.get(period='week')
+        self.assertEqual(week.on_date, date(2015, 1, 5))
+        self.assertEqual(week.log_number, 14)
+        self.assertEqual(TaskCalender.objects.filter(period='day').count(),
+                         7)
+        TaskCalender.objects.compact('week', date(2015, 2, 1))
+        TaskCalender.objects.compact('month', date(2015, 2, 1))
+        month = TaskCalender.objects.get()
+        self.assertEqual((month.on_date, month.period, month.log_number),
+                         (date(2015, 1, 1), 'month', 28))
+
+    def test_compact_week_across_months(self):
+        # Monday, 26 January 2015 until Sunday, 1 February 2015.
+        for day in (date(2015, 1, 26), date(2015, 1, 31), date(2015, 2, 1)):
+            TaskCalender.objects.increment(
+                day, 'foo.example.org', 'subscription')
+        self.assertEqual(
+            TaskCalender.objects.compact('week', date(2015, 2, 2)), 2)
+        self.assertEqual(
+            [(log.on_date, log.log_number) for log
+             in TaskCalender.objects.order_by('on_date')],
+            [(date(2015, 1, 26), 2), (date(2015, 2, 1), 1)])
+        TaskCalender.objects.compact('month', date(2015, 3, 1))
+        self.assertEqual(
+            [(log.on_date, log.log_number) for log
+             in TaskCalender.objects.order_by('on_date')],
+            [(date(2015, 1, 1), 2), (date(2015, 2, 1), 1)])
+
+    def test_periods_kept_apart(self):
+        # The week of Monday, 5 January 2015 is rolled up, the daily log of
+        # the Monday is logged later on.
+        TaskCalender.objects.increment(
+            date(2015, 1, 5), 'foo.example.org', 'moderation', 3, 'week')
+        TaskCalender.objects.increment(
+            date(2015, 1, 5), 'foo.example.org', 'moderation')
+        self.assertEqual(
+            sorted((log.period, log.log_number)
+                   for log in TaskCalender.objects.all()),
+            [('day', 1), ('week', 3)])
+
+    def test_command(self):
+        old_day = date.today() - timedelta(days=400)
+        TaskCalender.objects.increment(old_day, 'foo.example.org',
+                                       'moderation', 5)
+        call_command('compact_stats', stdout=StringIO())
+        log = TaskCalender.objects.get()
+        # The day is rolled up into its week, the week into its month.
+        self.assertEqual((log.on_date, log.period, log.log_number),
+                         (old_day.replace(day=1), 'month', 5))
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.urlresolvers import reverse
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from mailmanclient import Client
+from mock import patch
+
+from postorius.models import AdminTasks, EventTracker, List
+from postorius.tests.utils import mock_roles
+from postorius.views.list import add_mod_event, add_sub_event
+from postorius.views.user import events_allowed
+
+
+class EventLogTest(TestCase):
+    """Tests for the capped event log."""
+
+    def setUp(self):
+        self.now = datetime.now()
+
+    def _log(self, count, list_id='foo.example.org', event='moderation-accept',
+             start=0):
+        for i in range(start, start + count):
+            EventTracker.objects.log_event(
+                user_email='les@example.org', event_op='geddy@example.org',
+                event=event, list_id=list_id,
+                made_on=self.now + timedelta(minutes=i))
+
+    def _fill(self, count, list_id='foo.example.org', start=0):
+        EventTracker.objects.bulk_create([
+            EventTracker(user_email='les@example.org',
+                         event_op='geddy@example.org',
+                         event='moderation-accept', list_id=list_id,
+                         made_on=self.now + timedelta(minutes=i))
+            for i in range(start, start + count)])
+
+    @override_settings(POSTORIUS_EVENT_LOG_SIZE=5)
+    def test_log_is_capped(self):
+        self._log(8)
+        made_on = EventTracker.objects.recent().values_list(
+            'made_on', flat=True)
+        self.assertEqual(list(made_on), [self.now + timedelta(minutes=i)
+                                         for i in range(7, 2, -1)])
+
+    @override_settings(POSTORIUS_EVENT_LOG_SIZE=5)
+    def test_oversized_log_shrinks(self):
+        self._fill(12)
+        self._log(1, start=12)
+        self.assertEqual(EventTracker.objects.count(), 5)
+
+    @override_settings(POSTORIUS_EVENT_LOG_SIZE=5)
+    def test_log_without_count(self):
+        self._fill(5)
+        # Insert, cutoff and a single bulk delete.
+        with self.assertNumQueries(3):
+            self._log(1, start=5)
+
+    @override_settings(POSTORIUS_EVENT_LOG_SIZE=3,
+                       POSTORIUS_EVENT_LOG_PER_LIST=True)
+    def test_log_per_list(self):
+        self._fill(5, list_id='bar.example.org')
+        self._log(4)
+        self.assertEqual(
+            EventTracker.objects.filter(list_id='foo.example.org').count(), 3)
+        self.assertEqual(
+            EventTracker.objects.filter(list_id='bar.example.org').count(), 5)
+
+    @override_settings(POSTORIUS_EVENT_LOG_MAX_AGE=7)
+    def test_old_events_expire(self):
+        self.now -= timedelta(days=8)
+        self._fill(3)
+        self.now += timedelta(days=8)
+        self._log(1)
+        self.assertEqual(EventTracker.objects.count(), 1)
+
+    def test_recent_by_list_and_time(self):
+        self._fill(4)
+        self._fill(4, list_id='bar.example.org')
+        events = EventTracker.objects.recent(
+            list_ids=['bar.example.org'],
+            since=self.now + timedelta(minutes=1),
+            until=self.now + timedelta(minutes=3))
+        self.assertEqual(
+            [(each.list_id, each.made_on) for each in events],
+            [('bar.example.org', self.now + timedelta(minutes=i))
+             for i in (2, 1)])
+
+
+class EventsAllowedTest(TestCase):
+    """Tests for the event streamer of the dashboard."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('les', 'les@example.org', 'pwd')
+        now = datetime.now()
+        for i, (event, list_id) in enumerate((
+                ('moderation-accept', 'foo.example.org'),
+                ('subscription-reject', 'foo.example.org'),
+                ('moderation-accept', 'bar.example.org'),
+                ('subscription-accept', 'bar.example.org'))):
+            EventTracker.objects.create_event(
+                user_email='geddy@example.org', event_op='alex@example.org',
+                event=event, list_id=list_id,
+                made_on=now + timedelta(minutes=i))
+        patcher = patch.object(List.objects, 'all', return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _allowed(self, owner=(), moderator=()):
+        roles = dict(owner=set(owner), moderator=set(moderator))
+        with patch.object(List.objects, 'get_user_roles',
+                          return_value=roles):
+            events = events_allowed(self.user, EventTracker.objects.recent())
+        return [(each.event, each.list_id) for each in events]
+
+    def test_moderator_sees_moderation_events_of_list(self):
+        self.assertEqual(self._allowed(moderator=['foo.example.org']),
+                         [('moderation-accept', 'foo.example.org')])
+
+    def test_owner_sees_all_events_of_list(self):
+        self.assertEqual(self._allowed(owner=['bar.example.org']),
+                         [('subscription-accept', 'bar.example.org'),
+                          ('moderation-accept', 'bar.example.org')])
+
+    def test_no_roles(self):
+        self.assertEqual(self._allowed(), [])
+
+    @override_settings(POSTORIUS_EVENT_LOG_SIZE=2)
+    def test_superuser_sees_newest_events(self):
+        self.user.is_superuser = True
+        self.assertEqual(len(self._allowed()), 2)
+
+
+class EventSenderTest(TestCase):
+    """Tests that logging a moderation event doesn't fetch the queues."""
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = User.objects.create_user(
+            'geddy', 'geddy@example.org', 'pwd')
+        for task_type, task_id in (('moderation', '7'),
+                                   ('subscription', 'abc')):
+            AdminTasks.objects.create_task(
+                task_id=task_id, task_type=task_type, stamp=datetime.now(),
+                user_email='les@example.org', list_id='foo.example.org',
+                msg_subject='Hi', msg_data='Hello')
+        for name in ('get_list', 'get_held_message', 'get_request'):
+            target = Client if name == 'get_list' else List.objects
+            patcher = patch.object(target, name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_sender_from_task(self):
+        add_mod_event(self.request, 7, 'foo@example.org', 'accept')
+        add_sub_event(self.request, 'abc', 'foo.example.org', 'reject')
+        self.assertEqual(
+            list(EventTracker.objects.values_list('user_email', 'event')),
+            [('les@example.org', 'moderation-accept'),
+             ('les@example.org', 'subscription-reject')])
+        self.assertFalse(self.get_list.called)
+        self.assertFalse(self.get_held_message.called)
+        self.assertFalse(self.get_request.called)
+
+    def test_sender_without_task(self):
+        self.get_held_message.return_value = dict(sender='alex@example.org')
+        self.get_request.return_value = dict(email='neil@example.org')
+        add_mod_event(self.request, 8, 'foo.example.org', 'discard')
+        add_sub_event(self.request, 'def', 'foo.example.org', 'accept')
+        self.get_held_message.assert_called_once_with('foo.example.org', 8)
+        self.get_request.assert_called_once_with('foo.example.org', 'def')
+        self.assertEqual(
+            set(EventTracker.objects.values_list('user_email', flat=True)),
+            set(['alex@example.org', 'neil@example.org']))
+        self.assertFalse(self.get_list.called)
+
+    def test_request_gone(self):
+        self.get_held_message.return_value = None
+        self.get_request.return_value = None
+        self.assertIsNone(
+            add_mod_event(self.request, 8, 'foo@example.org', 'accept'))
+        self.assertIsNone(
+            add_sub_event(self.request, 'def', 'foo@example.org', 'accept'))
+        self.get_held_message.assert_called_once_with('foo.example.org', 8)
+        self.assertEqual(EventTracker.objects.count(), 0)
+
+    def test_held_message_gone(self):
+        self.get_held_message.return_value = None
+        self.client.login(username='geddy', password='pwd')
+        with mock_roles(set([('foo.example.org', 'moderator',
+                              'geddy@example.org')])):
+            response = self.client.post(
+                reverse('accept_held_message', args=['foo@example.org', 8]))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([msg.message for msg
+                          in get_messages(response.wsgi_request)],
+                         ['Held Message Not Found'])
+        self.assertEqual(EventTracker.objects.count(), 0)
+        self.assertFalse(self.get_list.return_value.accept_message.called)
+
+    def test_logged_under_list_id(self):
+        # The held messages page links to the fqdn listname.
+        self.client.login(username='geddy', password='pwd')
+        with mock_roles(set([('foo.example.org', 'moderator',
+                              'geddy@example.org')])):
+            self.client.post(reverse('accept_held_message',
+                                     args=['foo@example.org', 7]))
+        event = EventTracker.objects.get()
+        self.assertEqual((event.event, event.list_id),
+                         ('moderation-accept', 'foo.example.org'))
+        roles = dict(owner=set(), moderator=set(['foo.example.org']))
+        with patch.object(List.objects, 'get_user_roles',
+                          return_value=roles):
+            self.assertEqual(
+                events_allowed(self.request.user, EventTracker.objects.all()),
+                [event])
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import tarfile
+import zipfile
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import Client, SimpleTestCase, TestCase
+from mailmanclient import Client as MailmanClient
+from mock import patch
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+
+from postorius import export
+from postorius.tests.utils import (create_mock_list, create_mock_member,
+                                   set_mock_members)
+
+
+def _members(count):
+    return [create_mock_member(dict(
+        email='user{0}@example.org'.format(i), role='member',
+        _info=dict(email='user{0}@example.org'.format(i), role='member',
+                   delivery_mode='regular')))
+        for i in range(count)]
+
+
+class StreamMembersTest(SimpleTestCase):
+    """Tests for the streaming roster export."""
+
+    def setUp(self):
+        self.mlist = create_mock_list()
+        set_mock_members(self.mlist, _members(1001))
+
+    def test_csv(self):
+        chunks = export.stream_members(self.mlist, ['email', 'role'])
+        self.assertEqual(next(chunks), 'email,role\r\n')
+        # Pages are only fetched when they are sent.
+        self.assertFalse(self.mlist.get_member_page.called)
+        first = next(chunks)
+        self.assertEqual(first.splitlines()[0],
+                         'user0@example.org,member')
+        self.assertEqual(len(first.splitlines()), 500)
+        self.assertEqual(len(list(chunks)), 2)
+
+    def test_ndjson(self):
+        lines = ''.join(export.stream_members(
+            self.mlist, ['email', 'role'], 'ndjson')).splitlines()
+        self.assertEqual(len(lines), 1001)
+        self.assertEqual(json.loads(lines[-1]),
+                         {'email': 'user1000@example.org', 'role': 'member'})
+
+
+def _lists(count):
+    lists = []
+    for i in range(count):
+        mlist = create_mock_list(dict(list_id='list{0}.example.org'
+                                      .format(i)))
+        set_mock_members(mlist, _members(i + 1))
+        lists.append(mlist)
+    return lists
+
+
+class StreamSiteTest(SimpleTestCase):
+    """Tests for the site-wide roster export."""
+
+    def setUp(self):
+        self.lists = _lists(5)
+        self.lists[3].get_member_page.side_effect = HTTPError(
+            'url', 500, 'Server error', None, None)
+
+    def test_zip(self):
+        chunks = list(export.stream_site(self.lists, ['email'], 'zip',
+                                         workers=2))
+        # One chunk per exported list and one for the end of the archive.
+        self.assertEqual(len(chunks), 5)
+        archive = zipfile.ZipFile(BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.namelist(), [
+            'list0.example.org.csv', 'list1.example.org.csv',
+            'list2.example.org.csv', 'list4.example.org.csv', 'errors.csv'])
+        self.assertEqual(archive.read('list1.example.org.csv').splitlines(),
+                         [b'email', b'user0@example.org',
+                          b'user1@example.org'])
+        self.assertIn(b'list3.example.org,HTTP Error 500',
+                      archive.read('errors.csv'))
+
+    def test_tar(self):
+        data = b''.join(export.stream_site(self.lists, ['email', 'role'],
+                                           'tar'))
+        archive = tarfile.open(fileobj=BytesIO(data))
+        self.assertEqual(len(archive.getnames()), 5)
+        self.assertEqual(
+            archive.extractfile('list0.example.org.csv').read(),
+            b'email,role\r\nuser0@example.org,member\r\n')
+
+    def test_combined(self):
+        lines = ''.join(export.stream_site(self.lists, ['email'],
+                                           'csv')).splitlines()
+        self.assertEqual(lines[:3], ['list_id,email',
+                                     'list0.example.org,user0@example.org',
+                                     'list1.example.org,user0@example.org'])
+        # 1 + 2 + 3 + 5 members, without the failed list.
+        self.assertEqual(len(lines), 12)
+
+
+class ExportViewTest(TestCase):
+    """Tests for the roster export view."""
+
+    def setUp(self):
+        User.objects.create_superuser('su', 'su@example.org', 'pwd')
+        self.client = Client()
+        self.client.login(username='su', password='pwd')
+        self.mlist = create_mock_list(dict(list_id='foo.example.org',
+                                           fqdn_listname='foo@example.org'))
+        set_mock_members(self.mlist, _members(3))
+        patcher = patch.object(MailmanClient, 'get_list',
+                               return_value=self.mlist)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_default_export(self):
+        response = self.client.post(reverse('csv_view',
+                                            args=['foo.example.org']))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('foo.example.org-members.csv',
+                      response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content).splitlines(),
+                         [b'email', b'user0@example.org',
+                          b'user1@example.org', b'user2@example.org'])
+
+    def test_chosen_columns(self):
+        response = self.client.get(
+            reverse('csv_view', args=['foo.example.org']),
+            {'columns': ['email', 'delivery_mode'], 'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(json.loads(lines[0].decode('utf-8')),
+                         {'email': 'user0@example.org',
+                          'delivery_mode': 'regular'})
+
+    def test_invalid_format(self):
+        response = self.client.get(
+            reverse('csv_view', args=['foo.example.org']),
+            {'format': 'xls'})
+        self.assertRedirects(response, reverse('list_members',
+                                               args=['foo.example.org']),
+                             fetch_redirect_response=False)
+
+
+class SiteExportViewTest(TestCase):
+    """Tests for the site-wide roster export view."""
+
+    def setUp(self):
+        User.objects.create_superuser('su', 'su@example.org', 'pwd')
+        User.objects.create_user('les', 'les@example.org', 'pwd')
+        self.client = Client()
+        patcher = patch('postorius.models.List.objects.all',
+                        return_value=_lists(2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_export(self):
+        self.client.login(username='su', password='pwd')
+        response = self.client.get(reverse('site_export'),
+                                   {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0].decode('utf-8')),
+                         {'list_id': 'list0.example.org',
+                          'email': 'user0@example.org'})
+
+    def test_superusers_only(self):
+        self.client.login(username='les', password='pwd')
+        response = self.client.get(reverse('site_export'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(getattr(response, 'streaming', False))
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.db import connection, IntegrityError, transaction
+from django.test import TestCase
+from django.utils import unittest
+from mock import patch
+
+from postorius.models import (AddressConfirmationProfile, AdminTasks,
+                              EventTracker)
+from postorius.views.list import task_delete
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Needs SQLite')
+class IndexTest(TestCase):
+    """Tests that the hot lookups don't scan their tables."""
+
+    def assertUsesIndex(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_task_by_task_id(self):
+        self.assertUsesIndex(AdminTasks.objects.filter(task_id='1'))
+
+    def test_events_by_date(self):
+        self.assertUsesIndex(EventTracker.objects.order_by('made_on')[:1])
+
+    def test_confirmation_by_key(self):
+        self.assertUsesIndex(AddressConfirmationProfile.objects.filter(
+            activation_key='abc'))
+
+    def test_confirmation_by_email(self):
+        self.assertUsesIndex(AddressConfirmationProfile.objects.filter(
+            email='les@example.org'))
+
+
+class TaskConstraintTest(TestCase):
+    """Tests for the unique constraint on pending tasks."""
+
+    def test_duplicate_task(self):
+        fields = dict(task_id='1', task_type='moderation',
+                      made_on=datetime.now(), user_email='les@example.org',
+                      list_id='foo.example.org')
+        AdminTasks.objects.create(**fields)
+        with transaction.atomic():
+            self.assertRaises(IntegrityError, AdminTasks.objects.create,
+                              **fields)
+        fields['task_type'] = 'subscriptions'
+        AdminTasks.objects.create(**fields)
+
+    def test_manual_task_ids(self):
+        first = AdminTasks.objects.create_manual_task(
+            'les@example.org', 'Subject', 'Text')
+        second = AdminTasks.objects.create_manual_task(
+            'les@example.org', 'Subject', 'Text')
+        self.assertEqual((first.task_id, second.task_id), ('-1', '-2'))
+
+    def test_manual_task_id_taken(self):
+        # An id taken concurrently makes the creation retry.
+        create = AdminTasks.objects.create_task
+        calls = []
+
+        def create_task(**kwargs):
+            calls.append(kwargs['task_id'])
+            if len(calls) == 1:
+                raise IntegrityError
+            return create(**kwargs)
+        with patch.object(AdminTasks.objects, 'create_task',
+                          side_effect=create_task):
+            task = AdminTasks.objects.create_manual_task(
+                'les@example.org', 'Subject', 'Text')
+        self.assertEqual(calls, ['-1', '-1'])
+        self.assertEqual(task.task_id, '-1')
+
+class TaskLookupTest(TestCase):
+    """Tests that tasks are found by more than their (per list) id."""
+
+    def setUp(self):
+        self.tasks = [AdminTasks.objects.create(
+            task_id='1', task_type=task_type, made_on=datetime.now(),
+            user_email='les@example.org', list_id=list_id)
+            for task_type, list_id in (('moderation', 'foo.example.org'),
+                                       ('moderation', 'bar.example.org'),
+                                       ('subscription', 'foo.example.org'))]
+
+    def test_task_delete(self):
+        task_delete('moderation', 'foo@example.org', 1)
+        self.assertEqual(list(AdminTasks.objects.order_by('id')),
+                         self.tasks[1:])
+
+    def test_set_task_priority(self):
+        User.objects.create_user('les', 'les@example.org', 'pwd')
+        self.client.login(username='les', password='pwd')
+        self.client.get(reverse('set_task_priority',
+                                args=(self.tasks[1].pk, 1)))
+        self.assertEqual([task.priority for task
+                          in AdminTasks.objects.order_by('id')],
+                         [-2, 1, -2])
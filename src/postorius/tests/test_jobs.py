@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+from mock import patch
+
+from postorius import jobs
+from postorius.models import Job
+from postorius.tests.utils import (create_mock_list, create_mock_member,
+                                   set_mock_members)
+
+
+@jobs.register('test_echo')
+def _echo(job, value):
+    job.set_progress(1, 1)
+    return {'summary': {'echoed': 1}, 'header': ['value'],
+            'rows': [[value]]}
+
+
+@jobs.register('test_fail')
+def _fail(job):
+    raise RuntimeError('Broken job')
+
+
+class JobQueueTest(TestCase):
+    """Tests for the background job queue."""
+
+    def test_enqueue(self):
+        job = jobs.enqueue('test_echo', value='hello')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.get_arguments(), {'value': 'hello'})
+
+    def test_unknown_kind(self):
+        self.assertRaises(ValueError, jobs.enqueue, 'no_such_job')
+        self.assertEqual(Job.objects.count(), 0)
+
+    def test_claim_once(self):
+        job = jobs.enqueue('test_echo', value='hello')
+        claimed = Job.objects.claim(job.id)
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNotNone(claimed.started_on)
+        self.assertIsNone(Job.objects.claim(job.id))
+        self.assertIsNone(Job.objects.claim_next())
+
+    def test_stale_job_claimed_again(self):
+        job = Job.objects.claim(jobs.enqueue('test_echo', value='hello').id)
+        self.assertIsNone(Job.objects.claim_next())
+        Job.objects.filter(id=job.id).update(
+            started_on=datetime.now() - timedelta(hours=7))
+        self.assertEqual(Job.objects.claim_next().id, job.id)
+
+    @override_settings(POSTORIUS_JOB_TIMEOUT=None)
+    def test_stale_job_timeout_off(self):
+        job = Job.objects.claim(jobs.enqueue('test_echo', value='hello').id)
+        Job.objects.filter(id=job.id).update(
+            started_on=datetime.now() - timedelta(days=7))
+        self.assertIsNone(Job.objects.claim_next())
+
+    def test_run_pending(self):
+        first = jobs.enqueue('test_echo', value='hello')
+        second = jobs.enqueue('test_fail')
+        self.assertEqual(jobs.run_pending(), 2)
+        first = Job.objects.get(id=first.id)
+        self.assertEqual(first.status, 'done')
+        self.assertEqual((first.progress, first.total), (1, 1))
+        self.assertEqual(first.get_result()['rows'], [['hello']])
+        second = Job.objects.get(id=second.id)
+        self.assertEqual(second.status, 'failed')
+        self.assertIn('Broken job', second.error)
+        self.assertTrue(second.is_finished)
+
+    @override_settings(POSTORIUS_RUN_JOBS_INLINE=True)
+    def test_run_inline(self):
+        job = jobs.enqueue('test_echo', value='hello')
+        self.assertEqual(job.status, 'done')
+
+    def test_command(self):
+        jobs.enqueue('test_echo', value='hello')
+        out = StringIO()
+        call_command('run_jobs', once=True, stdout=out)
+        self.assertIn('Ran 1 job(s).', out.getvalue())
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_unsubscribe_all(self):
+        mlist = create_mock_list()
+        members = [create_mock_member(dict(email='les@example.org')),
+                   create_mock_member(dict(email='neil@example.org'))]
+        set_mock_members(mlist, list(members))
+        with patch('postorius.models.List.objects.get', return_value=mlist), \
+                patch('postorius.cache.invalidate') as mock_invalidate:
+            job = jobs.run(Job.objects.claim(
+                jobs.enqueue('unsubscribe_all', list_id='foo.example.org').id))
+        # The cached lists carry their member count.
+        mock_invalidate.assert_called_with('lists')
+        self.assertEqual(job.get_result()['summary'], {'unsubscribed': 2})
+        self.assertEqual(job.get_result()['rows'], [])
+        self.assertTrue(members[0].unsubscribe.called)
+        self.assertTrue(members[1].unsubscribe.called)
+
+
+class JobViewTest(TestCase):
+    """Tests for the job pages."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('les', 'les@example.org', 'pwd')
+        User.objects.create_user('neil', 'neil@example.org', 'pwd')
+        self.job = jobs.enqueue('test_echo', owner=self.owner, value='hello')
+        jobs.run_pending()
+        self.client = Client()
+
+    def test_owner(self):
+        self.client.login(username='les', password='pwd')
+        response = self.client.get(reverse('job_index'))
+        self.assertEqual(list(response.context['jobs']), [self.job])
+        response = self.client.get(reverse('job_detail', args=[self.job.id]))
+        self.assertEqual(response.context['summary'], {'echoed': 1})
+        self.assertContains(response, reverse('job_result',
+                                              args=[self.job.id]))
+        response = self.client.get(reverse('job_result', args=[self.job.id]))
+        self.assertEqual(response.content.splitlines(), [b'value', b'hello'])
+
+    def test_other_user(self):
+        self.client.login(username='neil', password='pwd')
+        response = self.client.get(reverse('job_index'))
+        self.assertEqual(list(response.context['jobs']), [])
+        for name in ('job_detail', 'job_result'):
+            response = self.client.get(reverse(name, args=[self.job.id]))
+            self.assertEqual(response.status_code, 403)
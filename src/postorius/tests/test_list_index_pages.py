@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from mailmanclient import Client as MailmanClient
+from mock import patch, MagicMock, PropertyMock
+
+from postorius import cache
+from postorius.tests.utils import create_mock_list
+
+
+def _mock_list(name, mail_host='example.org', advertised=True):
+    mlist = create_mock_list(dict(
+        list_id='{0}.{1}'.format(name, mail_host),
+        fqdn_listname='{0}@{1}'.format(name, mail_host),
+        display_name=name.capitalize(),
+        mail_host=mail_host))
+    type(mlist).settings = PropertyMock(return_value=dict(
+        advertised=advertised, description='About {0}'.format(name)))
+    return mlist
+
+
+@override_settings(POSTORIUS_LIST_INDEX_TIMEOUT=900)
+class ListIndexPagesTest(TestCase):
+    """Tests for paging, sorting and filtering the list index."""
+
+    def setUp(self):
+        cache._get_cache().clear()
+        self.addCleanup(cache._get_cache().clear)
+        self.client = Client()
+        self.lists = [_mock_list('list{0:02d}'.format(i)) for i in range(30)]
+        self.lists.append(_mock_list('hidden', advertised=False))
+        self.lists.append(_mock_list('other', mail_host='example.net'))
+        for name, value in (('lists', self.lists), ('domains', [])):
+            patcher = patch.object(MailmanClient, name,
+                                   new_callable=PropertyMock,
+                                   return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, **params):
+        response = self.client.get(reverse('list_index'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_first_page(self):
+        response = self._get(count=10)
+        self.assertEqual(len(response.context['lists']), 10)
+        self.assertEqual(response.context['list_count'], 31)
+        self.assertEqual(response.context['page_count'], 4)
+        self.assertTrue(response.context['page_show_next'])
+        self.assertNotContains(response, 'hidden@example.org')
+
+    def test_last_page(self):
+        response = self._get(count=10, page=9)
+        self.assertEqual(response.context['page_nr'], 4)
+        self.assertEqual([l.fqdn_listname for l in response.context['lists']],
+                         ['other@example.net'])
+        self.assertFalse(response.context['page_show_next'])
+
+    def test_default_page_size(self):
+        with self.settings(POSTORIUS_LIST_INDEX_PAGE_SIZE=20):
+            response = self._get()
+        self.assertEqual(len(response.context['lists']), 20)
+
+    def test_invalid_parameters(self):
+        response = self._get(count='all', page='-1', sort='settings')
+        self.assertEqual(response.context['page_nr'], 1)
+        self.assertEqual(response.context['sort'], 'list_id')
+
+    def test_sort_descending(self):
+        response = self._get(sort='-fqdn_listname', count=2)
+        self.assertEqual([l.fqdn_listname for l in response.context['lists']],
+                         ['other@example.net', 'list29@example.org'])
+
+    def test_filter_by_domain(self):
+        response = self._get(domain='example.net')
+        self.assertEqual([l.fqdn_listname for l in response.context['lists']],
+                         ['other@example.net'])
+
+    def test_filter_by_name(self):
+        response = self._get(q='LIST1')
+        self.assertEqual(response.context['list_count'], 10)
+        self.assertContains(response, 'q=LIST1')
+
+    def test_filter_by_description(self):
+        response = self._get(q='about list05')
+        self.assertEqual([l.fqdn_listname for l in response.context['lists']],
+                         ['list05@example.org'])
+
+    @patch.object(MailmanClient, 'get_list_page')
+    def test_superuser_pages_from_rest_api(self, mock_get_list_page):
+        User.objects.create_superuser('su', 'su@example.org', 'pwd')
+        self.client.login(username='su', password='pwd')
+        page = MagicMock()
+        page.total_size = 32
+        page.__iter__.return_value = iter(self.lists[10:20])
+        mock_get_list_page.return_value = page
+        response = self._get(sort='list_id', count=10, page=2)
+        mock_get_list_page.assert_called_once_with(10, 2)
+        self.assertEqual(response.context['lists'], self.lists[10:20])
+        self.assertEqual(response.context['page_count'], 4)
+        # Lists of other pages are not checked against the index.
+        self.assertFalse(vars(type(self.lists[0]))['settings'].called)
+
+    def test_served_from_cached_index(self):
+        self._get()
+        with patch.object(MailmanClient, 'lists',
+                          new_callable=PropertyMock) as mock_lists:
+            response = self._get(q='list1')
+        self.assertFalse(mock_lists.called)
+        self.assertEqual(response.context['list_count'], 10)
+
+    @override_settings(POSTORIUS_LIST_INDEX_TIMEOUT=None)
+    @patch.object(MailmanClient, 'get_list_page')
+    def test_public_pages_without_index(self, mock_get_list_page):
+        response = self._get(count=10, page=3)
+        self.assertFalse(mock_get_list_page.called)
+        # Unadvertised lists are neither shown nor counted.
+        self.assertEqual([l.fqdn_listname for l in response.context['lists']],
+                         [l.fqdn_listname for l in self.lists[20:30]])
+        self.assertEqual(response.context['list_count'], 31)
+        self.assertEqual(response.context['page_count'], 4)
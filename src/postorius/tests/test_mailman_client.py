@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.test import SimpleTestCase
+from mailmanclient import MailmanConnectionError
+from mock import patch, MagicMock
+
+from postorius.utils import CachedConnection, get_client, PooledConnection
+
+
+def _connection(baseurl='http://localhost:9001/3.0/'):
+    """Return a mocked connection of a mailmanclient Client."""
+    return MagicMock(baseurl=baseurl, basic_auth='cmVzdGFkbWluOnJlc3RwYXNz')
+
+
+def _response(status=200, content='{"entries": []}'):
+    response = MagicMock()
+    response.status = status
+    return response, content
+
+
+class GetClientTest(SimpleTestCase):
+    """Tests for the process-wide client returned by get_client."""
+
+    def test_client_is_shared(self):
+        self.assertIs(get_client(), get_client())
+
+    def test_client_uses_pooled_connection(self):
+        connection = get_client()._connection
+        self.assertIsInstance(connection, CachedConnection)
+        self.assertIsInstance(connection.connection, PooledConnection)
+
+    def test_client_per_api_url(self):
+        client = get_client()
+        with self.settings(MAILMAN_API_URL='http://localhost:9002'):
+            other_client = get_client()
+        self.assertIsNot(client, other_client)
+        self.assertEqual(other_client._connection.baseurl,
+                         'http://localhost:9002/3.0/')
+
+
+@patch('postorius.utils.time.sleep')
+@patch('postorius.utils.Http')
+class PooledConnectionTest(SimpleTestCase):
+    """Tests for the keep-alive connection pool."""
+
+    def setUp(self):
+        self.connection = PooledConnection(_connection(), pool_size=2,
+                                           retries=2)
+
+    def test_http_instance_is_reused(self, mock_http, mock_sleep):
+        mock_http.return_value.request.return_value = _response()
+        self.connection.call('lists')
+        self.connection.call('domains')
+        self.assertEqual(mock_http.call_count, 1)
+        self.assertEqual(mock_http.return_value.request.call_count, 2)
+
+    def test_http_instance_closed_if_not_persistent(
+            self, mock_http, mock_sleep):
+        mock_http.return_value.request.return_value = _response()
+        self.connection.persistent = False
+        self.connection.call('lists')
+        self.connection.call('lists')
+        self.assertEqual(mock_http.call_count, 2)
+        self.assertEqual(mock_http.return_value.close.call_count, 2)
+
+    def test_get_is_retried(self, mock_http, mock_sleep):
+        mock_http.return_value.request.side_effect = [
+            IOError('connection reset'), _response()]
+        response, content = self.connection.call('lists')
+        self.assertEqual(content, {'entries': []})
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    def test_post_is_not_retried(self, mock_http, mock_sleep):
+        mock_http.return_value.request.side_effect = IOError('refused')
+        self.assertRaises(MailmanConnectionError, self.connection.call,
+                          'members', {'subscriber': 'les@example.org'})
+        self.assertEqual(mock_http.return_value.request.call_count, 1)
+
+    def test_delete_is_not_retried(self, mock_http, mock_sleep):
+        # The first attempt may have deleted the resource already.
+        mock_http.return_value.request.side_effect = IOError('reset')
+        self.assertRaises(MailmanConnectionError, self.connection.call,
+                          'members/1', method='DELETE')
+        self.assertEqual(mock_http.return_value.request.call_count, 1)
+
+    def test_credentials_of_wrapped_connection(self, mock_http, mock_sleep):
+        mock_http.return_value.request.return_value = _response()
+        self.connection.call('lists')
+        url, method, data, headers = \
+            mock_http.return_value.request.call_args[0]
+        self.assertEqual(url, 'http://localhost:9001/3.0/lists')
+        self.assertEqual(headers['Authorization'],
+                         'Basic cmVzdGFkbWluOnJlc3RwYXNz')
+        self.assertEqual(self.connection.baseurl,
+                         'http://localhost:9001/3.0/')
+
+    def test_retries_are_limited(self, mock_http, mock_sleep):
+        mock_http.return_value.request.side_effect = IOError('refused')
+        self.assertRaises(MailmanConnectionError, self.connection.call,
+                          'lists')
+        self.assertEqual(mock_http.return_value.request.call_count, 3)
+
+    def test_http_errors_are_raised(self, mock_http, mock_sleep):
+        mock_http.return_value.request.return_value = _response(404, '')
+        with self.assertRaises(IOError) as cm:
+            self.connection.call('lists/missing.example.org')
+        self.assertEqual(cm.exception.code, 404)
+        self.assertEqual(mock_http.return_value.request.call_count, 1)
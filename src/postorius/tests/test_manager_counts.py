@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from postorius.models import AdminTasks, EventTracker
+
+
+class ManagerCountTest(TestCase):
+    """Tests that the managers count rows in the database."""
+
+    def setUp(self):
+        now = datetime.now()
+        AdminTasks.objects.bulk_create([
+            AdminTasks(task_id=str(i), made_on=now, list_id='foo.example.org',
+                       user_email='les@example.org',
+                       task_type='moderation' if i % 3 else 'subscription')
+            for i in range(300)])
+        EventTracker.objects.bulk_create([
+            EventTracker(user_email='les@example.org',
+                         event_op='geddy@example.org',
+                         event='moderation-accept', list_id='foo.example.org',
+                         made_on=now)
+            for i in range(30)])
+
+    def assertCounts(self, func, expected):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(func(), expected)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertIn('COUNT(', context.captured_queries[0]['sql'].upper())
+
+    def test_task_count(self):
+        self.assertCounts(
+            lambda: AdminTasks.objects.get_count('moderation'), 200)
+        self.assertCounts(
+            lambda: AdminTasks.objects.get_count('subscription'), 100)
+
+    def test_event_count(self):
+        self.assertCounts(EventTracker.objects.get_count, 30)
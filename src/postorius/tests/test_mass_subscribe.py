@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from mailmanclient import Client as MailmanClient
+from mock import patch
+try:
+    from urllib2 import HTTPError
+except ImportError:
+    from urllib.error import HTTPError
+
+from postorius import bulk
+from postorius.tests.utils import (create_mock_list, create_mock_member,
+                                   mock_roles, set_mock_members)
+
+
+def _subscribe(address, **kwargs):
+    if address == 'les@example.org':
+        raise HTTPError('url', 409, 'Member already subscribed', None, None)
+    if address == 'geddy@example.org':
+        raise HTTPError('url', 500, 'Server error', None, None)
+
+
+class MassSubscribeTest(SimpleTestCase):
+    """Tests for the mass subscription engine."""
+
+    def setUp(self):
+        self.mlist = create_mock_list()
+        self.mlist.subscribe.side_effect = _subscribe
+
+    def test_parse_addresses(self):
+        entries = bulk.parse_addresses(
+            'alex@example.org\n\n  Neil <neil@example.org> \n'
+            'not an address\nALEX@example.org\n')
+        self.assertEqual(entries, [['alex@example.org', None],
+                                   ['neil@example.org', None],
+                                   ['not an address', 'invalid'],
+                                   ['ALEX@example.org', 'duplicate']])
+
+    def test_mass_subscribe(self):
+        results = bulk.mass_subscribe(
+            self.mlist, 'alex@example.org\nles@example.org\nfoo\n'
+                        'geddy@example.org\nalex@example.org')
+        self.assertEqual([result[:2] for result in results], [
+            ('alex@example.org', 'subscribed'),
+            ('les@example.org', 'member'),
+            ('foo', 'invalid'),
+            ('geddy@example.org', 'failed'),
+            ('alex@example.org', 'duplicate')])
+        self.assertIn('Server error', results[3][2])
+        # Every address is subscribed once.
+        self.assertEqual(self.mlist.subscribe.call_count, 3)
+        self.assertEqual(bulk.summarize(results), dict(
+            subscribed=1, member=1, invalid=1, duplicate=1, failed=1))
+
+
+def _unsubscribe(address):
+    if address == 'les@example.org':
+        raise ValueError('les@example.org is not a member address')
+    if address == 'geddy@example.org':
+        raise HTTPError('url', 500, 'Server error', None, None)
+
+
+class MassUnsubscribeTest(SimpleTestCase):
+    """Tests for the mass removal engine."""
+
+    def setUp(self):
+        self.mlist = create_mock_list()
+        self.mlist.unsubscribe.side_effect = _unsubscribe
+
+    def test_mass_unsubscribe(self):
+        progress = []
+        results = bulk.mass_unsubscribe(
+            self.mlist, 'Alex@example.org\nles@example.org\nfoo\n'
+                        'geddy@example.org\nalex@example.org',
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual([result[:2] for result in results], [
+            ('Alex@example.org', 'unsubscribed'),
+            ('les@example.org', 'not_member'),
+            ('foo', 'invalid'),
+            ('geddy@example.org', 'failed'),
+            ('alex@example.org', 'duplicate')])
+        self.assertEqual(self.mlist.unsubscribe.call_count, 3)
+        self.mlist.unsubscribe.assert_any_call('alex@example.org')
+        self.assertEqual(progress, [(3, 3)])
+
+    def test_unsubscribe_all(self):
+        members = [create_mock_member(dict(email='user{0}@example.org'
+                                           .format(i)))
+                   for i in range(1201)]
+        members[7].unsubscribe.side_effect = HTTPError(
+            'url', 500, 'Server error', None, None)
+        roster = list(members)
+        set_mock_members(self.mlist, roster)
+        self.assertEqual(bulk.member_count(self.mlist), 1201)
+        progress = []
+        results = bulk.unsubscribe_all(
+            self.mlist,
+            progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(len(results), 1201)
+        self.assertEqual(bulk.summarize(results),
+                         dict(unsubscribed=1200, failed=1))
+        self.assertEqual(results[7][:2], ('user7@example.org', 'failed'))
+        # The roster is read a chunk at a time, each member is deleted
+        # once.
+        self.assertEqual(roster, [members[7]])
+        self.assertTrue(all(member.unsubscribe.call_count == 1
+                            for member in members))
+        self.assertTrue(all(
+            args[0] <= bulk.CHUNK_SIZE for args, kwargs
+            in self.mlist.get_member_page.call_args_list))
+        self.assertEqual(progress[-1], (1201, 1201))
+        self.assertEqual(len(progress), 13)
+
+    def test_unsubscribe_all_failures(self):
+        members = [create_mock_member(dict(email='user{0}@example.org'
+                                           .format(i)))
+                   for i in range(250)]
+        for member in members[:150]:
+            member.unsubscribe.side_effect = HTTPError(
+                'url', 500, 'Server error', None, None)
+        roster = list(members)
+        set_mock_members(self.mlist, roster)
+        results = bulk.unsubscribe_all(self.mlist)
+        self.assertEqual(bulk.summarize(results),
+                         dict(unsubscribed=100, failed=150))
+        self.assertEqual(roster, members[:150])
+        # The failed members are read past with the page number, not
+        # read again.
+        self.assertEqual(
+            [args for args, kwargs
+             in self.mlist.get_member_page.call_args_list][1:],
+            [(100, 1), (100, 2), (100, 2), (100, 2)])
+
+    def test_unsubscribe_all_empty(self):
+        set_mock_members(self.mlist, [])
+        self.assertEqual(bulk.member_count(self.mlist), 0)
+        self.assertEqual(bulk.unsubscribe_all(self.mlist), [])
+
+
+class MassSubscribeViewTest(TestCase):
+    """Tests for the mass subscription pages."""
+
+    def setUp(self):
+        User.objects.create_superuser('su', 'su@example.org', 'pwd')
+        self.client = Client()
+        self.client.login(username='su', password='pwd')
+        self.mlist = create_mock_list(dict(list_id='foo.example.org',
+                                           fqdn_listname='foo@example.org'))
+        # Let templates look up attributes instead of items.
+        self.mlist.__getitem__.side_effect = KeyError
+        self.mlist.subscribe.side_effect = _subscribe
+        for patcher in (patch.object(MailmanClient, 'get_list',
+                                     return_value=self.mlist),
+                        mock_roles(set())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @override_settings(POSTORIUS_RUN_JOBS_INLINE=True)
+    def test_summary_and_download(self):
+        url = reverse('mass_subscribe', args=['foo.example.org'])
+        response = self.client.post(
+            url, {'emails': 'alex@example.org\nles@example.org\nfoo'})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.context['job'].status, 'done')
+        self.assertEqual(response.context['summary']['subscribed'], 1)
+        self.assertEqual(response.context['summary']['invalid'], 1)
+        download = reverse('job_result', args=[response.context['job'].id])
+        self.assertContains(response, download)
+        response = self.client.get(download)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response.content.splitlines()[:3], [
+            b'address,status,detail',
+            b'alex@example.org,subscribed,',
+            b'les@example.org,member,HTTP Error 409: '
+            b'Member already subscribed'])
+
+    def test_only_owners_subscribe(self):
+        self.client.logout()
+        User.objects.create_user('les', 'les@example.org', 'pwd')
+        self.client.login(username='les', password='pwd')
+        response = self.client.post(
+            reverse('mass_subscribe', args=['foo.example.org']),
+            {'emails': 'alex@example.org'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.mlist.subscribe.called)
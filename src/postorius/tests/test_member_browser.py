@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from mailmanclient import Client as MailmanClient
+from mock import patch
+
+from postorius import cache, members
+from postorius.tests.utils import (create_mock_list, create_mock_member,
+                                   mock_roles, set_mock_members)
+
+
+NAMES = ['Geddy Lee', 'Alex Lifeson', 'Neil Peart', 'Les Claypool',
+         'Larry LaLonde']
+
+
+def _member(name):
+    email = '{0}@example.org'.format(name.replace(' ', '.').lower())
+    member = create_mock_member(dict(email=email, role='member'))
+    # Let templates look up attributes instead of items.
+    member.__getitem__.side_effect = KeyError
+    return member
+
+
+class MemberBrowserTest(SimpleTestCase):
+    """Tests for the paged member browser."""
+
+    def setUp(self):
+        cache._get_cache().clear()
+        self.members = [_member(name) for name in NAMES]
+        self.mlist = create_mock_list(dict(list_id='foo.example.org'))
+        set_mock_members(self.mlist, self.members)
+
+    def test_roster_order(self):
+        page = members.browse(self.mlist, 2, 2)
+        self.mlist.get_member_page.assert_called_once_with(2, 2)
+        self.assertEqual([member.email for member in page],
+                         ['neil.peart@example.org',
+                          'les.claypool@example.org'])
+        self.assertEqual(page.total_size, 5)
+        self.assertEqual(page.num_pages, 3)
+        self.assertTrue(page.has_next)
+
+    def test_search_and_sort(self):
+        page = members.browse(self.mlist, 1, 25, query='LA', sort='-email')
+        self.assertEqual([entry['email'] for entry in page],
+                         ['les.claypool@example.org',
+                          'larry.lalonde@example.org'])
+        self.assertEqual(page.total_size, 2)
+        self.assertFalse(page.has_next)
+        page = members.browse(self.mlist, 1, 25, query='peart')
+        self.assertEqual([entry['email'] for entry in page],
+                         ['neil.peart@example.org'])
+        # Small lists are not indexed.
+        self.assertEqual(cache.get_member_index('foo.example.org'),
+                         (None, {}))
+
+    @override_settings(POSTORIUS_MEMBER_INDEX_THRESHOLD=2)
+    def test_index_is_opt_in(self):
+        members.browse(self.mlist, sort='email')
+        members.browse(self.mlist, sort='email')
+        self.assertEqual(self.mlist.get_member_page.call_count, 2)
+        self.assertEqual(cache.get_member_index('foo.example.org'),
+                         (None, {}))
+
+    @override_settings(POSTORIUS_MEMBER_INDEX_TIMEOUT=3600,
+                       POSTORIUS_MEMBER_INDEX_THRESHOLD=2,
+                       POSTORIUS_MEMBER_INDEX_REFRESH_PAGES=1)
+    @patch('postorius.bulk.PAGE_SIZE', 2)
+    def test_index(self):
+        members.browse(self.mlist, sort='email')
+        self.assertEqual(self.mlist.get_member_page.call_count, 3)
+        state, pages = cache.get_member_index('foo.example.org')
+        self.assertEqual(state['pages'], 3)
+        self.assertEqual(len(pages), 3)
+        # Later requests only refresh one page of the roster each.
+        self.mlist.get_member_page.reset_mock()
+        members.browse(self.mlist, sort='email')
+        self.mlist.get_member_page.assert_called_once_with(2, 1)
+        # Unsubscriptions in Postorius apply right away...
+        members.discard('foo.example.org', 'Neil.Peart@example.org')
+        state, pages = cache.get_member_index('foo.example.org')
+        self.assertEqual(state['total'], 4)
+        self.assertNotIn('neil.peart@example.org',
+                         [entry['email'] for entry in pages[2]])
+        # ... others once their page is refreshed.
+        set_mock_members(self.mlist, self.members[:2] + self.members[3:])
+        self.mlist.get_member_page.reset_mock()
+        page = members.browse(self.mlist, sort='email')
+        self.mlist.get_member_page.assert_called_once_with(2, 2)
+        self.assertEqual([entry['email'] for entry in page], [
+            'alex.lifeson@example.org', 'geddy.lee@example.org',
+            'larry.lalonde@example.org', 'les.claypool@example.org'])
+        self.assertEqual(cache.get_member_index('foo.example.org')[0]
+                         ['pages'], 2)
+
+    @override_settings(POSTORIUS_MEMBER_INDEX_TIMEOUT=3600,
+                       POSTORIUS_MEMBER_INDEX_THRESHOLD=2)
+    def test_invalidate(self):
+        members.browse(self.mlist, query='a')
+        self.assertIsNotNone(cache.get_member_index('foo.example.org')[0])
+        members.invalidate('foo.example.org')
+        self.assertEqual(cache.get_member_index('foo.example.org'),
+                         (None, {}))
+
+
+class MemberBrowserViewTest(TestCase):
+    """Tests for the members page."""
+
+    def setUp(self):
+        User.objects.create_superuser('su', 'su@example.org', 'pwd')
+        self.client = Client()
+        self.client.login(username='su', password='pwd')
+        self.mlist = create_mock_list(dict(list_id='foo.example.org',
+                                           fqdn_listname='foo@example.org'))
+        self.mlist.__getitem__.side_effect = KeyError
+        set_mock_members(self.mlist, [_member(name) for name in NAMES])
+        for patcher in (patch.object(MailmanClient, 'get_list',
+                                     return_value=self.mlist),
+                        mock_roles(set())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @override_settings(POSTORIUS_MEMBER_PAGE_SIZES=(2, 25))
+    def test_search(self):
+        response = self.client.get(
+            reverse('list_members', args=['foo.example.org']),
+            {'q': 'la', 'sort': 'email', 'count': '2'})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['list'].member_page
+        self.assertEqual([entry['email'] for entry in page],
+                         ['larry.lalonde@example.org',
+                          'les.claypool@example.org'])
+        self.assertEqual(page.total_size, 2)
+        self.assertFalse(page.has_next)
+        self.assertIn('q=la', response.context['search_query'])
+
+    def test_invalid_page_size(self):
+        response = self.client.get(
+            reverse('list_members', args=['foo.example.org']),
+            {'count': '100000'})
+        self.mlist.get_member_page.assert_called_with(25, 1)
+        self.assertEqual(response.context['search_query'], '')
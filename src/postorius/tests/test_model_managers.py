@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.signals import request_started, request_finished
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from mailmanclient import Client
+from mock import patch, PropertyMock
+
+from postorius import cache
+from postorius.models import Domain, List
+from postorius.tests.utils import create_mock_domain, create_mock_list
+
+
+class RequestCacheTest(SimpleTestCase):
+    """Tests for the per-request identity map of the REST managers."""
+
+    def setUp(self):
+        request_started.send(sender=self.__class__)
+
+    def tearDown(self):
+        request_finished.send(sender=self.__class__)
+
+    @patch.object(Client, 'get_list')
+    def test_get_fetches_once_per_request(self, mock_get_list):
+        mock_get_list.return_value = create_mock_list(
+            dict(list_id='foo.example.org'))
+        first = List.objects.get(fqdn_listname='foo.example.org')
+        second = List.objects.get_or_404(fqdn_listname='foo.example.org')
+        self.assertIs(first, second)
+        self.assertEqual(mock_get_list.call_count, 1)
+
+    @patch.object(Client, 'get_list')
+    def test_get_keyed_by_lookup(self, mock_get_list):
+        List.objects.get(fqdn_listname='foo.example.org')
+        List.objects.get(fqdn_listname='bar.example.org')
+        self.assertEqual(mock_get_list.call_count, 2)
+
+    @patch.object(Client, 'get_list')
+    def test_cache_cleared_when_request_ends(self, mock_get_list):
+        List.objects.get(fqdn_listname='foo.example.org')
+        request_finished.send(sender=self.__class__)
+        List.objects.get(fqdn_listname='foo.example.org')
+        List.objects.get(fqdn_listname='foo.example.org')
+        self.assertEqual(mock_get_list.call_count, 3)
+
+    def test_all_fetches_once_per_request(self):
+        with patch.object(Client, 'lists',
+                          new_callable=PropertyMock) as mock_lists:
+            mock_lists.return_value = [create_mock_list()]
+            List.objects.all()
+            List.objects.all()
+            self.assertEqual(mock_lists.call_count, 1)
+
+    @patch.object(Client, 'create_domain')
+    def test_create_forgets_cached_resources(self, mock_create_domain):
+        with patch.object(Client, 'domains',
+                          new_callable=PropertyMock) as mock_domains:
+            mock_domains.return_value = [create_mock_domain()]
+            Domain.objects.all()
+            Domain.objects.create(mail_host='example.org')
+            Domain.objects.all()
+            self.assertEqual(mock_domains.call_count, 2)
+
+
+@override_settings(POSTORIUS_LIST_INDEX_TIMEOUT=900)
+class ListIndexTest(SimpleTestCase):
+    """Tests for the cached list index used to filter public lists."""
+
+    def setUp(self):
+        cache._get_cache().clear()
+        self.addCleanup(cache._get_cache().clear)
+        self.lists = []
+        self.settings_mocks = []
+        for name, advertised in (('foo', True), ('bar', False)):
+            mlist = create_mock_list(dict(
+                list_id='{0}.example.org'.format(name),
+                fqdn_listname='{0}@example.org'.format(name),
+                display_name=name.capitalize(), mail_host='example.org'))
+            settings_mock = PropertyMock(return_value=dict(
+                advertised=advertised, description=name))
+            type(mlist).settings = settings_mock
+            self.lists.append(mlist)
+            self.settings_mocks.append(settings_mock)
+        patcher = patch.object(Client, 'lists', new_callable=PropertyMock,
+                               return_value=self.lists)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_public(self):
+        public = List.objects.all(only_public=True)
+        self.assertEqual(public, [self.lists[0]])
+        self.assertEqual(len(List.objects.all()), 2)
+
+    def test_settings_fetched_once(self):
+        List.objects.all(only_public=True)
+        List.objects.all(only_public=True)
+        for settings_mock in self.settings_mocks:
+            self.assertEqual(settings_mock.call_count, 1)
+
+    def test_index_entries(self):
+        index = List.objects.get_index(self.lists)
+        self.assertEqual(index['bar.example.org'],
+                         dict(list_id='bar.example.org',
+                              fqdn_listname='bar@example.org',
+                              display_name='Bar', mail_host='example.org',
+                              advertised=False, description='bar'))
+
+    def test_index_entries_served_from_cache(self):
+        List.objects.get_index(self.lists)
+        with patch.object(Client, 'lists',
+                          new_callable=PropertyMock) as mock_lists:
+            entries = List.objects.get_index_entries()
+        self.assertFalse(mock_lists.called)
+        self.assertEqual(sorted(entry['list_id'] for entry in entries),
+                         ['bar.example.org', 'foo.example.org'])
+
+    def test_refresh_index(self):
+        List.objects.all(only_public=True)
+        self.settings_mocks[1].return_value = dict(
+            advertised=True, description='bar')
+        List.objects.refresh_index(self.lists[1])
+        self.assertEqual(len(List.objects.all(only_public=True)), 2)
+
+    def test_forget_index(self):
+        List.objects.get_index(self.lists)
+        List.objects.forget_index('bar.example.org')
+        self.assertEqual(list(cache.get_list_index()['lists'].keys()),
+                         ['foo.example.org'])
+
+    @override_settings(POSTORIUS_LIST_INDEX_TIMEOUT=None)
+    def test_not_cached_by_default(self):
+        List.objects.all(only_public=True)
+        self.assertEqual(cache.get_list_index(),
+                         dict(lists={}, complete=False))
+        # The index is still shared within a request.
+        request_started.send(sender=self.__class__)
+        self.addCleanup(request_finished.send, sender=self.__class__)
+        List.objects.all(only_public=True)
+        List.objects.all(only_public=True)
+        for settings_mock in self.settings_mocks:
+            self.assertEqual(settings_mock.call_count, 2)
+
+
+MEMBERSHIPS = [
+    dict(list_id='foo.example.org', email='les@example.org', role='owner'),
+    dict(list_id='bar.example.org', email='les@example.org',
+         role='moderator'),
+    dict(list_id='bar.example.org', email='geddy@example.org',
+         role='moderator'),
+    dict(list_id='baz.example.org', email='geddy@example.org', role='owner'),
+]
+
+
+def _find(path, data):
+    entries = [entry for entry in MEMBERSHIPS
+               if entry['email'] == data['subscriber'] and
+               entry['role'] == data['role']]
+    if not entries:
+        # Mailman leaves out the entries if nothing matches.
+        return None, dict(total_size=0)
+    return None, dict(total_size=len(entries), entries=entries)
+
+
+@patch('postorius.models.call_api')
+class UserRolesTest(SimpleTestCase):
+    """Tests for looking up the lists a user owns or moderates."""
+
+    def setUp(self):
+        cache._get_cache().clear()
+
+    def _call(self, mock_call):
+        mock_call.side_effect = _find
+        return mock_call
+
+    def test_user_roles(self, mock_call):
+        call = self._call(mock_call)
+        roles = List.objects.get_user_roles('les@example.org')
+        self.assertEqual(roles, dict(owner=set(['foo.example.org']),
+                                     moderator=set(['bar.example.org'])))
+        # One query per role, no list or roster is fetched.
+        self.assertEqual(call.call_count, 2)
+        call.assert_called_with('members/find', data={
+            'subscriber': 'les@example.org', 'role': 'moderator'})
+
+    def test_limited_to_lists(self, mock_call):
+        self._call(mock_call)
+        roles = List.objects.get_user_roles(
+            'geddy@example.org',
+            [create_mock_list(dict(list_id='bar.example.org'))])
+        self.assertEqual(roles, dict(owner=set(),
+                                     moderator=set(['bar.example.org'])))
+
+    def test_no_roles(self, mock_call):
+        self._call(mock_call)
+        self.assertEqual(List.objects.get_user_roles('neil@example.org'),
+                         dict(owner=set(), moderator=set()))
+
+    def test_fetched_once_per_request(self, mock_call):
+        call = self._call(mock_call)
+        request_started.send(sender=self.__class__)
+        self.addCleanup(request_finished.send, sender=self.__class__)
+        List.objects.get_user_roles('les@example.org')
+        List.objects.get_user_roles('les@example.org')
+        self.assertEqual(call.call_count, 2)
+
+    @override_settings(POSTORIUS_CACHE_TIMEOUTS={
+        'owners': 60, 'moderators': 60})
+    def test_cached_across_requests(self, mock_call):
+        call = self._call(mock_call)
+        List.objects.get_user_roles('les@example.org')
+        List.objects.get_user_roles('les@example.org')
+        self.assertEqual(call.call_count, 2)
+        cache.invalidate('owners')
+        List.objects.get_user_roles('les@example.org')
+        self.assertEqual(call.call_count, 4)
+
+    def test_not_cached_by_default(self, mock_call):
+        call = self._call(mock_call)
+        List.objects.get_user_roles('les@example.org')
+        List.objects.get_user_roles('les@example.org')
+        self.assertEqual(call.call_count, 4)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+from mailmanclient import Client as MailmanClient
+from mock import patch
+
+from postorius import jobs, search
+from postorius.models import (Job, Mailman404Error, SearchEntry, SearchToken,
+                              tokenize)
+from postorius.tests.utils import (create_mock_domain, create_mock_list,
+                                   create_mock_member, set_mock_members)
+
+
+def _keys(results):
+    return [entry.key for entry in results[0]]
+
+
+class TokenizeTest(TestCase):
+    """Tests for the splitting of entries into words."""
+
+    def test_words(self):
+        self.assertEqual(tokenize('Les.Orchard@Example.org', 'Big List'),
+                         set(['les', 'orchard', 'example', 'org', 'big',
+                              'list']))
+
+    def test_underscores_and_empty(self):
+        self.assertEqual(tokenize('foo_bar', None, ''), set(['foo', 'bar']))
+
+
+class SearchIndexTest(TestCase):
+    """Tests for the maintenance and queries of the search index."""
+
+    def setUp(self):
+        search.index_list(create_mock_list(dict(
+            list_id='foo.example.org', display_name='Foo Announcements')))
+        search.index_list(create_mock_list(dict(
+            list_id='football.example.org', display_name='Football')))
+        search.index_domain('example.org', 'http://example.org')
+        search.add_members('foo.example.org',
+                           ['Les@example.org', 'neil@example.org'])
+        search.add_members('football.example.org', ['les@example.org'])
+
+    def test_prefix_match(self):
+        self.assertEqual(_keys(search.search('foo', 'list')),
+                         ['foo.example.org', 'football.example.org'])
+        self.assertEqual(_keys(search.search('announce', 'list')),
+                         ['foo.example.org'])
+        # Only the start of words matches.
+        self.assertEqual(search.search('ball', 'list'), ([], 0))
+
+    def test_all_words_match(self):
+        self.assertEqual(_keys(search.search('foo exam', 'list')),
+                         ['foo.example.org', 'football.example.org'])
+        self.assertEqual(_keys(search.search('football announce', 'list')),
+                         [])
+
+    def test_exact_key_first(self):
+        search.index_list(create_mock_list(dict(
+            list_id='a.football.example.org', display_name='')))
+        self.assertEqual(_keys(search.search('football.example.org', 'list')),
+                         ['football.example.org', 'a.football.example.org'])
+
+    def test_members(self):
+        results, total = search.search('les', 'person')
+        self.assertEqual(total, 2)
+        self.assertEqual([(entry.key, entry.list_id) for entry in results],
+                         [('les@example.org', 'foo.example.org'),
+                          ('les@example.org', 'football.example.org')])
+        self.assertEqual(_keys(search.search('les', 'person',
+                                             ['football.example.org'])),
+                         ['les@example.org'])
+
+    def test_reindex_replaces(self):
+        search.index_list(create_mock_list(dict(
+            list_id='foo.example.org', display_name='Foo Discussion')))
+        self.assertEqual(_keys(search.search('announce', 'list')), [])
+        self.assertEqual(_keys(search.search('discussion', 'list')),
+                         ['foo.example.org'])
+        self.assertEqual(SearchEntry.objects.filter(kind='list').count(), 2)
+
+    def test_remove_members(self):
+        search.remove_members('foo.example.org', ['LES@example.org'])
+        self.assertEqual([entry.list_id for entry
+                          in search.search('les', 'person')[0]],
+                         ['football.example.org'])
+
+    def test_remove_list(self):
+        search.remove_list('foo.example.org')
+        self.assertEqual(_keys(search.search('foo', 'list')),
+                         ['football.example.org'])
+        self.assertEqual(_keys(search.search('neil', 'person')), [])
+
+    def test_remove_domain(self):
+        search.remove_domain('example.org')
+        self.assertEqual(SearchEntry.objects.count(), 0)
+        self.assertEqual(SearchToken.objects.count(), 0)
+
+    @override_settings(POSTORIUS_SEARCH_PAGE_SIZE=1)
+    def test_pages(self):
+        search.index_list(create_mock_list(dict(
+            list_id='foo.example.net', display_name='')))
+        self.assertEqual(search.search('foo', 'list', page=1),
+                         (list(SearchEntry.objects.filter(
+                             key='foo.example.net')), 3))
+        self.assertEqual(_keys(search.search('foo', 'list', page=2)),
+                         ['foo.example.org'])
+        self.assertEqual(_keys(search.search('foo', 'list', page=3)),
+                         ['football.example.org'])
+        self.assertEqual(search.search('foo', 'list', page=4), ([], 3))
+
+    def test_empty_query(self):
+        self.assertEqual(search.search(' .', 'list'), ([], 0))
+
+
+class SyncSearchIndexTest(TestCase):
+    """Tests for the sync_search_index command and the job hooks."""
+
+    def setUp(self):
+        self.mlist = create_mock_list(dict(list_id='foo.example.org',
+                                           display_name='Foo'))
+        set_mock_members(self.mlist, [
+            create_mock_member(dict(email='les@example.org')),
+            create_mock_member(dict(email='neil@example.org'))])
+        self.domain = create_mock_domain(dict(
+            mail_host='example.org', base_url='http://example.org'))
+
+    def _sync(self, **options):
+        out = StringIO()
+        with patch('postorius.models.List.objects.all',
+                   return_value=[self.mlist]), \
+                patch('postorius.models.Domain.objects.all',
+                      return_value=[self.domain]):
+            call_command('sync_search_index', stdout=out, **options)
+        return out.getvalue()
+
+    def test_command(self):
+        search.index_list(create_mock_list(dict(list_id='old.example.org',
+                                                display_name='')))
+        search.add_members('old.example.org', ['les@example.org'])
+        self.assertIn('Indexed 1 domains, 1 lists and 2 members.',
+                      self._sync())
+        self.assertEqual(_keys(search.search('example', 'list')),
+                         ['foo.example.org'])
+        self.assertEqual(_keys(search.search('example', 'domain')),
+                         ['example.org'])
+        self.assertEqual(_keys(search.search('example', 'person')),
+                         ['les@example.org', 'neil@example.org'])
+
+    def test_command_without_members(self):
+        self.assertIn('Indexed 1 domains, 1 lists and 0 members.',
+                      self._sync(members=False))
+        self.assertEqual(search.search('les', 'person'), ([], 0))
+
+    def test_unsubscribe_all_job(self):
+        search.add_members('foo.example.org', ['les@example.org'])
+        with patch('postorius.models.List.objects.get',
+                   return_value=self.mlist):
+            jobs.run(Job.objects.claim(jobs.enqueue(
+                'unsubscribe_all', list_id='foo.example.org').id))
+        self.assertEqual(search.search('les', 'person'), ([], 0))
+
+
+class GlobalSearchViewTest(TestCase):
+    """Tests for the global search of the dashboard."""
+
+    def setUp(self):
+        User.objects.create_user('les', 'les@example.org', 'pwd')
+        self.client = Client()
+        self.client.login(username='les', password='pwd')
+        search.index_list(create_mock_list(dict(
+            list_id='foo.example.org', display_name='Foo')))
+        search.index_list(create_mock_list(dict(
+            list_id='bar.example.org', display_name='Bar')))
+        search.add_members('foo.example.org', ['neil@example.org'])
+        search.add_members('bar.example.org', ['neil@example.org'])
+        patcher = patch.object(MailmanClient, 'get_user',
+                               side_effect=Mailman404Error)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('postorius.views.user.filter_tasks_by_role')
+    @patch('postorius.models.List.objects.all')
+    @patch('postorius.models.List.objects.get_user_roles',
+           return_value=dict(owner=set(['foo.example.org']),
+                             moderator=set()))
+    def test_search_own_lists(self, mock_roles, mock_all, mock_filter):
+        response = self.client.post(reverse('user_dashboard'), {
+            'query_field': 'example', 'check_lists': 'on',
+            'check_people': 'on'})
+        result = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(result['lists'], [{'display_name': 'Foo',
+                                            'list_id': 'foo.example.org'}])
+        self.assertEqual(result['people'], [{'useremail': 'neil@example.org',
+                                             'list_id': 'foo.example.org'}])
+        # The search is limited with the roles of the user, without
+        # fetching and filtering the lists and tasks.
+        mock_roles.assert_called_once_with('les@example.org')
+        self.assertFalse(mock_all.called)
+        self.assertFalse(mock_filter.called)
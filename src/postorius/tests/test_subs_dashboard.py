@@ -145,12 +145,12 @@ class TestTasksManagement(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue('Priority Not Set' in response.content)
         # Test Prioritization
-        self.client.post(reverse('set_task_priority', args=(self.task.task_id, 1)))
+        self.client.post(reverse('set_task_priority', args=(self.task.pk, 1)))
         response = self.client.get(reverse('user_dashboard'))
         self.assertEqual(response.status_code, 200)
         self.assertTrue('High Priority' in response.content)
         # Test Unprioritization
-        self.client.post(reverse('set_task_priority', args=(self.task.task_id, 1)))
+        self.client.post(reverse('set_task_priority', args=(self.task.pk, 1)))
         response = self.client.get(reverse('user_dashboard'))
         self.assertEqual(response.status_code, 200)
         self.assertTrue('Priority Not Set' in response.content)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.contrib.auth.models import User
+from django.core.signals import request_finished, request_started
+from django.core.urlresolvers import reverse
+from django.test import Client, SimpleTestCase, TestCase
+from mailmanclient import Client as MailmanClient
+from mock import MagicMock, patch
+
+from postorius.models import List, Mailman404Error
+from postorius.tests.utils import create_mock_list, mock_roles
+
+
+def _found(*emails):
+    return None, dict(total_size=len(emails),
+                      entries=[dict(email=email) for email in emails])
+
+
+@patch('postorius.models.call_api')
+class SubscribedAddressTest(SimpleTestCase):
+    """Tests for looking up the subscription of a user to a list."""
+
+    def test_subscribed(self, call):
+        call.side_effect = [_found(), _found('les@example.com')]
+        self.assertEqual(
+            List.objects.get_subscribed_address(
+                'foo.example.org', ['les@example.org', 'les@example.com',
+                                    'les@example.net']),
+            'les@example.com')
+        # The addresses are looked up until one is subscribed.
+        self.assertEqual(call.call_count, 2)
+        call.assert_called_with(
+            'members/find', data={'subscriber': 'les@example.com',
+                                  'list_id': 'foo.example.org',
+                                  'role': 'member'})
+
+    def test_fetched_once_per_request(self, call):
+        request_started.send(sender=self.__class__)
+        self.addCleanup(request_finished.send, sender=self.__class__)
+        with patch.object(List.objects, '_find_members',
+                          return_value=[]) as mock_find:
+            for i in range(2):
+                self.assertIsNone(List.objects.get_subscribed_address(
+                    'foo.example.org', ['les@example.org', 'les@example.com']))
+        self.assertEqual(mock_find.call_count, 2)
+
+    def test_not_subscribed(self, call):
+        call.return_value = None, dict(total_size=0)
+        self.assertIsNone(List.objects.get_subscribed_address(
+            'foo.example.org', ['les@example.org']))
+
+
+class ListSummarySubscriptionTest(TestCase):
+    """Tests for the subscription status on the list summary page."""
+
+    def setUp(self):
+        User.objects.create_user('les', 'les@example.org', 'pwd')
+        self.client = Client()
+        self.client.login(username='les', password='pwd')
+        self.mlist = create_mock_list(dict(list_id='foo.example.org',
+                                           fqdn_listname='foo@example.org'))
+        self.mlist.__getitem__.side_effect = KeyError
+        self.mm_user = MagicMock(user_id=42, addresses=[
+            'les@example.org', 'les@example.com', 'les@example.net'])
+        for name, value in (('get_list', self.mlist),
+                            ('get_user', self.mm_user)):
+            patcher = patch.object(MailmanClient, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock_roles(set())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch.object(List.objects, 'get_subscribed_address',
+                  return_value='les@example.com')
+    def test_subscribed(self, mock_lookup):
+        response = self.client.get(reverse('list_summary',
+                                           args=['foo.example.org']))
+        self.assertTrue(response.context['userSubscribed'])
+        self.assertEqual(response.context['subscribed_address'],
+                         'les@example.com')
+        # The addresses are looked up, the roster isn't probed.
+        mock_lookup.assert_called_once_with(
+            'foo.example.org',
+            ['les@example.org', 'les@example.com', 'les@example.net'])
+        self.assertFalse(self.mlist.get_member.called)
+
+    @patch.object(List.objects, 'get_subscribed_address', return_value=None)
+    def test_without_mailman_user(self, mock_lookup):
+        MailmanClient.get_user.side_effect = Mailman404Error
+        response = self.client.get(reverse('list_summary',
+                                           args=['foo.example.org']))
+        self.assertFalse(response.context['userSubscribed'])
+        mock_lookup.assert_called_once_with('foo.example.org',
+                                            ['les@example.org'])
+
+    @patch.object(List.objects, 'get_subscribed_address',
+                  return_value='les@example.org')
+    def test_change_subscription(self, mock_lookup):
+        response = self.client.post(
+            reverse('change_subscription', args=['foo.example.org']),
+            {'email': 'les@example.net'})
+        self.assertEqual(response.status_code, 302)
+        self.mlist.unsubscribe.assert_called_once_with('les@example.org')
+        self.mlist.subscribe.assert_called_once_with('les@example.net')
+        self.assertFalse(self.mlist.get_member.called)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.test import SimpleTestCase
+from mailmanclient import Client
+from mock import patch, MagicMock
+
+from postorius.models import List
+from postorius.views.user import filter_tasks_by_role
+
+
+def _mock_task(task_type, list_id, user_email='lorem@example.org'):
+    return MagicMock(task_type=task_type, list_id=list_id,
+                     user_email=user_email)
+
+
+class FilterTasksByRoleTest(SimpleTestCase):
+    """Tests for filtering dashboard tasks by the user's roles."""
+
+    def setUp(self):
+        self.user = MagicMock(email='les@example.org', is_superuser=False)
+        patcher = patch.object(List.objects, 'get_user_roles',
+                               return_value=dict(
+                                   owner=set(['foo.example.org']),
+                                   moderator=set(['bar.example.org'])))
+        self.mock_roles = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tasks_filtered_by_role(self):
+        tasks = [
+            _mock_task('subscription', 'foo.example.org'),
+            _mock_task('moderation', 'foo.example.org'),
+            _mock_task('subscription', 'bar.example.org'),
+            _mock_task('moderation', 'bar@example.org'),
+            _mock_task('moderation', 'baz.example.org'),
+            _mock_task('manual', '', 'les@example.org'),
+            _mock_task('manual', '', 'geddy@example.org'),
+        ]
+        self.assertEqual(filter_tasks_by_role(self.user, tasks, []),
+                         [tasks[0], tasks[1], tasks[3], tasks[5]])
+
+    @patch.object(Client, 'get_list')
+    def test_roles_looked_up_once(self, mock_get_list):
+        tasks = [_mock_task('moderation', 'qux.example.org')
+                 for i in range(50)]
+        self.assertEqual(filter_tasks_by_role(self.user, tasks, []), [])
+        self.mock_roles.assert_called_once_with('les@example.org')
+        # The lists of the tasks are not fetched.
+        self.assertFalse(mock_get_list.called)
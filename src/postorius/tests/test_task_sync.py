@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2012-2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime
+
+from django.db import IntegrityError
+from django.test import TestCase
+from django.test.utils import override_settings
+from mailmanclient import Client
+from mock import patch, PropertyMock
+
+from postorius.models import (AdminTasks, AdminTasksManager, TaskCalender,
+                              TaskSyncTime)
+from postorius.tests.utils import create_mock_list
+from postorius.views.user import (create_moderation_tasks,
+                                  create_subscription_tasks)
+
+
+def _held(request_id, sender='les@example.org'):
+    return dict(request_id=request_id, sender=sender, subject='Hi',
+                msg='Hello', hold_date='2015-06-01T10:00:{0:02d}.000000'.format(
+                    request_id))
+
+
+def _request(token, email='les@example.org'):
+    return dict(token=token, email=email, list_id='foo.example.org',
+                request_date='2015-06-01T10:00:00')
+
+
+@override_settings(POSTORIUS_TASK_SYNC_INTERVAL=0)
+class TaskSyncTest(TestCase):
+    """Tests for synchronising tasks with the pending requests."""
+
+    def setUp(self):
+        self.foo_list = create_mock_list(dict(
+            list_id='foo.example.org', held=[_held(1), _held(2)],
+            requests=[_request('abc')]))
+        self.bar_list = create_mock_list(dict(
+            list_id='bar.example.org', held=[_held(3)], requests=[]))
+        self.lists = [self.foo_list, self.bar_list]
+
+    def test_tasks_created(self):
+        tasks = create_moderation_tasks(self.lists)
+        self.assertEqual([(t.list_id, t.task_id) for t in tasks],
+                         [('foo.example.org', '1'), ('foo.example.org', '2'),
+                          ('bar.example.org', '3')])
+        self.assertEqual(tasks[0].msg_subject, 'Hi')
+        tasks = create_subscription_tasks(self.lists)
+        self.assertEqual([(t.list_id, t.task_id) for t in tasks],
+                         [('foo.example.org', 'abc')])
+        self.assertEqual(AdminTasks.objects.count(), 4)
+
+    def test_sync_is_idempotent(self):
+        create_moderation_tasks(self.lists)
+        self.assertEqual(create_moderation_tasks(self.lists), [])
+        self.assertEqual(AdminTasks.objects.count(), 3)
+
+    def test_resolved_requests_deleted(self):
+        create_moderation_tasks(self.lists)
+        # Request 1 was handled out of band, request 4 is new.
+        self.foo_list.held = [_held(2), _held(4)]
+        tasks = create_moderation_tasks(self.lists)
+        self.assertEqual([t.task_id for t in tasks], ['4'])
+        self.assertEqual(
+            sorted(AdminTasks.objects.values_list('task_id', flat=True)),
+            ['2', '3', '4'])
+
+    def test_other_task_types_untouched(self):
+        create_subscription_tasks(self.lists)
+        self.foo_list.held = []
+        self.bar_list.held = []
+        create_moderation_tasks(self.lists)
+        self.assertEqual(AdminTasks.objects.count(), 1)
+
+    def test_stats_logged(self):
+        create_moderation_tasks(self.lists)
+        self.assertEqual(
+            TaskCalender.objects.get(list_id='foo.example.org').log_number,
+            2)
+
+    @override_settings(POSTORIUS_TASK_SYNC_INTERVAL=60)
+    def test_recently_synced_lists_skipped(self):
+        create_moderation_tasks(self.lists)
+        self.assertEqual(TaskSyncTime.objects.count(), 2)
+        self.foo_list.held = [_held(4)]
+        self.assertEqual(create_moderation_tasks(self.lists), [])
+        AdminTasks.objects.expire_sync('foo.example.org')
+        tasks = create_moderation_tasks(self.lists)
+        self.assertEqual([t.task_id for t in tasks], ['4'])
+        self.assertEqual(AdminTasks.objects.count(), 2)
+
+    def test_concurrent_sync_retried(self):
+        sync = AdminTasksManager._sync
+        calls = []
+
+        def concurrent_sync(manager, *args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise IntegrityError
+            return sync(manager, *args)
+        with patch.object(AdminTasksManager, '_sync', autospec=True,
+                          side_effect=concurrent_sync):
+            tasks = create_moderation_tasks(self.lists)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(tasks), 3)
+        self.assertEqual(TaskSyncTime.objects.count(), 2)
+
+
+class CreateTaskTest(TestCase):
+    """Tests for creating single tasks."""
+
+    def setUp(self):
+        self.foo_list = create_mock_list(dict(
+            list_id='foo.example.org', held=[_held(1), _held(2)]))
+
+    @patch.object(Client, 'get_list')
+    def test_payload_passed_in(self, mock_get_list):
+        task = AdminTasks.objects.create_task(
+            task_id=2, task_type='moderation', stamp=datetime.now(),
+            user_email='les@example.org', list_id='foo.example.org',
+            msg_subject='Hi', msg_data='Hello')
+        self.assertEqual(task.msg_subject, 'Hi')
+        self.assertFalse(mock_get_list.called)
+
+    @patch.object(Client, 'get_list')
+    def test_payload_looked_up_in_own_list(self, mock_get_list):
+        mock_get_list.return_value = self.foo_list
+        with patch.object(Client, 'lists',
+                          new_callable=PropertyMock) as mock_lists:
+            task = AdminTasks.objects.create_task(
+                task_id=2, task_type='moderation', stamp=datetime.now(),
+                user_email='les@example.org', list_id='foo.example.org')
+            self.assertFalse(mock_lists.called)
+        mock_get_list.assert_called_once_with(fqdn_listname='foo.example.org')
+        self.assertEqual(task.msg_data, 'Hello')
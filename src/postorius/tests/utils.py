@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License along with
 # Postorius.  If not, see <http://www.gnu.org/licenses/>.
 
+import threading
+from functools import partial
+
 from mock import patch, MagicMock
 
 
@@ -72,3 +75,61 @@ def create_mock_member(properties=None):
         for key in properties:
             setattr(mock_object, key, properties[key])
     return mock_object
+
+
+class MockPage(list):
+    """A page of a mocked roster, like the pages of mailmanclient."""
+
+    def __init__(self, entries, count, nr):
+        super(MockPage, self).__init__(entries[(nr - 1) * count:nr * count])
+        self._entries = entries
+        self._count = count
+        self.nr = nr
+        self.total_size = len(entries)
+
+    @property
+    def has_next(self):
+        return self._count * self.nr < self.total_size
+
+    @property
+    def has_previous(self):
+        return self.nr > 1
+
+    @property
+    def next(self):
+        if self.has_next:
+            return MockPage(self._entries, self._count, self.nr + 1)
+
+    @property
+    def previous(self):
+        if self.has_previous:
+            return MockPage(self._entries, self._count, self.nr - 1)
+
+
+def set_mock_members(mock_list, members):
+    """Make `members` the roster of a mocked List, also for its paged
+    access through `get_member_page`. Members which are unsubscribed
+    leave the roster, unless their `unsubscribe` is mocked otherwise.
+    """
+    mock_list.members = members
+    lock = threading.Lock()
+
+    def leave(member):
+        # Members are unsubscribed concurrently.
+        with lock:
+            members.remove(member)
+    for member in members:
+        if member.unsubscribe.side_effect is None:
+            member.unsubscribe.side_effect = partial(leave, member)
+    mock_list.get_member_page.side_effect = (
+        lambda count=50, page=1: MockPage(members, count, page))
+
+
+def mock_roles(roles):
+    """Patch the lookup of single roles on lists, so that an address holds
+    the roles given in `roles`, a set of (list_id, role, address) tuples.
+    """
+    return patch(
+        'postorius.models.MailmanListManager._has_role',
+        side_effect=lambda list_id, role, address: (
+            (list_id, role, address) in roles))
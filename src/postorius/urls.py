@@ -58,6 +58,9 @@ per_list_urlpatterns = patterns('postorius.views',
                                 url(r'^subscription_requests$',
                                     'list_subscription_requests',
                                     name='list_subscription_requests'),
+                                url(r'^subscription_requests/bulk$',
+                                    'bulk_moderate_subscription_requests',
+                                    name='bulk_moderate_subscription_requests'),
                                 url(r'^handle_subscription_request/(?P<request_id>[^/]+)/(?P<action>[accept|reject|discard|defer]+)$',
                                     'handle_subscription_request',
                                     name='handle_subscription_request'),
@@ -81,6 +84,9 @@ per_list_urlpatterns = patterns('postorius.views',
                                 url(r'^held_messages/(?P<msg_id>[^/]+)/'
                                     'reject$', 'reject_held_message',
                                     name='reject_held_message'),
+                                url(r'^held_messages/bulk$',
+                                    'bulk_moderate_held_messages',
+                                    name='bulk_moderate_held_messages'),
                                 url(r'^held_messages$',
                                     'list_held_messages',
                                     name='list_held_messages'),
@@ -125,7 +131,7 @@ urlpatterns = patterns(
     url(r'^user_dashboard/(?P<list_id>[^/]+)/(?P<sub_id>[^/]+)/(?P<action>[accept|reject|discard]+)$',
         'handle_sub_task',
         name='handle_sub_task'),
-    url(r'^user_dashboard/(?P<task_id>[^/]+)/(?P<priority>[^/]+)$',
+    url(r'^user_dashboard/(?P<task_pk>\d+)/(?P<priority>[^/]+)$',
         'set_task_priority',
         name='set_task_priority'),
     url(r'^user_dashboard/(?P<reorder_param>[\w+]+)$',
@@ -137,8 +143,14 @@ urlpatterns = patterns(
     url(r'^user_dashboard/(?P<task_id>[^/]+)$',
         'discard_manual_task',
         name='discard_manual_task'),
+    # /jobs/
+    url(r'^jobs/$', 'job_index', name='job_index'),
+    url(r'^jobs/(?P<job_id>\d+)/$', 'job_detail', name='job_detail'),
+    url(r'^jobs/(?P<job_id>\d+)/result\.csv$', 'job_result',
+        name='job_result'),
     # /settings/
     url(r'^settings/$', 'site_settings', name="site_settings"),
+    url(r'^settings/export/$', 'site_export', name='site_export'),
     url(r'^domains/$', 'domain_index', name='domain_index'),
     url(r'^domains/new/$', 'domain_new', name='domain_new'),
     url(r'^domains/(?P<domain>[^/]+)/delete$',
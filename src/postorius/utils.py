@@ -15,21 +15,243 @@
 #
 # You should have received a copy of the GNU General Public License along with
 # Postorius.  If not, see <http://www.gnu.org/licenses/>.
+import json
 import logging
+import threading
+import time
 
+from multiprocessing.pool import ThreadPool
 from django.conf import settings
 from django.shortcuts import render_to_response, redirect
 from django.template import RequestContext
-from mailmanclient import Client
+from httplib2 import Http, Response
+from mailmanclient import Client, MailmanConnectionError, __version__
+from postorius import cache
+try:
+    from Queue import Queue, Empty
+    from httplib import HTTPException
+    from urllib import urlencode
+    from urllib2 import HTTPError
+    from urlparse import urljoin
+except ImportError:
+    from queue import Queue, Empty
+    from http.client import HTTPException
+    from urllib.error import HTTPError
+    from urllib.parse import urlencode, urljoin
 
 
 logger = logging.getLogger(__name__)
 
 
+class PooledConnection(object):
+    """A connection to the Mailman REST API that keeps HTTP connections
+    alive.
+
+    It wraps the connection of a `mailmanclient.Client`, whose base url
+    and credentials it uses, and takes over its calls. Instead of opening
+    a new connection for every REST call, up to `pool_size`
+    ``httplib2.Http`` instances are kept around and handed out to one
+    thread at a time, so the connection can be shared by all request
+    threads of a process. If `persistent` is False, connections are
+    closed after each call, but the pool still limits concurrency. Reads
+    failing with a connection error are retried `retries` times, waiting
+    ``backoff * 2 ** attempt`` seconds between the attempts; writes never
+    are, since the first attempt may have reached the server.
+    """
+
+    RETRIED_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, connection, pool_size=10, timeout=None, retries=0,
+                 backoff=0, persistent=True):
+        self.connection = connection
+        self.persistent = persistent
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._idle = Queue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def __getattr__(self, name):
+        if name == 'connection':
+            raise AttributeError(name)
+        return getattr(self.connection, name)
+
+    def _request(self, url, method, data, headers):
+        with self._slots:
+            try:
+                http = self._idle.get_nowait()
+            except Empty:
+                http = Http(timeout=self.timeout)
+            try:
+                return http.request(url, method, data, headers)
+            finally:
+                if self.persistent:
+                    self._idle.put(http)
+                else:
+                    http.close()
+
+    def call(self, path, data=None, method=None):
+        """Make a call to the Mailman REST API.
+
+        Same signature and return value as the call of the wrapped
+        connection.
+        """
+        headers = {
+            'User-Agent': 'GNU Mailman REST client v{0}'.format(__version__),
+            }
+        if data is not None:
+            data = urlencode(data, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if method is None:
+            method = 'GET' if data is None else 'POST'
+        method = method.upper()
+        if self.connection.basic_auth:
+            headers['Authorization'] = 'Basic ' + self.connection.basic_auth
+        url = urljoin(self.connection.baseurl, path)
+        attempts = 1
+        if method in self.RETRIED_METHODS:
+            attempts += self.retries
+        for attempt in range(attempts):
+            try:
+                response, content = self._request(url, method, data, headers)
+                break
+            except (IOError, HTTPException) as e:
+                if attempt + 1 >= attempts:
+                    raise MailmanConnectionError(
+                        'Could not connect to Mailman API')
+                logger.warning('Mailman API call %s %s failed (%s), '
+                               'retrying', method, url, e)
+                time.sleep(self.backoff * 2 ** attempt)
+        # If we did not get a 2xx status code, make this look like a
+        # urllib2 exception, like mailmanclient does.
+        if response.status // 100 != 2:
+            raise HTTPError(url, response.status, content, response, None)
+        if len(content) == 0:
+            return response, None
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return response, json.loads(content)
+
+
+class CachedConnection(object):
+    """A connection to the Mailman REST API serving the GET responses of
+    the resources configured in ``POSTORIUS_CACHE_TIMEOUTS`` from
+    `postorius.cache`. Other calls are passed on to the wrapped
+    `connection`.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __getattr__(self, name):
+        if name == 'connection':
+            raise AttributeError(name)
+        return getattr(self.connection, name)
+
+    def call(self, path, data=None, method=None):
+        """Make a call to the Mailman REST API.
+
+        Same signature and return value as the call of the wrapped
+        connection.
+        """
+        url = urljoin(self.connection.baseurl, path)
+        resource = None
+        if data is None and (method or 'GET').upper() == 'GET' and \
+                url.startswith(self.connection.baseurl):
+            resource = cache.get_resource(url[len(self.connection.baseurl):])
+        if resource is not None:
+            cached = cache.get_cached(resource, url)
+            if cached is not None:
+                headers, content = cached
+                return Response(headers), content
+        response, content = self.connection.call(path, data, method)
+        if resource is not None:
+            cache.store(resource, url, (dict(response), content))
+        return response, content
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
 def get_client():
-    return Client('{0}/3.0'.format(settings.MAILMAN_API_URL),
-                  settings.MAILMAN_USER,
-                  settings.MAILMAN_PASS)
+    """Return the process-wide Mailman REST API client.
+
+    The client is created once per set of API credentials and shared by
+    all threads. Its connection pool can be configured in the settings:
+
+        >>> MAILMAN_CLIENT_POOL_SIZE = 10
+        >>> MAILMAN_CLIENT_TIMEOUT = 30
+        >>> MAILMAN_CLIENT_RETRIES = 2
+        >>> MAILMAN_CLIENT_RETRY_BACKOFF = 0.1
+        >>> MAILMAN_CLIENT_PERSISTENT = True
+
+    """
+    key = (settings.MAILMAN_API_URL, settings.MAILMAN_USER,
+           settings.MAILMAN_PASS)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = Client('{0}/3.0'.format(settings.MAILMAN_API_URL),
+                                settings.MAILMAN_USER,
+                                settings.MAILMAN_PASS)
+                client._connection = CachedConnection(PooledConnection(
+                    client._connection,
+                    pool_size=getattr(
+                        settings, 'MAILMAN_CLIENT_POOL_SIZE', 10),
+                    timeout=getattr(settings, 'MAILMAN_CLIENT_TIMEOUT', 30),
+                    retries=getattr(settings, 'MAILMAN_CLIENT_RETRIES', 2),
+                    backoff=getattr(
+                        settings, 'MAILMAN_CLIENT_RETRY_BACKOFF', 0.1),
+                    persistent=getattr(
+                        settings, 'MAILMAN_CLIENT_PERSISTENT', True)))
+                _clients[key] = client
+    return client
+
+
+def call_api(path, data=None, method=None):
+    """Make a call to the Mailman REST API with the connection of the
+    client (see `get_client`), for the resources the client has no
+    methods for. Returns the response and its decoded content.
+    """
+    return get_client()._connection.call(path, data, method)
+
+
+def run_concurrently(func, items, workers=None,
+                     errors=(HTTPError, MailmanConnectionError)):
+    """Call `func` for each of `items` in a bounded pool of threads.
+
+    Returns a list of ``(item, error)`` tuples in the order of `items`,
+    where `error` is None or the exception of `errors` (by default the
+    API errors) raised for the item. Other exceptions are raised. The
+    pool size can be configured:
+
+        >>> POSTORIUS_BULK_WORKERS = 4
+
+    It shouldn't exceed ``MAILMAN_CLIENT_POOL_SIZE``, since every worker
+    holds a connection of the client while it waits for the API.
+    """
+    if workers is None:
+        workers = getattr(settings, 'POSTORIUS_BULK_WORKERS', 4)
+
+    def call(item):
+        try:
+            func(item)
+        except errors as e:
+            return item, e
+        return item, None
+
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(call, items)
+    finally:
+        pool.close()
+        pool.join()
 
 
 def render_api_error(request):
@@ -17,6 +17,7 @@
 # Postorius.  If not, see <http://www.gnu.org/licenses/>.
 
 from postorius.views.api import *
+from postorius.views.jobs import *
 from postorius.views.list import *
 from postorius.views.settings import *
 from postorius.views.user import *
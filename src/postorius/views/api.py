@@ -53,7 +53,6 @@ logger = logging.getLogger(__name__)
 @basic_auth_login
 @loggedin_or_403
 def api_list_index(request):
-    client = utils.get_client()
-    res, content = client._connection.call('lists')
+    res, content = utils.call_api('lists')
     return HttpResponse(json.dumps(content['entries']),
                         content_type="application/json")
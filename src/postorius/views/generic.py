@@ -22,6 +22,7 @@ from django.shortcuts import render_to_response, redirect
 from django.template import Context, loader, RequestContext
 from django.views.generic import TemplateView, View
 
+from postorius.auth.utils import get_list_roles
 from postorius.models import (Domain, List, Member, MailmanUser,
                               MailmanApiError, Mailman404Error)
 from postorius import utils
@@ -48,32 +49,16 @@ class MailingListView(TemplateView, MailmanClientMixin):
     def _get_list(self, list_id, page):
         return List.objects.get_or_404(fqdn_listname=list_id)
 
-    def _is_list_owner(self, user, mailing_list):
-        if not user.is_authenticated():
-            return False
-        if user.email in mailing_list.owners:
-            return True
-        return False
-
-    def _is_list_moderator(self, user, mailing_list):
-        if not user.is_authenticated():
-            return False
-        if user.email in mailing_list.moderators:
-            return True
-        return False
-
     def dispatch(self, request, *args, **kwargs):
         # get the list object.
         if 'list_id' in kwargs:
             try:
                 self.mailing_list = self._get_list(kwargs['list_id'],
                                                    int(kwargs.get('page', 1)))
+                # Sets request.user.is_list_owner/is_list_moderator.
+                get_list_roles(request, kwargs['list_id'])
             except MailmanApiError:
                 return utils.render_api_error(request)
-            request.user.is_list_owner = self._is_list_owner(
-                request.user, self.mailing_list)
-            request.user.is_list_moderator = self._is_list_moderator(
-                request.user, self.mailing_list)
         # set the template
         if 'template' in kwargs:
             self.template = kwargs['template']
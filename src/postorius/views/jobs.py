@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, render_to_response
+from django.template import RequestContext
+
+from postorius.models import Job
+
+
+def _get_job(request, job_id):
+    job = get_object_or_404(Job, id=job_id)
+    if not request.user.is_superuser and job.owner_id != request.user.id:
+        raise PermissionDenied
+    return job
+
+
+@login_required
+def job_index(request):
+    """Shows the recent background jobs of the user (of all users for
+    superusers).
+    """
+    jobs = Job.objects.order_by('-created_on', '-id')
+    if not request.user.is_superuser:
+        jobs = jobs.filter(owner=request.user)
+    return render_to_response('postorius/jobs/index.html',
+                              {'jobs': jobs.defer('arguments', 'result')[:50]},
+                              context_instance=RequestContext(request))
+
+
+@login_required
+def job_detail(request, job_id):
+    """Shows the status, progress and summary of a background job."""
+    job = _get_job(request, job_id)
+    result = job.get_result()
+    return render_to_response('postorius/jobs/detail.html',
+                              {'job': job,
+                               'summary': result.get('summary'),
+                               'downloadable': 'rows' in result},
+                              context_instance=RequestContext(request))
+
+
+@login_required
+def job_result(request, job_id):
+    """Download the result rows of a finished job as CSV."""
+    job = _get_job(request, job_id)
+    result = job.get_result()
+    if 'rows' not in result:
+        raise Http404
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = (
+        'attachment; filename="{0}-{1}.csv"'.format(job.kind, job.id))
+    writer = csv.writer(response)
+    for row in [result.get('header', [])] + result['rows']:
+        writer.writerow([u'{0}'.format(each).encode('utf-8')
+                         for each in row])
+    return response
@@ -15,27 +15,29 @@
 #
 # You should have received a copy of the GNU General Public License along with
 # Postorius.  If not, see <http://www.gnu.org/licenses/>.
+import collections
 import logging
-import csv
+import json
 
-from django.http import HttpResponse
+from datetime import datetime
+
+from django.http import HttpResponse, StreamingHttpResponse
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import (login_required,
                                             user_passes_test)
 from django.core.urlresolvers import reverse
 from django.shortcuts import render_to_response, redirect
 from django.template import RequestContext
-from django.core.validators import validate_email
-from django.core.exceptions import ValidationError
 from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
 from django.utils.translation import gettext as _
-from datetime import datetime
 try:
     from urllib2 import HTTPError
 except ImportError:
     from urllib.error import HTTPError
-from postorius import utils
+from postorius import bulk, cache, export, jobs, members, search, utils
 from postorius.models import (Domain, List, MailmanApiError, AdminTasks, EventTracker)
 from postorius.forms import *
 from postorius.auth.decorators import *
@@ -50,14 +52,36 @@ class ListMembersView(MailingListView):
     """Display all members of a given list.
     """
 
-    def _get_list(self, list_id, page):
-        m_list = super(ListMembersView, self)._get_list(list_id, page)
-        m_list.member_page = m_list.get_member_page(25, page)
+    def _get_member_page(self, request, page):
+        form = MemberSearch(request.GET)
+        params = {}
+        if form.is_valid():
+            params = dict((key, value) for key, value
+                          in form.cleaned_data.items() if value)
+        m_list = self.mailing_list
+        m_list.member_page = members.browse(
+            m_list, page, params.get('count'), params.get('q', ''),
+            params.get('sort', ''))
         m_list.member_page_nr = page
         m_list.member_page_previous_nr = page - 1
         m_list.member_page_next_nr = page + 1
-        m_list.member_page_show_next = len(m_list.member_page) >= 25
-        return m_list
+        m_list.member_page_show_next = m_list.member_page.has_next
+        return form, urlencode(params)
+
+    def _render(self, request, page, owner_form, moderator_form):
+        try:
+            search_form, search_query = self._get_member_page(request,
+                                                              int(page))
+        except MailmanApiError:
+            return utils.render_api_error(request)
+        return render_to_response('postorius/lists/members.html',
+                                  {'list': self.mailing_list,
+                                   'owner_form': owner_form,
+                                   'moderator_form': moderator_form,
+                                   'export_form': ListMemberExport(),
+                                   'search_form': search_form,
+                                   'search_query': search_query},
+                                  context_instance=RequestContext(request))
 
     @method_decorator(list_owner_required)
     def post(self, request, list_id, page=1):
@@ -67,6 +91,7 @@ class ListMembersView(MailingListView):
                 try:
                     self.mailing_list.add_owner(
                         owner_form.cleaned_data['owner_email'])
+                    cache.invalidate('owners')
                     messages.success(
                         request, _('%s has been added as list owner.'
                                    % request.POST['owner_email']))
@@ -78,28 +103,19 @@ class ListMembersView(MailingListView):
                 try:
                     self.mailing_list.add_moderator(
                         moderator_form.cleaned_data['moderator_email'])
+                    cache.invalidate('moderators')
                     messages.success(
                         request, _('%s has been added as list moderator.'
                                    % request.POST['moderator_email']))
                 except HTTPError as e:
                     messages.error(request, _(e.msg))
-        owner_form = NewOwnerForm()
-        moderator_form = NewModeratorForm()
-        return render_to_response('postorius/lists/members.html',
-                                  {'list': self.mailing_list,
-                                   'owner_form': owner_form,
-                                   'moderator_form': moderator_form},
-                                  context_instance=RequestContext(request))
+        return self._render(request, page, NewOwnerForm(),
+                            NewModeratorForm())
 
     @method_decorator(list_owner_required)
     def get(self, request, list_id, page=1):
-        owner_form = NewOwnerForm()
-        moderator_form = NewModeratorForm()
-        return render_to_response('postorius/lists/members.html',
-                                  {'list': self.mailing_list,
-                                   'owner_form': owner_form,
-                                   'moderator_form': moderator_form},
-                                  context_instance=RequestContext(request))
+        return self._render(request, page, NewOwnerForm(),
+                            NewModeratorForm())
 
 
 class ListMemberOptionsView(MailingListView):
@@ -108,9 +124,8 @@ class ListMemberOptionsView(MailingListView):
     @method_decorator(list_owner_required)
     def post(self, request, list_id, email):
         try:
-            client = utils.get_client()
-            mm_member = client.get_member(list_id, email)
-            mm_list = client.get_list(list_id)
+            mm_member = self.mailing_list.get_member(email)
+            mm_list = self.mailing_list
             preferences_form = UserPreferences(request.POST)
             if preferences_form.is_valid():
                 preferences = mm_member.preferences
@@ -140,9 +155,8 @@ class ListMemberOptionsView(MailingListView):
     @method_decorator(list_owner_required)
     def get(self, request, list_id, email):
         try:
-            client = utils.get_client()
-            mm_member = client.get_member(list_id, email)
-            mm_list = client.get_list(list_id)
+            mm_member = self.mailing_list.get_member(email)
+            mm_list = self.mailing_list
             settingsform = UserPreferences(initial=mm_member.preferences)
         except MailmanApiError:
             return utils.render_api_error(request)
@@ -190,17 +204,11 @@ class ListSummaryView(MailingListView):
             # Anonymous User, everyone logged out.
             user_emails = None
 
-        userSubscribed = False
         subscribed_address = None
         if user_emails is not None:
-            for address in user_emails:
-                try:
-                    userMember = self.mailing_list.get_member(address)
-                except ValueError:
-                    pass
-                else:
-                    userSubscribed = True
-                    subscribed_address = address
+            subscribed_address = List.objects.get_subscribed_address(
+                self.mailing_list.list_id, user_emails)
+        userSubscribed = subscribed_address is not None
         data =  {'list': self.mailing_list,
                  'userSubscribed': userSubscribed,
                  'subscribed_address': subscribed_address}
@@ -224,21 +232,22 @@ class ChangeSubscriptionView(MailingListView):
             mm_user = MailmanUser.objects.get(address=request.user.email)
             user_emails = [str(address) for address in mm_user.addresses]
             form = ListSubscribe(user_emails, request.POST)
-            for address in user_emails:
-                try:
-                    userMember = self.mailing_list.get_member(address)
-                except ValueError:
-                    pass
-                else:
-                    userSubscribed = True
-                    old_email = address
+            old_email = List.objects.get_subscribed_address(
+                self.mailing_list.list_id, user_emails)
             if form.is_valid():
                 email = form.cleaned_data['email']
-                if old_email == email:
+                if old_email is None:
+                    messages.error(request,
+                                   'You are not subscribed to this list.')
+                elif old_email == email:
                     messages.error(request, 'You are already subscribed')
                 else:
                     self.mailing_list.unsubscribe(old_email)
                     self.mailing_list.subscribe(email)
+                    members.invalidate(self.mailing_list.list_id)
+                    search.remove_members(self.mailing_list.list_id,
+                                          [old_email])
+                    search.add_members(self.mailing_list.list_id, [email])
                     messages.success(request,
                         'Subscription changed to {} address'.format(email))
             else:
@@ -275,11 +284,16 @@ class ListSubscribeView(MailingListView):
                     email, pre_verified=True, pre_confirmed=True)
                 if type(response) == dict and response.get('token_owner') == \
                         'moderator':
+                    AdminTasks.objects.expire_sync(
+                        self.mailing_list.list_id)
                     messages.success(
                         request,
                         'Your subscription request has been submitted and is '
                         'waiting for moderator approval.')
                 else:
+                    cache.invalidate('lists')
+                    members.invalidate(self.mailing_list.list_id)
+                    search.add_members(self.mailing_list.list_id, [email])
                     messages.success(
                         request, 'You are subscribed to %s.' %
                         self.mailing_list.fqdn_listname)
@@ -302,6 +316,9 @@ class ListUnsubscribeView(MailingListView):
         email = kwargs['email']
         try:
             self.mailing_list.unsubscribe(email)
+            cache.invalidate('lists')
+            members.discard(self.mailing_list.list_id, email)
+            search.remove_members(self.mailing_list.list_id, [email])
             messages.success(request,
                              '%s has been unsubscribed from this list.' %
                              email)
@@ -322,30 +339,16 @@ class ListMassSubscribeView(MailingListView):
                                   {'form': form, 'list': self.mailing_list},
                                   context_instance=RequestContext(request))
 
+    @method_decorator(list_owner_required)
     def post(self, request, *args, **kwargs):
         form = ListMassSubscription(request.POST)
         if not form.is_valid():
             messages.error(request, 'Please fill out the form correctly.')
-        else:
-            emails = request.POST["emails"].splitlines()
-            for email in emails:
-                try:
-                    validate_email(email)
-                    self.mailing_list.subscribe(address=email, pre_verified=True,
-                                                pre_confirmed=True)
-                    messages.success(
-                        request,
-                        'The address %s has been subscribed to %s.' %
-                        (email, self.mailing_list.fqdn_listname))
-                except MailmanApiError:
-                    return utils.render_api_error(request)
-                except HTTPError as e:
-                    messages.error(request, e)
-                except ValidationError:
-                    messages.error(request,
-                                   'The email address %s is not valid.' %
-                                   email)
-        return redirect('mass_subscribe', self.mailing_list.list_id)
+            return redirect('mass_subscribe', self.mailing_list.list_id)
+        job = jobs.enqueue('mass_subscribe', owner=request.user,
+                           list_id=self.mailing_list.list_id,
+                           emails=form.cleaned_data['emails'])
+        return redirect('job_detail', job.id)
 
 
 class ListMassRemovalView(MailingListView):
@@ -364,46 +367,35 @@ class ListMassRemovalView(MailingListView):
         form = ListMassRemoval(request.POST)
         if not form.is_valid():
             messages.error(request, 'Please fill out the form correctly.')
-        else:
-            emails = request.POST["emails"].splitlines()
-            for email in emails:
-                try:
-                    validate_email(email)
-                    self.mailing_list.unsubscribe(email.lower())
-                    messages.success(request,
-                                    'The address %s has been unsubscribed from %s.' %
-                                    (email, self.mailing_list.fqdn_listname))
-                except MailmanApiError:
-                    return utils.render_api_error(request)
-                except (HTTPError, ValueError) as e:
-                    messages.error(request, e)
-                except ValidationError:
-                    messages.error(request,
-                                  'The email address %s is not valid.' %
-                                  email)
-        return redirect('mass_removal', self.mailing_list.list_id)
+            return redirect('mass_removal', self.mailing_list.list_id)
+        job = jobs.enqueue('mass_unsubscribe', owner=request.user,
+                           list_id=self.mailing_list.list_id,
+                           emails=form.cleaned_data['emails'])
+        return redirect('job_detail', job.id)
 
 
 @list_owner_required
 def csv_view(request, list_id):
-    """Export all the subscriber in csv
+    """Export the members of a list.
+
+    The roster is streamed page by page in the chosen format, with the
+    chosen columns (see `postorius.export`).
     """
-    mm_lists = []
     try:
-        client = utils.get_client()
-        mm_lists = client.get_list(list_id)
+        mm_list = List.objects.get_or_404(fqdn_listname=list_id)
     except MailmanApiError:
         return utils.render_api_error(request)
-
-    response = HttpResponse(content_type='text/csv')
+    form = ListMemberExport(request.GET or request.POST)
+    if not form.is_valid():
+        messages.error(request, _('Please choose valid columns and format.'))
+        return redirect('list_members', mm_list.list_id)
+    format = form.cleaned_data['format']
+    response = StreamingHttpResponse(
+        export.stream_members(mm_list, form.cleaned_data['columns'], format),
+        content_type=export.CONTENT_TYPES[format])
     response['Content-Disposition'] = (
-        'attachment; filename="Subscribers.csv"')
-
-    writer = csv.writer(response)
-    if mm_lists:
-        for i in mm_lists.members:
-            writer.writerow([i.email])
-
+        'attachment; filename="{0}-members.{1}"'.format(mm_list.list_id,
+                                                       format))
     return response
 
 
@@ -448,6 +440,9 @@ def list_new(request, template='postorius/lists/new.html'):
                 list_settings["description"] = form.cleaned_data['description']
                 list_settings["advertised"] = form.cleaned_data['advertised']
                 list_settings.save()
+                cache.invalidate('lists', 'owners', 'settings')
+                List.objects.refresh_index(mailing_list)
+                search.index_list(mailing_list)
                 messages.success(request, _("List created"))
                 return redirect("list_summary",
                                 list_id=mailing_list.list_id)
@@ -466,29 +461,134 @@ def list_new(request, template='postorius/lists/new.html'):
                               context_instance=RequestContext(request))
 
 
+# Attributes the list index can be sorted by.
+LIST_INDEX_SORT_KEYS = ('fqdn_listname', 'display_name', 'list_id',
+                        'mail_host')
+LIST_INDEX_MAX_PAGE_SIZE = 200
+
+
+def _get_int_param(request, name, default):
+    try:
+        return max(1, int(request.GET.get(name, default)))
+    except ValueError:
+        return default
+
+
+class _IndexedList(object):
+    """A list of the list index page, built from its index entry."""
+
+    def __init__(self, entry):
+        self.__dict__.update(entry)
+        self.index_entry = entry
+
+
+def _get_rest_list_page(page_nr, count):
+    """Return one page of all lists and the total number of lists, using
+    the paged list resource of the REST API.
+    """
+    page = List.objects.get_page(count, page_nr)
+    num_pages = max(1, (page.total_size + count - 1) // count)
+    if page_nr > num_pages:
+        page = List.objects.get_page(count, num_pages)
+    lists = list(page)
+    index = List.objects.get_index(lists, complete=False)
+    for mlist in lists:
+        mlist.index_entry = index[mlist.list_id]
+    return lists, page.total_size
+
+
+def _get_indexed_list_page(page_nr, count, sort, domain, query,
+                           only_public):
+    """Return one page of the lists matching `domain` and `query` and the
+    total number of matching lists, filtered and sorted in the list
+    index.
+    """
+    query = query.lower()
+    entries = []
+    for entry in List.objects.get_index_entries():
+        if only_public and not entry['advertised']:
+            continue
+        if domain and entry['mail_host'] != domain:
+            continue
+        if query and not (
+                query in entry['fqdn_listname'].lower() or
+                query in entry['display_name'].lower() or
+                query in (entry['description'] or '').lower()):
+            continue
+        entries.append(entry)
+    key = sort.lstrip('-')
+    entries.sort(key=lambda entry: (entry[key] or '').lower(),
+                 reverse=sort.startswith('-'))
+    num_pages = max(1, (len(entries) + count - 1) // count)
+    start = (min(page_nr, num_pages) - 1) * count
+    return ([_IndexedList(entry) for entry in entries[start:start + count]],
+            len(entries))
+
+
 def list_index(request, template='postorius/lists/index.html'):
-    """Show a table of all public mailing lists.
+    """Show a table of all public mailing lists, one page at a time.
+
+    The lists are selected with the query parameters `page`, `count`
+    (lists per page, at most 200), `sort` (a list attribute, prefixed
+    with `-` for descending order), `domain` (a mail host) and `q` (part
+    of the name, address or description of a list). The number of lists
+    per page defaults to:
+
+        >>> POSTORIUS_LIST_INDEX_PAGE_SIZE = 50
+
+    Lists are sorted by `list_id` by default, the order of the REST API,
+    so unfiltered pages for superusers are fetched from the API on their
+    own. Other orders and filters are served from the list index, which
+    can be cached (see `postorius.cache`). So are all pages for other
+    users: the API can't leave out unadvertised lists, which must neither
+    be shown nor counted.
     """
-    lists = []
-    error = None
+    if request.method == 'POST':
+        return redirect("list_summary", list_id=request.POST["list"])
     only_public = True
     if request.user.is_superuser:
         only_public = False
+    page_nr = _get_int_param(request, 'page', 1)
+    count = min(_get_int_param(
+        request, 'count',
+        getattr(settings, 'POSTORIUS_LIST_INDEX_PAGE_SIZE', 50)),
+        LIST_INDEX_MAX_PAGE_SIZE)
+    sort = request.GET.get('sort', 'list_id')
+    if sort.lstrip('-') not in LIST_INDEX_SORT_KEYS:
+        sort = 'list_id'
+    domain = request.GET.get('domain', '')
+    query = request.GET.get('q', '').strip()
     try:
-        lists = List.objects.all(only_public=only_public)
-        logger.debug(lists)
+        if sort == 'list_id' and not (domain or query or only_public):
+            lists, total = _get_rest_list_page(page_nr, count)
+        else:
+            lists, total = _get_indexed_list_page(
+                page_nr, count, sort, domain, query, only_public)
     except MailmanApiError:
         return utils.render_api_error(request)
+    num_pages = max(1, (total + count - 1) // count)
+    page_nr = min(page_nr, num_pages)
     choosable_domains = _get_choosable_domains(request)
-    if request.method == 'POST':
-        return redirect("list_summary", list_id=request.POST["list"])
-    else:
-        return render_to_response(
-            template, {
-                'error': error,
-                'lists': sorted(lists, key=lambda l: l.fqdn_listname),
-                'domain_count': len(choosable_domains),
-            }, context_instance=RequestContext(request))
+    filter_query = urlencode(
+        [(name, value) for name, value in (
+            ('domain', domain), ('q', query), ('count', count)) if value])
+    return render_to_response(
+        template, {
+            'lists': lists,
+            'list_count': total,
+            'page_nr': page_nr,
+            'page_count': num_pages,
+            'page_previous_nr': page_nr - 1,
+            'page_next_nr': page_nr + 1,
+            'page_show_next': page_nr < num_pages,
+            'sort': sort,
+            'domain': domain,
+            'query': query,
+            'filter_query': filter_query,
+            'domains': [mail_host for mail_host, label
+                        in choosable_domains[1:]],
+            'domain_count': len(choosable_domains),
+        }, context_instance=RequestContext(request))
 
 
 @login_required
@@ -531,6 +631,9 @@ def list_subscriptions(request, option=None, list_id=None,
                     the_list.subscribe(
                         address=email,
                         display_name=form.cleaned_data.get('display_name', ''))
+                    cache.invalidate('lists')
+                    members.invalidate(the_list.list_id)
+                    search.add_members(the_list.list_id, [email])
                     return render_to_response(
                         'postorius/lists/summary.html',
                         {'list': the_list, 'option': option,
@@ -553,6 +656,9 @@ def list_subscriptions(request, option=None, list_id=None,
                 try:
                     email = form.cleaned_data["email"]
                     the_list.unsubscribe(address=email)
+                    cache.invalidate('lists')
+                    members.discard(the_list.list_id, email)
+                    search.remove_members(the_list.list_id, [email])
                     return render_to_response(
                         'postorius/lists/summary.html',
                         {'list': the_list,
@@ -592,40 +698,44 @@ def list_subscriptions(request, option=None, list_id=None,
                               context_instance=RequestContext(request))
 
 def add_mod_event(request, msg_id, list_id, action):
-    """Adds a Moderation Event Log For Event Tracker."""
-    event_count = EventTracker.objects.get_count()
-    if event_count == 30:
-        EventTracker.objects.earliest('made_on').delete()
-    the_list = List.objects.get_or_404(fqdn_listname=list_id)
-    the_msg = next((each for each in the_list.held if each['request_id'] == int(msg_id)), None)
-    event = 'moderation-' + action
-    user_email = the_msg['sender']
-    made_on = datetime.now()
-    event_op = request.user.email
-    event_logged = EventTracker.objects.create_event(
-                    user_email=user_email,
-                    event_op=event_op,
-                    event=event,
-                    list_id=list_id,
-                    made_on=made_on)
+    """Adds a Moderation Event Log For Event Tracker and returns the
+    sender of the message, or None if the message isn't held (anymore).
+
+    The sender is taken from the dashboard task of the message, or else
+    from the held message itself.
+    """
+    list_id = list_id.replace('@', '.')
+    sender = AdminTasks.objects.get_sender('moderation', list_id, msg_id)
+    if sender is None:
+        msg = List.objects.get_held_message(list_id, msg_id)
+        if msg is None:
+            return None
+        sender = msg['sender']
+    EventTracker.objects.log_event(user_email=sender,
+                                   event_op=request.user.email,
+                                   event='moderation-' + action,
+                                   list_id=list_id)
+    return sender
 
 def add_sub_event(request, sub_id, list_id, action):
-    """Adds an Subscription Event Log For Event Tracker."""
-    event_count = EventTracker.objects.get_count()
-    if event_count == 30:
-        EventTracker.objects.earliest('made_on').delete()
-    the_list = List.objects.get_or_404(fqdn_listname=list_id)
-    sub_req = next((each for each in the_list.requests if each['token'] == sub_id), None)
-    event = 'subscription-' + action
-    user_email = sub_req['email']
-    made_on = datetime.now()
-    event_op = request.user.email
-    event_logged = EventTracker.objects.create_event(
-                   user_email=user_email,
-                   event_op=event_op,
-                   event=event,
-                   list_id=list_id,
-                   made_on=made_on)
+    """Adds an Subscription Event Log For Event Tracker and returns the
+    address of the subscriber, or None if the request is gone.
+
+    The subscriber is taken from the dashboard task of the request, or
+    else from the request itself.
+    """
+    list_id = list_id.replace('@', '.')
+    email = AdminTasks.objects.get_sender('subscription', list_id, sub_id)
+    if email is None:
+        sub_request = List.objects.get_request(list_id, sub_id)
+        if sub_request is None:
+            return None
+        email = sub_request['email']
+    EventTracker.objects.log_event(user_email=email,
+                                   event_op=request.user.email,
+                                   event='subscription-' + action,
+                                   list_id=list_id)
+    return email
 
 	
 @list_owner_required
@@ -638,6 +748,12 @@ def list_delete(request, list_id):
         return utils.render_api_error(request)
     if request.method == 'POST':
         the_list.delete()
+        cache.invalidate('lists', 'owners', 'moderators', 'settings')
+        List.objects.forget_index(the_list.list_id)
+        search.remove_list(the_list.list_id)
+        AdminTasks.objects.filter(list_id=the_list.list_id).exclude(
+            task_type='manual').delete()
+        AdminTasks.objects.expire_sync(the_list.list_id)
         return redirect("list_index")
     else:
         submit_url = reverse('list_delete',
@@ -669,7 +785,9 @@ def accept_held_message(request, list_id, msg_id):
     """
     try:
         the_list = List.objects.get_or_404(fqdn_listname=list_id)
-        add_mod_event(request, msg_id, list_id, 'accept')
+        if add_mod_event(request, msg_id, list_id, 'accept') is None:
+            messages.error(request, "Held Message Not Found")
+            return redirect('list_held_messages', the_list.list_id)
         the_list.accept_message(msg_id)
     except MailmanApiError:
         return utils.render_api_error(request)
@@ -686,7 +804,9 @@ def discard_held_message(request, list_id, msg_id):
     """
     try:
         the_list = List.objects.get_or_404(fqdn_listname=list_id)
-        add_mod_event(request, msg_id, list_id, 'discard')
+        if add_mod_event(request, msg_id, list_id, 'discard') is None:
+            messages.error(request, "Held Message Not Found")
+            return redirect('list_held_messages', the_list.list_id)
         the_list.discard_message(msg_id)
     except MailmanApiError:
         return utils.render_api_error(request)
@@ -703,7 +823,9 @@ def defer_held_message(request, list_id, msg_id):
     """
     try:
         the_list = List.objects.get_or_404(fqdn_listname=list_id)
-        add_mod_event(request, msg_id, list_id, 'defer')
+        if add_mod_event(request, msg_id, list_id, 'defer') is None:
+            messages.error(request, "Held Message Not Found")
+            return redirect('list_held_messages', the_list.list_id)
         the_list.defer_message(msg_id)
     except MailmanApiError:
         return utils.render_api_error(request)
@@ -720,7 +842,9 @@ def reject_held_message(request, list_id, msg_id):
     """
     try:
         the_list = List.objects.get_or_404(fqdn_listname=list_id)
-        add_mod_event(request, msg_id, list_id, 'reject')
+        if add_mod_event(request, msg_id, list_id, 'reject') is None:
+            messages.error(request, "Held Message Not Found")
+            return redirect('list_held_messages', the_list.list_id)
         the_list.reject_message(msg_id)
     except MailmanApiError:
         return utils.render_api_error(request)
@@ -736,7 +860,7 @@ def list_subscription_requests(request, list_id):
     """Shows a list of held messages.
     """
     try:
-        m_list = utils.get_client().get_list(list_id)
+        m_list = List.objects.get_or_404(fqdn_listname=list_id)
     except MailmanApiError:
         return utils.render_api_error(request)
     return render_to_response('postorius/lists/subscription_requests.html',
@@ -760,10 +884,17 @@ def handle_subscription_request(request, list_id, request_id, action):
         'defer': _('The request has been defered.'),
     }
     try:
-        m_list = utils.get_client().get_list(list_id)
+        m_list = List.objects.get_or_404(fqdn_listname=list_id)
         # Moderate request and add feedback message to session.
-        add_sub_event(request, request_id, list_id, action)
+        email = add_sub_event(request, request_id, list_id, action)
+        if email is None:
+            messages.error(request, "Subscription Request Not Found")
+            return redirect('list_subscription_requests', m_list.list_id)
         m_list.moderate_request(request_id, action)
+        if action == 'accept':
+            cache.invalidate('lists')
+            members.invalidate(m_list.list_id)
+            search.add_members(m_list.list_id, [email])
         messages.success(request, confirmation_messages[action])
     except MailmanApiError:
         return utils.render_api_error(request)
@@ -773,6 +904,112 @@ def handle_subscription_request(request, list_id, request_id, action):
     return redirect('list_subscription_requests', m_list.list_id)
 
 
+BULK_MODERATION = {
+    'moderation': (('accept', 'discard', 'reject', 'defer'),
+                   'list_held_messages'),
+    'subscription': (('accept', 'discard', 'reject', 'defer'),
+                     'list_subscription_requests'),
+}
+
+BULK_MODERATION_DONE = {
+    'accept': _('accepted'),
+    'discard': _('discarded'),
+    'reject': _('rejected'),
+    'defer': _('deferred'),
+}
+
+
+def moderate_in_bulk(request, the_list, task_type, ids, action):
+    """Moderate many held messages or subscription requests of a list.
+
+    The API calls run concurrently (see `utils.run_concurrently`), the
+    events of the handled requests are logged in one batch and their
+    dashboard tasks deleted. Returns a list of ``(id, error)`` tuples.
+    """
+    ids = list(collections.OrderedDict.fromkeys(ids))
+    senders = AdminTasks.objects.get_senders(task_type, the_list.list_id, ids)
+    if task_type == 'moderation':
+        if any(each not in senders for each in ids):
+            senders.update(('{0}'.format(msg['request_id']), msg['sender'])
+                           for msg in the_list.held)
+        results = utils.run_concurrently(
+            lambda msg_id: the_list.moderate_message(msg_id, action), ids)
+    else:
+        if any(each not in senders for each in ids):
+            senders.update((req['token'], req['email'])
+                           for req in the_list.requests)
+        results = utils.run_concurrently(
+            lambda token: the_list.moderate_request(token, action), ids)
+    done = [each for each, error in results if error is None]
+    made_on = datetime.now()
+    EventTracker.objects.log_events([
+        EventTracker(user_email=senders[each],
+                     event_op=request.user.email,
+                     event='{0}-{1}'.format(task_type, action),
+                     list_id=the_list.list_id,
+                     made_on=made_on)
+        for each in done if each in senders])
+    AdminTasks.objects.delete_tasks(task_type, the_list.list_id, done)
+    if task_type == 'subscription' and action == 'accept':
+        cache.invalidate('lists')
+        members.invalidate(the_list.list_id)
+        search.add_members(the_list.list_id,
+                           [senders[each] for each in done if each in senders])
+    return results
+
+
+def _bulk_moderate(request, list_id, task_type):
+    actions, queue_view = BULK_MODERATION[task_type]
+    try:
+        the_list = List.objects.get_or_404(fqdn_listname=list_id)
+    except MailmanApiError:
+        return utils.render_api_error(request)
+    action = request.POST.get('action')
+    ids = request.POST.getlist('ids')
+    if request.method != 'POST' or action not in actions or not ids:
+        if request.is_ajax():
+            return HttpResponse(status=400)
+        messages.error(request, _('Please select an action and at least '
+                                  'one entry.'))
+        return redirect(queue_view, the_list.list_id)
+    try:
+        results = moderate_in_bulk(request, the_list, task_type, ids, action)
+    except MailmanApiError:
+        return utils.render_api_error(request)
+    if request.is_ajax():
+        return HttpResponse(json.dumps({'action': action, 'results': [
+            {'id': each, 'ok': error is None,
+             'error': None if error is None else '{0}'.format(error)}
+            for each, error in results]}), content_type='application/json')
+    done = BULK_MODERATION_DONE[action]
+    failed = [each for each, error in results if error is not None]
+    if len(failed) < len(results):
+        messages.success(request, _('%(count)d of %(total)d entries were '
+                                    '%(done)s.') % {
+            'count': len(results) - len(failed), 'total': len(results),
+            'done': done})
+    if failed:
+        messages.error(request, _('The following entries could not be '
+                                  '%(done)s: %(ids)s') % {
+            'done': done, 'ids': ', '.join(failed)})
+    return redirect(queue_view, the_list.list_id)
+
+
+@list_moderator_required
+def bulk_moderate_held_messages(request, list_id):
+    """Accepts, discards, rejects or defers many held messages at once.
+    """
+    return _bulk_moderate(request, list_id, 'moderation')
+
+
+@list_moderator_required
+def bulk_moderate_subscription_requests(request, list_id):
+    """Accepts, discards, rejects or defers many subscription requests at
+    once.
+    """
+    return _bulk_moderate(request, list_id, 'subscription')
+
+
 SETTINGS_SECTION_NAMES = (
     ('list_identity', _('List Identity')),
     ('automatic_responses', _('Automatic Responses')),
@@ -825,6 +1062,9 @@ def list_settings(request, list_id=None, visible_section=None,
                     for key in form.fields.keys():
                         list_settings[key] = form.cleaned_data[key]
                     list_settings.save()
+                    cache.invalidate('lists', 'settings')
+                    List.objects.refresh_index(m_list)
+                    search.index_list(m_list)
                     messages.success(request,
                                      _('The settings have been updated.'))
                 except HTTPError as e:
@@ -867,6 +1107,7 @@ def remove_role(request, list_id=None, role=None, address=None,
     if request.method == 'POST':
         try:
             the_list.remove_role(role, address)
+            cache.invalidate('owners', 'moderators')
         except MailmanApiError:
             return utils.render_api_error(request)
         except HTTPError as e:
@@ -927,18 +1168,13 @@ def remove_all_subscribers(request, list_id):
 
     try:
         mlist = List.objects.get_or_404(fqdn_listname=list_id)
-        if len(mlist.members) == 0:
+        if bulk.member_count(mlist) == 0:
             messages.error(request, 'No member is subscribed to the list currently.')
             return redirect('mass_removal', mlist.list_id)
         if request.method == 'POST':
-            try:
-                for names in mlist.members:
-                    mlist.unsubscribe(names.email)
-                messages.success(request,
-                                'All members have been unsubscribed from the list.')
-                return redirect('list_members', mlist.list_id)
-            except Exception as e:
-                messages.error(request, e)
+            job = jobs.enqueue('unsubscribe_all', owner=request.user,
+                               list_id=mlist.list_id)
+            return redirect('job_detail', job.id)
         return render_to_response('postorius/lists/confirm_removeall_subscribers.html',
                                  {'list_id': mlist.list_id},
                                  context_instance=RequestContext(request))
@@ -952,7 +1188,7 @@ def list_archival_options(request, list_id):
     Activate or deactivate list archivers.
     """
     # Get the list and cache the archivers property.
-    m_list = utils.get_client().get_list(list_id)
+    m_list = List.objects.get_or_404(fqdn_listname=list_id)
     archivers = m_list.archivers
 
     # Process form submission.
@@ -987,9 +1223,8 @@ def list_archival_options(request, list_id):
                                'archivers': archivers},
                               context_instance=RequestContext(request))
 
-def task_delete(task_id):
-        the_task = AdminTasks.objects.get(task_id=task_id)
-        the_task.delete()
+def task_delete(task_type, list_id, task_id):
+    AdminTasks.objects.delete_tasks(task_type, list_id, [task_id])
 
 @list_moderator_required
 def handle_mod_task(request, list_id, msg_id, action):
@@ -1005,16 +1240,16 @@ def handle_mod_task(request, list_id, msg_id, action):
     try:
         the_list = List.objects.get_or_404(fqdn_listname=list_id)
         method = 'the_list.' + action + '_message(msg_id)'
-        add_mod_event(request, msg_id, list_id, action)
+        if add_mod_event(request, msg_id, list_id, action) is None:
+            messages.error(request, "Held Message Not Found")
+            return redirect('user_dashboard')
         eval(method)
-        task_delete(msg_id)
+        task_delete('moderation', list_id, msg_id)
         messages.success(request, response_messages[action])
     except MailmanApiError:
         return utils.render_api_error(request)
     except HTTPError, e:
         messages.error(request, e.msg)
-    except TypeError as e:
-        messages.error(request, "Held Message Not Found")
     return redirect('user_dashboard')
 
 @list_moderator_required
@@ -1028,15 +1263,20 @@ def handle_sub_task(request, list_id, sub_id, action):
         'discard': _('The request has been discarded.'),
     }
     try:
-        m_list = utils.get_client().get_list(list_id)
-        add_sub_event(request, sub_id, list_id, action)
+        m_list = List.objects.get_or_404(fqdn_listname=list_id)
+        email = add_sub_event(request, sub_id, list_id, action)
+        if email is None:
+            messages.error(request, "Subscription Request Not Found")
+            return redirect('user_dashboard')
         m_list.moderate_request(sub_id, action)
-        task_delete(sub_id)
+        if action == 'accept':
+            cache.invalidate('lists')
+            members.invalidate(m_list.list_id)
+            search.add_members(m_list.list_id, [email])
+        task_delete('subscription', list_id, sub_id)
         messages.success(request, response_messages[action])
     except MailmanApiError:
         return utils.render_api_error(request)
     except HTTPError as e:
         messages.error(request, e.msg)
-    except TypeError as e:
-        messages.error(request, "Subscription Request Not Found")
     return redirect('user_dashboard')
@@ -30,7 +30,8 @@ from django.contrib.auth.forms import (AuthenticationForm, PasswordResetForm,
                                        SetPasswordForm, PasswordChangeForm)
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import (HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import render_to_response, redirect
 from django.template import Context, loader, RequestContext
 from django.utils.decorators import method_decorator
@@ -39,7 +40,7 @@ try:
     from urllib2 import HTTPError
 except ImportError:
     from urllib.error import HTTPError
-from postorius import utils
+from postorius import cache, export, search, utils
 from postorius.models import (Domain, List, Member, MailmanUser,
                               MailmanApiError, Mailman404Error)
 from postorius.forms import *
@@ -50,9 +51,35 @@ from postorius.auth.decorators import *
 @user_passes_test(lambda u: u.is_superuser)
 def site_settings(request):
     return render_to_response('postorius/site_settings.html',
+                              {'export_form': SiteExport()},
                               context_instance=RequestContext(request))
 
 
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def site_export(request):
+    """Export the members of all lists.
+
+    The rosters are streamed as an archive of per-list CSV files or as
+    one combined file (see `postorius.export.stream_site`).
+    """
+    form = SiteExport(request.GET)
+    if not form.is_valid():
+        messages.error(request, _('Please choose valid columns and format.'))
+        return redirect('site_settings')
+    try:
+        lists = List.objects.all()
+    except MailmanApiError:
+        return utils.render_api_error(request)
+    format = form.cleaned_data['format']
+    response = StreamingHttpResponse(
+        export.stream_site(lists, form.cleaned_data['columns'], format),
+        content_type=export.CONTENT_TYPES[format])
+    response['Content-Disposition'] = (
+        'attachment; filename="members.{0}"'.format(format))
+    return response
+
+
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def domain_index(request):
@@ -83,6 +110,9 @@ def domain_new(request):
             except HTTPError as e:
                 messages.error(request, e)
             else:
+                cache.invalidate('domains')
+                search.index_domain(form.cleaned_data['mail_host'],
+                                    form.cleaned_data['web_host'])
                 messages.success(request, _("New Domain registered"))
             return redirect("domain_index")
     else:
@@ -99,6 +129,8 @@ def domain_delete(request, domain):
         try:
             client = utils.get_client()
             client.delete_domain(domain)
+            cache.invalidate('domains', 'lists')
+            search.remove_domain(domain)
             messages.success(request,
                              _('The domain %s has been deleted.' % domain))
             return redirect("domain_index")
@@ -20,6 +20,7 @@ import json
 import operator
 import logging
 from datetime import datetime, timedelta, date
+from django.conf import settings
 from django.forms.formsets import formset_factory
 from django.contrib import messages
 from django.contrib.auth import logout, authenticate, login
@@ -27,7 +28,7 @@ from django.contrib.auth.decorators import (login_required,
                                             user_passes_test)
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
+from django.db.models import Q, Sum
 from django.shortcuts import render_to_response, redirect
 from django.template import RequestContext
 from django.utils.decorators import method_decorator
@@ -39,7 +40,7 @@ try:
     from urllib2 import HTTPError
 except ImportError:
     from urllib.error import HTTPError
-from postorius import utils
+from postorius import cache, members, search, utils
 from postorius.models import (
     MailmanUser, MailmanConnectionError, MailmanApiError, Mailman404Error,
     AddressConfirmationProfile, AdminTasks, Domain, List, EventTracker, TaskCalender)
@@ -336,14 +337,12 @@ class AdminTasksView(MailmanUserView):
                            to access Control Dashboard")
             return redirect('list_index')
         email = request.user.email
-        create_moderation_tasks(lists)
-        create_subscription_tasks(lists)
         sync_tasks_to_current(lists)
         tasks = AdminTasks.objects.all().order_by('priority').reverse()
 
         # Filter Tasks, Event Streamers and lists according to current user privileges
         tasks = filter_tasks_by_role(request.user, tasks, lists)
-        events = events_allowed(request.user, EventTracker.objects.all())
+        events = events_allowed(request.user, EventTracker.objects.recent())
         lists = allowed_lists(request.user, lists)
 
         # Get Plot Objects for Statistics Widget
@@ -366,6 +365,35 @@ class AdminTasksView(MailmanUserView):
                                    'events': events, 'stats': stats}, context_instance=RequestContext(request))
 
     def post(self, request):
+        if 'query_field' in request.POST:
+            query = request.POST.get('query_field')
+            try:
+                page = max(int(request.POST.get('page', 1)), 1)
+            except ValueError:
+                page = 1
+            # The search is answered before the tasks are filtered, with
+            # the cached roles of the user.
+            list_ids = None
+            if not request.user.is_superuser:
+                roles = List.objects.get_user_roles(request.user.email)
+                list_ids = roles['owner'] | roles['moderator']
+            global_result = {'page': page, 'total': {}}
+            if 'check_lists' in request.POST:
+                entries, total = search.search(query, 'list', list_ids, page)
+                global_result['lists'] = [{"display_name": each.label, "list_id": each.key}
+                                          for each in entries]
+                global_result['total']['lists'] = total
+            if 'check_domains' in request.POST:
+                entries, total = search.search(query, 'domain', None, page)
+                global_result['domains'] = [{"mail_host": each.key, "base_url": each.label}
+                                            for each in entries]
+                global_result['total']['domains'] = total
+            if 'check_people' in request.POST:
+                entries, total = search.search(query, 'person', list_ids, page)
+                global_result['people'] = [{"useremail": each.key, "list_id": each.list_id}
+                                           for each in entries]
+                global_result['total']['people'] = total
+            return HttpResponse(json.dumps(global_result), content_type="application/json")
         tasks = AdminTasks.objects.all()
         lists = List().objects.all()
         email = request.user.email
@@ -397,25 +425,6 @@ class AdminTasksView(MailmanUserView):
             if search_li.is_valid():
                 li_query = request.POST['search_li'].lower()
                 li_res = [each_list for each_list in lists if each_list.list_id.lower().find(li_query) >= 0]
-        if 'query_field' in request.POST:
-            query = request.POST.get('query_field').lower()
-            global_result = {}
-            if 'check_lists' in request.POST:
-                lists_res = [{"display_name": each.display_name, "list_id": each.list_id}
-                             for each in lists if each.list_id.find(query) >= 0]
-                global_result['lists'] = lists_res
-            if 'check_domains' in request.POST:
-                domains_res = [{"mail_host": each.mail_host, "base_url": each.base_url}
-                               for each in Domain.objects.all() if each.mail_host.find(query) >= 0]
-                global_result['domains'] = domains_res
-            if 'check_people' in request.POST:
-                people_res = [{"useremail": each_member.email, "list_id": each_list.list_id}
-                              for each_list in lists for each_member in each_list.members if each_member.email.find(query) >= 0]
-                global_result['people'] = people_res
-            try:
-                return HttpResponse(json.dumps(global_result), content_type="application/json")
-            except Exception as e:
-                print e
         if 'selected_lists[]' in request.POST:
             try:
                 selects = request.POST.getlist('selected_lists[]')
@@ -430,19 +439,8 @@ class AdminTasksView(MailmanUserView):
             if mtask_form.is_valid():
                 mtask_subject = request.POST.get('mtask_subject')
                 mtask_description = request.POST.get('mtask_description')
-                try:
-                    mtask_id = int(AdminTasks.objects.filter(task_type='manual').latest('made_on').task_id) - 1
-                except ObjectDoesNotExist:
-                    mtask_id = -1
-                mtask = AdminTasks.objects.create_task(
-                    task_id=mtask_id,
-                    task_type='manual',
-                    stamp=datetime.now(),
-                    list_id="",
-                    user_email=request.user.email)
-                mtask.msg_subject = mtask_subject
-                mtask.msg_data = mtask_description
-                mtask.save()
+                mtask = AdminTasks.objects.create_manual_task(
+                    request.user.email, mtask_subject, mtask_description)
                 tasks = AdminTasks.objects.all()
                 tasks = filter_tasks_by_role(request.user, tasks, lists)
             else:
@@ -453,7 +451,7 @@ class AdminTasksView(MailmanUserView):
         search_form = TaskSearchForm()
         search_li = ListIndexSearchForm()
         global_search = GlobalSearchForm()
-        events = events_allowed(request.user, EventTracker.objects.all())
+        events = events_allowed(request.user, EventTracker.objects.recent())
         try:
             stats
         except UnboundLocalError as e:
@@ -481,10 +479,10 @@ def has_control_access(user, lists):
     """Returns boolean based on whether user posesses
        any control privileges or not.
     """
-    is_su = user.is_superuser
-    has_owner_rights = len([each_list for each_list in lists if user.email in each_list.owners]) != 0
-    has_moderator_rights = len([each_list for each_list in lists if user.email in each_list.moderators]) != 0
-    return is_su or has_owner_rights or has_moderator_rights
+    if user.is_superuser:
+        return True
+    roles = List.objects.get_user_roles(user.email, lists)
+    return bool(roles['owner'] or roles['moderator'])
 
 
 def get_moderations(lists):
@@ -502,65 +500,28 @@ def get_subscription_reqs(lists):
     return sorted(sub_req, key=itemgetter('request_date'), reverse=False)
 
 
+def _log_new_tasks(tasks):
+    """Update the stats data for newly created tasks."""
+    counts = collections.Counter(
+        (each.made_on.date(), each.list_id, each.task_type) for each in tasks)
+    for (date, list_id, log_type), count in counts.items():
+        TaskCalender.objects.increment(date, list_id, log_type, count)
+
+
 def create_moderation_tasks(lists):
     """Keeps Tasks Model Updated with all Pending Moderations."""
 
-    try:
-        mod_req = get_moderations(lists)
-        mod_sync = AdminTasks.objects.get_count('moderation')
-        ret_admin_mods = []
-        for mod in mod_req[mod_sync:]:
-            admin_task = AdminTasks.objects.create_task(
-                task_id=mod['request_id'],
-                task_type='moderation',
-                stamp=mod['hold_date'],
-                list_id='.'.join(mod['list_id'].split('@')),
-                user_email=mod['sender'])
-            date = datetime.strptime(admin_task.made_on, '%Y-%m-%dT%H:%M:%S.%f').date()
-            # Update stats data for any new messages
-            try:
-                current_log = TaskCalender.objects.filter(on_date=date).filter(log_type='moderation').get(list_id=admin_task.list_id)
-                current_log.log_number = current_log.log_number + 1
-                current_log.save()
-            except ObjectDoesNotExist as e:
-                TaskCalender.objects.create_log(on_date=date,
-                                                list_id=admin_task.list_id, log_type='moderation', log_number=1)
-            ret_admin_mods.append(admin_task)
-        return ret_admin_mods
-    except Exception, e:
-        messages.error(request, str(e))
-        return redirect('user_dashboard')
+    tasks = AdminTasks.objects.sync(lists, 'moderation')
+    _log_new_tasks(tasks)
+    return tasks
 
 
 def create_subscription_tasks(lists):
     """Keeps Tasks Model Updated with Pending Subscription Requests."""
 
-    try:
-        sub_req = get_subscription_reqs(lists)
-        sub_sync = AdminTasks.objects.get_count('subscription')
-        ret_admin_req = []
-        for sub in sub_req[sub_sync:]:
-            admin_req = AdminTasks.objects.create_task(
-                task_id=sub['token'],
-                task_type='subscription',
-                stamp=sub['request_date'],
-                list_id=sub['list_id'],
-                user_email=sub['email'])
-            date = datetime.strptime(admin_req.made_on, '%Y-%m-%dT%H:%M:%S').date()
-            # Update stats data for any new subscription request made
-            try:
-                current_log = TaskCalender.objects.filter(on_date=date).filter(log_type='subscription').get(list_id=admin_req.list_id)
-                current_log.log_number = current_log.log_number + 1
-                current_log.save()
-            except ObjectDoesNotExist as e:
-                TaskCalender.objects.create_log(on_date=date,
-                                                list_id=admin_req.list_id, log_type='subscription', log_number=1)
-            ret_admin_req.append(admin_req)
-        return ret_admin_req
-    except Exception, e:
-        print str(e)
-        messages.error(request, str(e))
-        return redirect('user_dashboard')
+    tasks = AdminTasks.objects.sync(lists, 'subscription')
+    _log_new_tasks(tasks)
+    return tasks
 
 
 def get_rel_timediff(admin_task):
@@ -592,85 +553,98 @@ def get_rel_timediff(admin_task):
 
 
 def sync_tasks_to_current(lists):
-    """Keeps Tasks Lists Synced with the current number of pending
-    requests by deleting any task if the request has already been
-    completed.
+    """Keeps Tasks Lists Synced with the current pending requests by
+    creating tasks for new requests and deleting any task if the request
+    has already been completed.
     """
 
-    tasks = AdminTasks.objects.all().order_by('priority').reverse()
-    mod_req = get_moderations(lists)
-    sub_req = get_subscription_reqs(lists)
-    current_ids = [list_mod['request_id'] for list_mod in mod_req] + [list_sub['token'] for list_sub in sub_req]
-    try:
-        for task in tasks:
-            if task.task_type != 'manual' and task.task_id not in map(str, current_ids):
-                AdminTasks.objects.filter(task_id=task.task_id).delete()
-        return AdminTasks.objects.all()
-    except Exception, e:
-        messages.error(request, "Could not Sync Tasks" + str(e))
-        return redirect('user_dashboard')
+    create_moderation_tasks(lists)
+    create_subscription_tasks(lists)
+    return AdminTasks.objects.all()
 
 
 def allowed_lists(user, lists):
     """Filters lists according to logged in user privileges."""
 
     if not user.is_superuser:
-        lists = [each for each in lists if user.email in each.owners or user.email in each.moderators]
+        roles = List.objects.get_user_roles(user.email, lists)
+        lists = [each for each in lists if each.list_id in roles['owner'] or
+                 each.list_id in roles['moderator']]
     return lists
 
 
 def events_allowed(user, events):
     """Filters The Event Streamer according to
     logged in user privileges.
-    """
 
-    allowed = []
-    lists = List.objects.all()
-    is_owner = len([each for each in lists if user.email in each.owners]) != 0
-    is_moderator = len([each for each in lists if user.email in each.moderators]) != 0
+    Owners see the subscription and moderation events of their lists,
+    moderators the moderation events. At most
+    ``POSTORIUS_EVENT_LOG_SIZE`` events are returned.
+    """
     if not user.is_superuser:
-        for each_event in events:
-            if each_event.event.find('moderation') >= 0 and is_moderator:
-                allowed.append(each_event)
-            elif each_event.event.find('subscription') >= 0 and is_owner:
-                allowed.append(each_event)
-        return allowed
-    return events
+        roles = List.objects.get_user_roles(user.email)
+        moderated = roles['owner'] | roles['moderator']
+        events = events.filter(
+            Q(event__startswith='moderation', list_id__in=moderated) |
+            Q(event__startswith='subscription', list_id__in=roles['owner']))
+    return list(events[:EventTracker.objects.get_log_size()])
 
 
-def generate_graph_object(select_lists):
+def generate_graph_object(select_lists, days=None, bucket=None):
     """Generates moderation and subscription data objects
     to be sent to dashboard for graph generation.
-    """
 
-    sub_objects = {}
-    mod_objects = {}
+    The stats of the last `days` days are summed up per day, week or
+    month (`bucket`), in a single query. Stats which were rolled up by
+    the `compact_stats` command count for the first day of their week or
+    month. The defaults are:
+
+        >>> POSTORIUS_STATS_DAYS = 31
+        >>> POSTORIUS_STATS_BUCKET = 'day'
+
+    """
+    days = days or getattr(settings, 'POSTORIUS_STATS_DAYS', 31)
+    bucket = bucket or getattr(settings, 'POSTORIUS_STATS_BUCKET', 'day')
     today = datetime.today().date()
-    dates = []
-    for i in range(0, 31):
-        dates.append(today + timedelta(days=-i))
-    for date in dates:
-        mod_count = TaskCalender.objects.filter(list_id__in=select_lists).filter(log_type="moderation").filter(on_date=date).count()
-        sub_count = TaskCalender.objects.filter(list_id__in=select_lists).filter(log_type="subscription").filter(on_date=date).count()
-        if mod_count == 0:
-            mod_objects[date.strftime("%Y-%m-%d")] = 0
-        elif mod_count > 0:
-            mod_objects[date.strftime("%Y-%m-%d")] = mod_count
-        if sub_count == 0:
-            sub_objects[date.strftime("%Y-%m-%d")] = 0
-        elif sub_count > 0:
-            sub_objects[date.strftime("%Y-%m-%d")] = sub_count
-    # Sort The Data according to occurence date
-    sub_objects = collections.OrderedDict(sorted(sub_objects.items()))
-    mod_objects = collections.OrderedDict(sorted(mod_objects.items()))
+    start = today - timedelta(days=days - 1)
+
+    def bucket_key(day):
+        if bucket == 'week':
+            day = day - timedelta(days=day.weekday())
+        elif bucket == 'month':
+            day = day.replace(day=1)
+        return day.strftime("%Y-%m-%d")
+
+    # Fill the whole period, so days without tasks show up as well.
+    sub_objects = collections.OrderedDict()
+    mod_objects = collections.OrderedDict()
+    for i in range(0, days):
+        key = bucket_key(start + timedelta(days=i))
+        sub_objects[key] = 0
+        mod_objects[key] = 0
+    logs = TaskCalender.objects.filter(on_date__gte=start, on_date__lte=today)
+    select_lists = set('{0}'.format(each) for each in select_lists)
+    if len(select_lists) <= 500:
+        logs = logs.filter(list_id__in=select_lists)
+        fields = ('on_date', 'log_type')
+    else:
+        # Keep the query short, filter the lists below instead.
+        fields = ('on_date', 'log_type', 'list_id')
+    for log in logs.values(*fields).annotate(total=Sum('log_number')):
+        if 'list_id' in log and log['list_id'] not in select_lists:
+            continue
+        if log['log_type'] == 'subscription':
+            sub_objects[bucket_key(log['on_date'])] += log['total']
+        elif log['log_type'] == 'moderation':
+            mod_objects[bucket_key(log['on_date'])] += log['total']
     return sub_objects, mod_objects
 
 
 @login_required
-def set_task_priority(request, task_id, priority):
+def set_task_priority(request, task_pk, priority):
     """Set Priority for a Task."""
     try:
-        the_task = AdminTasks.objects.get(task_id=task_id)
+        the_task = AdminTasks.objects.get(pk=task_pk)
         if the_task.priority == int(priority):
             the_task.priority = -2
         else:
@@ -685,13 +659,24 @@ def set_task_priority(request, task_id, priority):
 
 
 def filter_tasks_by_role(user, tasks, lists):
+    """Filters tasks according to logged in user privileges.
+
+    Owners get the subscription and moderation tasks of their lists,
+    moderators the moderation tasks. Manual tasks are private.
+    """
     user_manual_tasks = [each for each in tasks if each.user_email == user.email and each.task_type == 'manual']
     if not user.is_superuser:
-        user_sub_tasks = [each for each in tasks if each.task_type == 'subscription' and
-                          user.email in List.objects.get(fqdn_listname=each.list_id).owners]
-        user_mod_tasks = [each for each in tasks if each.task_type == 'moderation' and
-                          (user.email in List.objects.get(fqdn_listname=each.list_id).moderators or
-                           user.email in List.objects.get(fqdn_listname=each.list_id).owners)]
+        roles = List.objects.get_user_roles(user.email)
+        owned = roles['owner']
+        moderated = roles['owner'] | roles['moderator']
+        user_sub_tasks = []
+        user_mod_tasks = []
+        for each in tasks:
+            list_id = each.list_id.replace('@', '.')
+            if each.task_type == 'subscription' and list_id in owned:
+                user_sub_tasks.append(each)
+            elif each.task_type == 'moderation' and list_id in moderated:
+                user_mod_tasks.append(each)
         return user_sub_tasks + user_mod_tasks + user_manual_tasks
     return list(tasks.filter(~Q(task_type='manual'))) + user_manual_tasks
 
@@ -715,7 +700,7 @@ def reorder_tasks_by(request, reorder_param):
         search_form = TaskSearchForm()
         search_li = ListIndexSearchForm()
         mtask_form = NewManualTaskForm()
-        events = events_allowed(request.user, EventTracker.objects.all())
+        events = events_allowed(request.user, EventTracker.objects.recent())
 
         sub_objects, mod_objects = generate_graph_object([each_list.list_id for each_list in lists])
         stats = {'subs': sub_objects, 'mods': mod_objects}
@@ -738,7 +723,8 @@ def discard_manual_task(request, task_id):
     """Discard The Manual Task Created By User"""
 
     try:
-        mtask = AdminTasks.objects.get(task_id=task_id)
+        mtask = AdminTasks.objects.get(task_type='manual', list_id='',
+                                       task_id=task_id)
         if request.user.email != mtask.user_email:
             messages.error(request,
                            _('You Are Not Allowed To Perform This Operation'))
@@ -761,14 +747,19 @@ def remove_role_tasks(request, list_id, role, email):
                                _('The user {} is not an owner'.format(email)))
                 return redirect('user_dashboard')
             the_list.remove_role(role, email)
+            cache.invalidate('owners')
         elif role == 'moderator':
             if email not in the_list.moderators:
                 messages.error(request,
                                _('The user {} is not a moderator'.format(email)))
                 return redirect('user_dashboard')
             the_list.remove_role(role, email)
+            cache.invalidate('moderators')
         elif role == 'subscriber':
             the_list.unsubscribe(email)
+            cache.invalidate('lists')
+            members.discard(the_list.list_id, email)
+            search.remove_members(the_list.list_id, [email])
     except MailmanApiError:
         return utils.render_api_error(request)
     except HTTPError as e:
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2015 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmark of the hot dashboard and registration lookups before and after
+the indexes of migration 0004, on an in-memory SQLite database. The
+counts of the dashboard managers are timed as well.
+
+Usage (or `tox -e benchmark`):
+
+    PYTHONPATH=.:src python testing/benchmark_indexes.py [rows]
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'testing.test_settings')
+
+import django
+from django.conf import settings
+
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+REPEAT = 200
+
+
+def _fill(rows):
+    from django.contrib.auth.models import User
+    from postorius.models import (AddressConfirmationProfile, AdminTasks,
+                                  EventTracker)
+    now = datetime.now()
+    user = User.objects.create_user('bench', 'bench@example.org', 'pwd')
+    for start in range(0, rows, 5000):
+        numbers = range(start, min(start + 5000, rows))
+        AdminTasks.objects.bulk_create([
+            AdminTasks(task_id='{0}'.format(i), task_type='moderation',
+                       made_on=now, user_email='les@example.org',
+                       list_id='list{0}.example.org'.format(i % 1000))
+            for i in numbers])
+        EventTracker.objects.bulk_create([
+            EventTracker(user_email='les@example.org',
+                         event_op='geddy@example.org',
+                         event='moderation-accept',
+                         list_id='list{0}.example.org'.format(i % 1000),
+                         made_on=now - timedelta(seconds=i))
+            for i in numbers])
+        AddressConfirmationProfile.objects.bulk_create([
+            AddressConfirmationProfile(
+                email='user{0}@example.org'.format(i),
+                activation_key='{0:040d}'.format(i), created=now, user=user)
+            for i in numbers])
+
+
+def _lookups(rows):
+    from postorius.models import (AddressConfirmationProfile, AdminTasks,
+                                  EventTracker)
+    middle = rows // 2
+    return [
+        ('AdminTasks by task_id',
+         AdminTasks.objects.filter(task_id='{0}'.format(middle))),
+        ('EventTracker earliest made_on',
+         EventTracker.objects.order_by('made_on')[:1]),
+        ('AddressConfirmationProfile by activation_key',
+         AddressConfirmationProfile.objects.filter(
+             activation_key='{0:040d}'.format(middle))),
+        ('AddressConfirmationProfile by email',
+         AddressConfirmationProfile.objects.filter(
+             email='user{0}@example.org'.format(middle))),
+    ]
+
+
+def _query_plan(queryset):
+    from django.db import connection
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def _measure(label, rows):
+    print('\n{0} ({1} rows)'.format(label, rows))
+    for name, queryset in _lookups(rows):
+        seconds = timeit.timeit(lambda: list(queryset.all()),
+                                number=REPEAT) / REPEAT
+        print('  {0:<46} {1:>8.3f} ms  {2}'.format(
+            name, seconds * 1000, _query_plan(queryset)))
+
+
+def _measure_counts(rows):
+    from postorius.models import AdminTasks, EventTracker
+    print('\nManager counts ({0} rows)'.format(rows))
+    for name, count in (
+            ('AdminTasks.objects.get_count',
+             lambda: AdminTasks.objects.get_count('moderation')),
+            ('EventTracker.objects.get_count',
+             EventTracker.objects.get_count)):
+        seconds = timeit.timeit(count, number=REPEAT) / REPEAT
+        print('  {0:<46} {1:>8.3f} ms'.format(name, seconds * 1000))
+
+
+def main():
+    settings.DATABASES['default']['NAME'] = ':memory:'
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('migrate', 'postorius', '0003', verbosity=0)
+    _fill(ROWS)
+    _measure('Before 0004_indexes', ROWS)
+    call_command('migrate', 'postorius', '0004', verbosity=0)
+    _measure('After 0004_indexes', ROWS)
+    _measure_counts(ROWS)
+
+
+if __name__ == '__main__':
+    main()
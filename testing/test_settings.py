@@ -150,6 +150,10 @@ def username(email):
 BROWSERID_USERNAME_ALGO = username
 
 
+# Don't keep Mailman API connections alive between calls: vcrpy cassettes
+# are bound to the connection they were opened with.
+MAILMAN_CLIENT_PERSISTENT = False
+
 # Set VCR_RECORD_MODE to 'all' to re-record all API responses.
 # (Remember to use an empty mailman database!)
 VCR_RECORD_MODE = 'once'